@@ -0,0 +1,85 @@
+from typing import Iterable, Optional
+
+
+class CacheBackend:
+    """
+    Interface of the cache backends.
+
+    Values are the serialized bytes of a response schema, so every backend
+    stores them as they are, in process or on a shared server.
+    """
+
+    name = "base"
+    # Whether every process of the deployment sees the same entries
+    shared = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value stored under key, or None when it is missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds, or the backend's default TTL when None."""
+        raise NotImplementedError
+
+    def delete(self, keys: Iterable[str]) -> None:
+        """Remove the given keys; missing keys are ignored."""
+        raise NotImplementedError
+
+    def fill_token(self, key: str) -> object:
+        """Return the token to pass to fill, taken before loading the value of key."""
+        return None
+
+    def fill(
+        self, key: str, value: bytes, token: object, ttl: Optional[float] = None
+    ) -> bool:
+        """
+        Store a loaded value unless key was deleted since the token was taken.
+
+        A value loaded before a write committed and stored after the write
+        deleted the key would otherwise be served until it expires. Stores the
+        value unconditionally by default.
+
+        Returns:
+            bool: Whether the value was stored.
+        """
+        self.set(key, value, ttl)
+        return True
+
+    def clear(self) -> None:
+        """Remove every key."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Return the backend's counters."""
+        raise NotImplementedError
+
+    def pin(self, key: str) -> None:
+        """Keep the entry of key from being evicted. Ignored by default."""
+
+    def unpin(self, key: str) -> None:
+        """Let the entry of key be evicted again. Ignored by default."""
+
+
+class NullCache(CacheBackend):
+    """Backend that stores nothing, used when caching is disabled."""
+
+    name = "none"
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, keys: Iterable[str]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "misses": self.misses}
@@ -0,0 +1,82 @@
+import hashlib
+import math
+import threading
+from typing import Iterable
+
+
+class CountingBloomFilter:
+    """
+    Counting Bloom filter answering whether a value may be in a set.
+
+    A negative answer is certain, a positive one is wrong with probability
+    error_rate as long as the filter holds at most capacity values. Every
+    position holds a one-byte counter instead of a bit, so values can be
+    removed again; counters saturate at 255 and are never decremented from
+    there, which only costs accuracy, never correctness. Removing a value
+    that was never added, e.g. one the filter wrongly claims to hold, takes
+    counts from other values and makes the filter miss them, so only values
+    known to be counted may be removed. Adding a value more often than it is
+    removed only costs accuracy.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self.built = False
+        self._counters = bytearray(self.size)
+        self._lock = threading.Lock()
+
+    def _positions(self, value: str) -> list[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, value: str) -> bool:
+        positions = self._positions(value)
+        with self._lock:
+            counters = self._counters
+            return all(counters[position] for position in positions)
+
+    def add(self, value: str) -> None:
+        """Add a value to the set."""
+        positions = self._positions(value)
+        with self._lock:
+            for position in positions:
+                if self._counters[position] < 255:
+                    self._counters[position] += 1
+            self.count += 1
+
+    def remove(self, value: str) -> None:
+        """Remove a value that was added before and not removed since."""
+        positions = self._positions(value)
+        with self._lock:
+            if not all(self._counters[position] for position in positions):
+                return
+            for position in positions:
+                if self._counters[position] < 255:
+                    self._counters[position] -= 1
+            self.count -= 1
+
+    def build(self, values: Iterable[str]) -> None:
+        """
+        Fill the filter from scratch, e.g. from a streaming scan of a table.
+
+        Values added or removed while the scan runs wait for it to finish, so
+        none of them are lost.
+        """
+        with self._lock:
+            self._counters = bytearray(self.size)
+            self.count = 0
+            for value in values:
+                for position in self._positions(value):
+                    if self._counters[position] < 255:
+                        self._counters[position] += 1
+                self.count += 1
+            self.built = True
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Optional
+
+from crafty.cache.store import get_cache
+from crafty.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class HotKeyTracker:
+    """
+    Streaming read frequency estimator keeping the top keys.
+
+    Counts are estimated by a count-min sketch of depth rows of width
+    counters, which never underestimates and over-counts by a small fraction
+    of all reads, in constant memory whatever the number of keys. The top_size
+    keys with the highest estimates are kept alongside. Every window seconds
+    all counts are halved, so the estimates follow what is read now rather
+    than since startup.
+    """
+
+    def __init__(
+        self, width: int = 2048, depth: int = 4, top_size: int = 100, window: float = 60
+    ):
+        self.width = width
+        self.depth = depth
+        self.top_size = top_size
+        self.window = window
+        self.reads = 0
+        self._rows = [[0] * width for _ in range(depth)]
+        self._top = {}
+        self._top_min = 0
+        self._decayed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _cells(self, key: str):
+        return [(row, hash((row, key)) % self.width) for row in range(self.depth)]
+
+    def record(self, key: str) -> int:
+        """Count a read of key and return its estimated count."""
+        with self._lock:
+            self._decay_if_due()
+            self.reads += 1
+            estimate = None
+            for row, cell in self._cells(key):
+                self._rows[row][cell] += 1
+                count = self._rows[row][cell]
+                estimate = count if estimate is None else min(estimate, count)
+            if key in self._top or len(self._top) < self.top_size:
+                self._top[key] = estimate
+            elif estimate > self._top_min:
+                del self._top[min(self._top, key=self._top.get)]
+                self._top[key] = estimate
+            else:
+                return estimate
+            self._top_min = min(self._top.values())
+            return estimate
+
+    def estimate(self, key: str) -> int:
+        """Return the estimated count of key without counting a read."""
+        with self._lock:
+            self._decay_if_due()
+            return min(self._rows[row][cell] for row, cell in self._cells(key))
+
+    def top(self, limit: Optional[int] = None) -> list[tuple[str, int]]:
+        """Return the keys read most, with their estimated counts, highest first."""
+        with self._lock:
+            self._decay_if_due()
+            ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def _decay_if_due(self):
+        elapsed = time.monotonic() - self._decayed_at
+        if elapsed < self.window:
+            return
+        # Halve once per elapsed window, a long idle period forgets everything
+        shift = min(int(elapsed // self.window), 32)
+        self._rows = [[count >> shift for count in row] for row in self._rows]
+        self._top = {
+            key: count >> shift for key, count in self._top.items() if count >> shift
+        }
+        self._top_min = min(self._top.values(), default=0)
+        self._decayed_at += shift * self.window
+
+
+class HotKeys:
+    """
+    Pins the cache entries of hot keys and refreshes them ahead of expiry.
+
+    A key read at least threshold times, by the estimate of the tracker, is
+    pinned in the cache, which keeps it from being evicted, and refreshed by
+    a background thread every refresh_interval seconds, before its TTL runs
+    out. A pinned key whose count drops below half the threshold, or whose
+    refresh fails, e.g. because the row was deleted, is unpinned again.
+    """
+
+    def __init__(
+        self,
+        tracker: HotKeyTracker,
+        threshold: int,
+        max_pinned: int,
+        refresh_interval: float,
+    ):
+        self.tracker = tracker
+        self.threshold = threshold
+        self.max_pinned = max_pinned
+        self.refresh_interval = refresh_interval
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def record(self, key: str, refresh: Optional[Callable[[], None]] = None) -> None:
+        """
+        Count a read of key and pin it once it is hot.
+
+        Args:
+            key (str): The cache key, or any key identifying the row that was read.
+            refresh (Callable, optional): Reloads the cache entry of key. Keys
+                without one are only counted.
+        """
+        estimate = self.tracker.record(key)
+        if refresh is None or estimate < self.threshold or key in self._pinned:
+            return
+        with self._lock:
+            if key in self._pinned or len(self._pinned) >= self.max_pinned:
+                return
+            self._pinned[key] = refresh
+            logger.info(f"Pinning hot cache key {key} read ~{estimate} times")
+            get_cache().pin(key)
+            if self._refresher is None:
+                self._refresher = threading.Thread(
+                    target=self._refresh_loop, name="crafty-hot-keys", daemon=True
+                )
+                self._refresher.start()
+
+    def unpin(self, key: str) -> None:
+        """Stop pinning and refreshing key."""
+        with self._lock:
+            if self._pinned.pop(key, None) is not None:
+                get_cache().unpin(key)
+
+    def pinned(self) -> set[str]:
+        """Return the pinned keys."""
+        return set(self._pinned)
+
+    def refresh_pinned(self) -> None:
+        """Refresh every pinned key that is still hot and unpin the others."""
+        for key, refresh in list(self._pinned.items()):
+            if self.tracker.estimate(key) < self.threshold / 2:
+                logger.info(f"Unpinning cache key {key}, it is no longer hot")
+                self.unpin(key)
+                continue
+            try:
+                refresh()
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning(f"Unpinning cache key {key}, refreshing it failed: {e}")
+                self.unpin(key)
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh_pinned()
+
+
+@lru_cache
+def get_hot_keys() -> HotKeys:
+    """Getter for the hot key tracking of the process, configured by HOT_KEY_*."""
+    settings = get_settings()
+    return HotKeys(
+        HotKeyTracker(
+            top_size=settings.hot_key_top_size, window=settings.hot_key_window
+        ),
+        threshold=settings.hot_key_threshold,
+        max_pinned=settings.hot_key_max_pinned,
+        refresh_interval=settings.hot_key_refresh_interval or settings.cache_ttl / 2,
+    )
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from crafty.cache.backends import CacheBackend
+
+# Bookkeeping bytes counted per entry on top of its key and value
+ENTRY_OVERHEAD = 100
+
+# Deleted keys remembered for fills in flight; fills that started before the
+# oldest of them are skipped
+MAX_REMEMBERED_DELETES = 10000
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache with per-entry TTLs, bounded by the bytes it holds.
+
+    The size of an entry is the length of its key and value plus
+    ENTRY_OVERHEAD. When a new entry does not fit, the least recently used
+    entries are evicted until it does. Pinned keys are skipped by the
+    eviction, though they still expire and can be deleted.
+
+    Every deleted key is numbered, so fill can tell a value loaded before the
+    key was deleted from one loaded after.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._pinned = set()
+        # Deletion number of the recently deleted keys, and the number of the
+        # last deletion forgotten
+        self._deleted = OrderedDict()
+        self._deletions = 0
+        self._forgotten = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _size(key: str, value: bytes) -> int:
+        return len(key) + len(value) + ENTRY_OVERHEAD
+
+    def _pop(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= self._size(key, value)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: str, value: bytes, ttl: Optional[float]) -> bool:
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        if key in self._entries:
+            self._pop(key)
+        while self._bytes + size > self.max_bytes:
+            victim = next(
+                (entry for entry in self._entries if entry not in self._pinned),
+                None,
+            )
+            if victim is None:
+                # Only pinned entries left, the new one does not fit
+                return False
+            self._pop(victim)
+            self.evictions += 1
+        self._entries[key] = (value, expires_at)
+        self._bytes += size
+        self.sets += 1
+        return True
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                # Numbered whether or not the key is cached, a fill may be
+                # loading it
+                self._deletions += 1
+                self._deleted[key] = self._deletions
+                self._deleted.move_to_end(key)
+                if len(self._deleted) > MAX_REMEMBERED_DELETES:
+                    _, self._forgotten = self._deleted.popitem(last=False)
+                if key in self._entries:
+                    self._pop(key)
+                    self.invalidations += 1
+
+    def fill_token(self, key: str) -> int:
+        with self._lock:
+            return self._deletions
+
+    def fill(
+        self, key: str, value: bytes, token: int, ttl: Optional[float] = None
+    ) -> bool:
+        with self._lock:
+            # Keys no longer remembered may have been deleted up to _forgotten
+            if self._deleted.get(key, self._forgotten) > token:
+                return False
+            return self._store(key, value, ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def pin(self, key: str) -> None:
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            self._pinned.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "sets": self.sets,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,87 @@
+import uuid
+from typing import Iterable, Optional
+
+from fastapi import Request
+
+from crafty.cache.store import get_cache, invalidate
+from crafty.config import get_settings
+
+
+def response_cache_enabled() -> bool:
+    """
+    Check whether list responses are cached, see RESPONSE_CACHE.
+
+    Generations live in the cache backend, so they are only seen by every
+    worker when the backend is shared. With an in-process backend responses
+    are cached only when RESPONSE_CACHE=true says the app runs in one process.
+    """
+    enabled = get_settings().response_cache
+    if enabled is None:
+        return get_cache().shared
+    return enabled
+
+
+def generation_key(table: str) -> str:
+    """Return the cache key holding the current generation of a table."""
+    return f"generation:{table}"
+
+
+def _generations(tables: Iterable[str]) -> list[str]:
+    """
+    Return the current generation of each table, starting a new one when missing.
+
+    A generation is a random token rather than a counter, so a generation that
+    was evicted or expired never comes back with a value older responses were
+    cached under.
+    """
+    cache = get_cache()
+    generations = []
+    for table in tables:
+        generation = cache.get(generation_key(table))
+        if generation is None:
+            generation = uuid.uuid4().hex[:16].encode()
+            cache.set(generation_key(table), generation)
+        generations.append(generation.decode())
+    return generations
+
+
+def bump_generations(tables: Iterable[str]) -> None:
+    """
+    Start a new generation of the tables, orphaning the responses built from them.
+
+    Removing the generation is enough, the next read starts a new one. With a
+    shared cache backend the removal is broadcast like any other invalidation.
+    """
+    invalidate(generation_key(table) for table in tables)
+
+
+def response_cache_key(request: Request, tables: Iterable[str]) -> str:
+    """
+    Build the cache key of a list response.
+
+    The key holds the route, the query parameters in a canonical order and the
+    current generation of every table the response is built from, so a write
+    to any of them makes the key of the next request different.
+
+    Args:
+        request (Request): The request being answered.
+        tables (Iterable[str]): Names of the tables the response depends on.
+
+    Returns:
+        str: The cache key.
+    """
+    generations = ",".join(_generations(tables))
+    params = "&".join(
+        f"{name}={value}" for name, value in sorted(request.query_params.multi_items())
+    )
+    return f"response:{request.url.path}:{generations}:{params}"
+
+
+def get_response(key: str) -> Optional[bytes]:
+    """Return the cached JSON body stored under key, if any."""
+    return get_cache().get(key)
+
+
+def set_response(key: str, body: bytes, ttl: Optional[float] = None) -> None:
+    """Cache a JSON body under key."""
+    get_cache().set(key, body, ttl)
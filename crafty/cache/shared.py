@@ -0,0 +1,294 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Optional
+
+from crafty.cache.backends import CacheBackend
+from crafty.cache.memory import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# In-process servers of the fakeredis:// URLs, shared by the clients of a URL
+_fake_servers = {}
+_fake_servers_lock = threading.Lock()
+
+# Seconds to wait before subscribing again after the connection was lost
+RESUBSCRIBE_DELAY = 1.0
+
+
+def connect(url: str):
+    """
+    Create a Redis client for a URL.
+
+    A fakeredis:// URL gives a client of an in-process server from the
+    fakeredis package, which every client of the same URL shares. It stands in
+    for Redis in tests and local runs without any network.
+
+    Args:
+        url (str): A redis://, rediss://, unix:// or fakeredis:// URL.
+
+    Returns:
+        A client implementing the Redis protocol commands of redis-py.
+
+    Raises:
+        RuntimeError: If the package needed for the URL is not installed.
+    """
+    if url.startswith("fakeredis://"):
+        try:
+            import fakeredis
+        except ImportError:
+            raise RuntimeError("fakeredis:// URLs require the fakeredis package")
+        with _fake_servers_lock:
+            server = _fake_servers.setdefault(url, fakeredis.FakeServer())
+        return fakeredis.FakeRedis(server=server)
+
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(
+            "CACHE_BACKEND=redis requires the redis package, "
+            "install it with poetry install --extras redis"
+        )
+    return redis.Redis.from_url(url)
+
+
+class SharedCache(CacheBackend):
+    """
+    Cache shared by every worker and node through a Redis server.
+
+    Values live on the server, so an entry loaded by one worker is served to
+    all of them and an invalidation removes it for all of them. Each process
+    can additionally keep a small near cache of the values it read, for at
+    most local_ttl seconds. Invalidations are published on a channel that
+    every process subscribes to, so they are also evicted from the near caches
+    of the other processes and passed to on_invalidate, which keeps the other
+    in-process lookups, like the tag dictionary, in sync.
+
+    Deleting a key also increments a counter of the key on the server, which
+    fill checks in a transaction, so a value loaded by any process before the
+    key was deleted is not stored after it.
+
+    The cache never fails a request: when the server is unreachable reads are
+    misses and writes are skipped, and the error is counted.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(
+        self,
+        client,
+        default_ttl: float,
+        prefix: str = "crafty:",
+        channel: str = "crafty:invalidations",
+        local: Optional[MemoryCache] = None,
+        local_ttl: float = 0,
+        on_invalidate: Optional[Callable[[Optional[list[str]]], None]] = None,
+    ):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self.channel = channel
+        self.local = local if local_ttl > 0 else None
+        self.local_ttl = local_ttl
+        self.on_invalidate = on_invalidate
+        # Identifies the messages published by this process
+        self.origin = uuid.uuid4().hex
+        self.hits = 0
+        self.local_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+        self.errors = 0
+        self._subscribed = threading.Event()
+        self._listener = threading.Thread(
+            target=self._listen, name="crafty-cache-invalidations", daemon=True
+        )
+        self._listener.start()
+
+    def _deletions_key(self, key: str) -> str:
+        return f"{self.prefix}deletions:{key}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                self.local_hits += 1
+                return value
+            # Invalidations received while reading keep the value out
+            local_token = self.local.fill_token(key)
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception as e:
+            self._failed("get", e)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.local is not None:
+            self.local.fill(key, value, local_token, self.local_ttl)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self._failed("set", e)
+            return
+        self.sets += 1
+        if self.local is not None:
+            self.local.set(key, value, min(ttl, self.local_ttl))
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        if self.local is not None:
+            self.local.delete(keys)
+        self.invalidations += len(keys)
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.delete(*(self.prefix + key for key in keys))
+                # Kept as long as a value, fills outliving them are not guarded
+                for key in keys:
+                    pipe.incr(self._deletions_key(key))
+                    pipe.pexpire(
+                        self._deletions_key(key), max(1, int(self.default_ttl * 1000))
+                    )
+                pipe.execute()
+            self._publish({"keys": keys})
+        except Exception as e:
+            self._failed("delete", e)
+
+    def fill_token(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get(self._deletions_key(key))
+        except Exception as e:
+            self._failed("get", e)
+            return None
+
+    def fill(
+        self,
+        key: str,
+        value: bytes,
+        token: Optional[bytes],
+        ttl: Optional[float] = None,
+    ) -> bool:
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            with self.client.pipeline() as pipe:
+                # Fails the transaction when the key is deleted meanwhile
+                pipe.watch(self._deletions_key(key))
+                if pipe.get(self._deletions_key(key)) != token:
+                    return False
+                pipe.multi()
+                pipe.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+                pipe.execute()
+        except Exception as e:
+            # A WatchError, or the server is unreachable
+            if type(e).__name__ != "WatchError":
+                self._failed("fill", e)
+            return False
+        self.sets += 1
+        if self.local is not None:
+            self.local.set(key, value, min(ttl, self.local_ttl))
+        return True
+
+    def clear(self) -> None:
+        if self.local is not None:
+            self.local.clear()
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + "*"))
+            if keys:
+                self.client.delete(*keys)
+            self._publish({"clear": True})
+        except Exception as e:
+            self._failed("clear", e)
+
+    def stats(self) -> dict:
+        local = self.local.stats() if self.local is not None else {}
+        return {
+            "backend": self.name,
+            "entries": local.get("entries", 0),
+            "bytes": local.get("bytes", 0),
+            "max_bytes": local.get("max_bytes", 0),
+            "pinned": local.get("pinned", 0),
+            "hits": self.hits,
+            "local_hits": self.local_hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "evictions": local.get("evictions", 0),
+            "expirations": local.get("expirations", 0),
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "errors": self.errors,
+        }
+
+    def pin(self, key: str) -> None:
+        if self.local is not None:
+            self.local.pin(key)
+
+    def unpin(self, key: str) -> None:
+        if self.local is not None:
+            self.local.unpin(key)
+
+    def wait_subscribed(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the process listens for invalidations, e.g. in tests."""
+        return self._subscribed.wait(timeout)
+
+    def _publish(self, message: dict) -> None:
+        self.client.publish(
+            self.channel, json.dumps({"origin": self.origin, **message})
+        )
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Shared cache {operation} failed: {error}")
+
+    def _listen(self) -> None:
+        missed = False
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                if missed and self.on_invalidate is not None:
+                    # Invalidations published while disconnected are lost
+                    self.on_invalidate(None)
+                missed = False
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._receive(message["data"])
+            except Exception as e:
+                self._subscribed.clear()
+                self._failed("subscribe", e)
+                missed = True
+                # Entries invalidated while disconnected may linger in the near
+                # cache, drop all of them
+                if self.local is not None:
+                    self.local.clear()
+                time.sleep(RESUBSCRIBE_DELAY)
+
+    def _receive(self, data) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation {data!r}")
+            return
+        if message.get("origin") == self.origin:
+            return
+        if message.get("clear"):
+            if self.local is not None:
+                self.local.clear()
+            return
+        keys = message.get("keys", [])
+        self.remote_invalidations += len(keys)
+        if self.local is not None:
+            self.local.delete(keys)
+        if self.on_invalidate is not None:
+            self.on_invalidate(keys)
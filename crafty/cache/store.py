@@ -0,0 +1,156 @@
+import logging
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from crafty.cache.backends import CacheBackend, NullCache
+from crafty.cache.memory import MemoryCache
+from crafty.cache.shared import SharedCache, connect
+from crafty.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+# Cached in place of values known not to exist, never a valid JSON document
+_ABSENT = b""
+
+# Called with the keys invalidated by this or, with a shared backend, any process
+_listeners = []
+
+
+@lru_cache
+def get_cache() -> CacheBackend:
+    """Getter for the cache backend selected by CACHE_BACKEND."""
+    settings = get_settings()
+    if settings.cache_backend == "memory":
+        return MemoryCache(settings.cache_max_bytes, settings.cache_ttl)
+    if settings.cache_backend == "redis":
+        return SharedCache(
+            connect(settings.redis_url),
+            settings.cache_ttl,
+            prefix=settings.cache_prefix,
+            channel=settings.cache_prefix + "invalidations",
+            local=MemoryCache(settings.cache_max_bytes, settings.cache_local_ttl),
+            local_ttl=settings.cache_local_ttl,
+            on_invalidate=_notify_remote,
+        )
+    return NullCache()
+
+
+def on_invalidate(
+    listener: Callable[[Optional[list[str]]], None], remote_only: bool = False
+) -> None:
+    """
+    Register a function called with the cache keys every invalidation removes.
+
+    Lets in-process lookups kept outside the cache follow the invalidations,
+    including those made by other processes when the backend is shared. The
+    listener is called with None when invalidations of other processes may
+    have been missed, e.g. while the connection to the server was lost.
+
+    Args:
+        listener (Callable): Called with the invalidated keys, or None.
+        remote_only (bool): Only call the listener for the invalidations of
+            other processes, for lookups the writes of this process update
+            themselves.
+    """
+    _listeners.append((listener, remote_only))
+
+
+def _notify(keys: Optional[list[str]], remote: bool = False) -> None:
+    for listener, remote_only in _listeners:
+        if remote_only and not remote:
+            continue
+        try:
+            listener(keys)
+        except Exception as e:
+            logger.error(f"Cache invalidation listener failed: {e}")
+
+
+def _notify_remote(keys: Optional[list[str]]) -> None:
+    _notify(keys, remote=True)
+
+
+def read_through(
+    key: str,
+    schema: type[Schema],
+    load: Callable[[], object],
+    ttl: Optional[float] = None,
+    negative_ttl: Optional[float] = None,
+) -> Optional[Schema]:
+    """
+    Return the cached value of key, loading and caching it on a miss.
+
+    The value is not cached when key is invalidated while it is loaded, e.g. by
+    a write committed meanwhile, so the stale value is not served until it
+    expires.
+
+    Args:
+        key (str): The cache key.
+        schema (type[Schema]): The schema the value is stored as.
+        load (Callable): Loads the value, e.g. an ORM object, on a miss.
+        ttl (float, optional): Seconds to keep the value. Defaults to CACHE_TTL.
+        negative_ttl (float, optional): Seconds to remember that load returned
+            None. Absent values are not cached when not given.
+
+    Returns:
+        Optional[Schema]: The value, validated by the schema, or None when load
+            returned None.
+    """
+    cache = get_cache()
+    data = cache.get(key)
+    if data == _ABSENT:
+        return None
+    if data is not None:
+        return schema.model_validate_json(data)
+    # Taken before loading, a write committed while loading keeps the value
+    # out of the cache
+    token = cache.fill_token(key)
+    loaded = load()
+    if loaded is None:
+        if negative_ttl is not None:
+            cache.fill(key, _ABSENT, token, negative_ttl)
+        return None
+    value = schema.model_validate(loaded, from_attributes=True)
+    cache.fill(key, value.model_dump_json().encode(), token, ttl)
+    return value
+
+
+def refresh(
+    key: str,
+    schema: type[Schema],
+    load: Callable[[], object],
+    ttl: Optional[float] = None,
+) -> None:
+    """
+    Load a value and store it under key, whether or not it is cached.
+
+    Like read_through, the value is not stored when key is invalidated while it
+    is loaded.
+
+    Args:
+        key (str): The cache key.
+        schema (type[Schema]): The schema the value is stored as.
+        load (Callable): Loads the value, e.g. an ORM object.
+        ttl (float, optional): Seconds to keep the value. Defaults to CACHE_TTL.
+
+    Raises:
+        LookupError: If load returned None.
+    """
+    cache = get_cache()
+    token = cache.fill_token(key)
+    loaded = load()
+    if loaded is None:
+        raise LookupError(key)
+    value = schema.model_validate(loaded, from_attributes=True)
+    cache.fill(key, value.model_dump_json().encode(), token, ttl)
+
+
+def invalidate(keys: Iterable[str]) -> None:
+    """Remove keys from the cache after the data behind them was written."""
+    keys = list(keys)
+    logger.debug(f"Invalidating cache keys {keys}")
+    get_cache().delete(keys)
+    _notify(keys)
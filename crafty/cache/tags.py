@@ -0,0 +1,102 @@
+import bisect
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from crafty.schemas.tag import Tag
+
+
+class _Snapshot:
+    """Immutable lookup tables of one load of the tags."""
+
+    def __init__(self, tags: Iterable[Tag]):
+        self.by_id = {tag.id: tag for tag in tags}
+        self.by_name = {tag.name: tag for tag in self.by_id.values()}
+        self.ids = sorted(self.by_id)
+        # Names compared case-insensitively like the database collation does,
+        # the lowest ID wins when names only differ by case
+        self.by_folded_name = {
+            self.by_id[tag_id].name.casefold(): self.by_id[tag_id]
+            for tag_id in reversed(self.ids)
+        }
+        # Case-folded names in sorted order, for prefix lookups with bisect
+        self.folded = sorted(
+            (tag.name.casefold(), tag.id) for tag in self.by_id.values()
+        )
+
+
+class TagDictionary:
+    """
+    Process-local copy of the tags table answering lookups without the database.
+
+    The whole table is loaded at once and replaced on the first lookup after
+    it expires or is invalidated by a tag write of this process. Writes made by
+    other processes are seen once the TTL expires. Readers use the snapshot that
+    was current when they started, so a reload never blocks them.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.loads = 0
+        self._snapshot = None
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def fresh(self) -> bool:
+        """Check whether the dictionary is loaded and not expired."""
+        return (
+            self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def ensure(self, load: Callable[[], Iterable[Tag]]) -> None:
+        """
+        Load the tags unless the dictionary is fresh.
+
+        Args:
+            load (Callable): Returns every tag. Called by at most one thread at a
+                time, concurrent callers wait for its result.
+        """
+        if self.fresh():
+            return
+        with self._lock:
+            if not self.fresh():
+                self.replace(load())
+
+    def replace(self, tags: Iterable[Tag]) -> None:
+        """Replace the content of the dictionary with tags."""
+        self._snapshot = _Snapshot(tags)
+        self._loaded_at = time.monotonic()
+        self.loads += 1
+
+    def invalidate(self) -> None:
+        """Make the next lookup load the tags again."""
+        self._loaded_at = float("-inf")
+
+    def get(self, tag_id: int) -> Optional[Tag]:
+        """Return the tag with the ID, if any."""
+        return self._snapshot.by_id.get(tag_id)
+
+    def get_by_name(self, name: str) -> Optional[Tag]:
+        """Return the tag with this name, else with this name ignoring case, if any."""
+        snapshot = self._snapshot
+        tag = snapshot.by_name.get(name)
+        if tag is None:
+            tag = snapshot.by_folded_name.get(name.casefold())
+        return tag
+
+    def with_prefix(self, prefix: str) -> list[Tag]:
+        """Return the tags whose name starts with prefix, ignoring case, by ID."""
+        snapshot = self._snapshot
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(snapshot.folded, (prefix,))
+        ids = []
+        for name, tag_id in snapshot.folded[start:]:
+            if not name.startswith(prefix):
+                break
+            ids.append(tag_id)
+        return [snapshot.by_id[tag_id] for tag_id in sorted(ids)]
+
+    def all(self) -> list[Tag]:
+        """Return every tag, by ID."""
+        snapshot = self._snapshot
+        return [snapshot.by_id[tag_id] for tag_id in snapshot.ids]
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(resource: str, resource_id: int, version: int, variant: str = "") -> str:
+    """
+    Build the strong ETag of a versioned resource.
+
+    Args:
+        resource (str): The resource type, e.g. "product".
+        resource_id (int): The ID of the resource.
+        version (int): The version of the resource row.
+        variant (str, optional): Distinguishes representations of the same row,
+            e.g. with or without related rows. Defaults to "".
+
+    Returns:
+        str: The quoted ETag.
+    """
+    parts = [resource, str(resource_id), str(version)] + ([variant] if variant else [])
+    return f'"{"-".join(parts)}"'
+
+
+def format_last_modified(updated_at: datetime) -> str:
+    """Format a naive UTC updated_at as an HTTP date."""
+    return format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def has_conditions(request: Request) -> bool:
+    """Check whether the request is a conditional GET."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # GET uses the weak comparison, so W/ prefixes are ignored
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def _modified_since(if_modified_since: str, updated_at: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have a resolution of one second
+    modified = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+    return modified > since
+
+
+def not_modified_response(
+    request: Request, etag: str, updated_at: datetime
+) -> Optional[Response]:
+    """
+    Answer a conditional GET with 304 when the client's copy is current.
+
+    If-None-Match takes precedence over If-Modified-Since, as required by
+    RFC 9110.
+
+    Args:
+        request (Request): The request.
+        etag (str): The current ETag of the resource.
+        updated_at (datetime): When the resource was last modified, naive UTC.
+
+    Returns:
+        Optional[Response]: The 304 response, or None when the resource has to be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        current = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        current = if_modified_since is not None and not _modified_since(
+            if_modified_since, updated_at
+        )
+    if not current:
+        return None
+    response = Response(status_code=304)
+    set_validators(response, etag, updated_at)
+    return response
+
+
+def set_validators(response: Response, etag: str, updated_at: datetime) -> None:
+    """Set the ETag and Last-Modified headers of a response."""
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = format_last_modified(updated_at)
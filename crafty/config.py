@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -13,6 +13,85 @@ class Settings(BaseSettings):
 
     # Database settings
     database_url: str
+    # Read replicas of database_url, as a JSON list of URLs
+    replica_urls: List[str] = []
+    # Seconds after a write to a table during which its reads stay on the primary
+    replica_write_window: float = 5.0
+    # "sync" runs crud functions on the blocking Session inside the route,
+    # "async" runs them on an AsyncSession backed by an async driver and
+    # "executor" runs them on a thread pool sized to the connection pool.
+    db_mode: Literal["sync", "async", "executor"] = "sync"
+    # Overrides the async URL derived from database_url (aiomysql / aiosqlite).
+    async_database_url: Optional[str] = None
+    # Connection pool of every engine (per process, multiply by the worker count
+    # when sizing against MySQL's max_connections)
+    db_pool_size: int = 150
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 3600
+    db_pool_pre_ping: bool = True
+    # Statements a request may execute, globally and per route template
+    # (e.g. {"/products/": 3}). No budget when unset.
+    db_query_budget: Optional[int] = None
+    db_route_query_budgets: Dict[str, int] = {}
+    # Executions of the same statement within one request reported as N+1
+    db_repeated_statement_threshold: int = 5
+    # Fail requests over budget or with N+1 statements instead of logging them
+    db_query_strict: bool = False
+    # Seconds a request may wait for a free connection in "executor" mode
+    # before it is rejected with 503, and the Retry-After sent with it.
+    db_executor_max_wait: float = 0.5
+    db_executor_retry_after: int = 1
+    # Share one fetch between concurrent identical calls of the crud getters
+    # marked with coalesced
+    db_coalesce_reads: bool = True
+    # Products written per multi-row INSERT by POST /products/bulk
+    product_bulk_batch_size: int = 500
+    # Products read per server-side cursor fetch by GET /products/export
+    product_export_batch_size: int = 1000
+    # Rows validated, written and committed together by the user import
+    user_import_batch_size: int = 1000
+
+    # Cache settings
+    # "memory" keeps an LRU cache in every process, "redis" shares one cache
+    # between all workers and nodes, "none" disables caching
+    cache_backend: Literal["memory", "redis", "none"] = "memory"
+    # Bytes of keys and values the in-process cache may hold
+    cache_max_bytes: int = 64 * 1024 * 1024
+    # Seconds a cached value is served before it is loaded again
+    cache_ttl: float = 60.0
+    # Server of the "redis" backend; fakeredis:// runs an in-process stand-in
+    redis_url: str = "redis://localhost:6379/0"
+    # Prefix of the keys and of the invalidation channel on the server
+    cache_prefix: str = "crafty:"
+    # Seconds the "redis" backend keeps values read from the server in the
+    # process as well, 0 disables the near cache
+    cache_local_ttl: float = 5.0
+    # Cache the list responses of GET /products/, /reviews/ and /tags/. When
+    # unset they are cached with a shared backend only: the generations of the
+    # "memory" backend are per process, so with several workers a write through
+    # one of them would leave the others serving stale pages
+    response_cache: Optional[bool] = None
+    # Seconds a user lookup finding no user is cached
+    user_negative_ttl: float = 5.0
+    # Users the username and email filter is sized for, at a 1% false positive
+    # rate; more users only raise the rate, which costs extra queries
+    user_filter_capacity: int = 100_000
+    # Report identifiers missing from the filter as free without a query. When
+    # unset only with a shared cache backend, which brings the users created by
+    # other processes into the filter of every process
+    user_filter_authoritative: Optional[bool] = None
+    # Product and user cache entries read HOT_KEY_THRESHOLD times, with counts
+    # halved every HOT_KEY_WINDOW seconds, are pinned in the cache and refreshed
+    # every HOT_KEY_REFRESH_INTERVAL seconds (CACHE_TTL / 2 when unset)
+    hot_key_threshold: int = 100
+    hot_key_window: float = 60.0
+    hot_key_max_pinned: int = 100
+    hot_key_refresh_interval: Optional[float] = None
+    # Keys listed by GET /admin/hot-keys
+    hot_key_top_size: int = 100
+    # Seconds the in-process tag dictionary is used before it is loaded again
+    tag_dictionary_ttl: float = 30.0
 
     class Config:
         """Configuration for settings.
@@ -18,3 +18,18 @@ class SubscriptionLevel(enum.Enum):
     basic = "basic"
     premium = "premium"
     pro = "pro"
+
+
+class ProductSort(str, enum.Enum):
+    id = "id"
+    price_asc = "price_asc"
+    price_desc = "price_desc"
+
+
+class OnConflict(str, enum.Enum):
+    # Raise the *AlreadyExistsError of the row
+    error = "error"
+    # Keep the existing row and return it
+    ignore = "ignore"
+    # Overwrite the existing row with the new values and return it
+    update = "update"
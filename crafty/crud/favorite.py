@@ -1,23 +1,34 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.orm import Session
 
+from crafty.constants import OnConflict
 from crafty.db.models.favorite import Favorite
 from crafty.db.models.user import User
+from crafty.db.session import replica_reads
+from crafty.db.writes import insert_one, is_duplicate_key, upsert_one
 from crafty.exceptions import FavoriteAlreadyExistsError, FavoriteNotFoundError
+from crafty.pagination import paginate
 from crafty.schemas.favorite import FavoriteCreate
 
 logger = logging.getLogger(__name__)
 
+# Columns favorite pages are sorted and keyed by
+FAVORITE_PAGE_KEY = (Favorite.id,)
 
-def create_favorite(db: Session, favorite: FavoriteCreate) -> Favorite:
+
+def create_favorite(
+    db: Session, favorite: FavoriteCreate, on_conflict: OnConflict = OnConflict.error
+) -> Favorite:
     """Create a new favorite in the database.
 
     Args:
         db (Session): The database session.
         favorite (FavoriteCreate): The favorite data to create.
+        on_conflict (OnConflict): What to do when the buyer already favorited
+            the product, raise by default or return the existing favorite.
 
     Returns:
         Favorite: The created favorite object.
@@ -27,33 +38,26 @@ def create_favorite(db: Session, favorite: FavoriteCreate) -> Favorite:
         IntegrityError: If there is an integrity error during the database operation.
     """
     try:
-        existing_favorite = (
-            db.query(Favorite)
-            .filter(
-                Favorite.buyer_id == favorite.buyer_id,
-                Favorite.product_id == favorite.product_id,
+        if on_conflict != OnConflict.error:
+            return upsert_one(
+                db,
+                Favorite,
+                favorite.model_dump(),
+                ("buyer_id", "product_id"),
+                on_conflict,
             )
-            .one_or_none()
-        )
-
-        if existing_favorite:
-            raise FavoriteAlreadyExistsError(favorite.buyer_id, favorite.product_id)
-
-        db_favorite = Favorite(**favorite.model_dump())
-        db.add(db_favorite)
-        db.commit()
-        db.refresh(db_favorite)
-        return db_favorite
+        return insert_one(db, Favorite(**favorite.model_dump()))
     except IntegrityError as e:
         logger.error(f"IntegrityError while creating favorite: {e}")
-        db.rollback()
-        raise FavoriteAlreadyExistsError(favorite.buyer_id, favorite.product_id)
+        if is_duplicate_key(e):
+            raise FavoriteAlreadyExistsError(favorite.buyer_id, favorite.product_id)
+        raise
     except Exception as e:
         logger.error(f"Unexpected error while creating favorite: {e}")
-        db.rollback()
         raise
 
 
+@replica_reads
 def get_favorite(db: Session, favorite_id: int) -> Favorite:
     """Retrieve a favorite by ID.
 
@@ -101,20 +105,29 @@ def delete_favorite(db: Session, favorite_id: int) -> None:
         raise
 
 
-def get_favorites(db: Session, skip: int = 0, limit: int = 10) -> List[Favorite]:
+@replica_reads
+def get_favorites(
+    db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None
+) -> List[Favorite]:
     """Retrieve a list of favorites with optional pagination.
 
     Args:
         db (Session): The database session.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): Cursor returned with the previous page; when given,
+            skip is ignored. Defaults to None.
 
     Returns:
         List[Favorite]: List of favorite objects.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
     """
-    return db.query(Favorite).offset(skip).limit(limit).all()
+    return paginate(db.query(Favorite), FAVORITE_PAGE_KEY, cursor, skip, limit).all()
 
 
+@replica_reads
 def get_favorites_by_buyer_id(db: Session, buyer_id: int) -> List[Favorite]:
     """Retrieve all favorites for a specific buyer by buyer_id.
 
@@ -134,6 +147,7 @@ def get_favorites_by_buyer_id(db: Session, buyer_id: int) -> List[Favorite]:
         raise
 
 
+@replica_reads
 def get_favorites_by_username(db: Session, username: str) -> List[Favorite]:
     """Retrieve all favorites for a specific buyer by username.
 
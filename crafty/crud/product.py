@@ -1,17 +1,165 @@
 # crafty/crud/product.py
 
 import logging
-
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import partial
+from itertools import combinations
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import (Row, String, case, cast, func, insert, literal, select,
+                        tuple_, union_all, update)
+from sqlalchemy.dialects.mysql import match
 from sqlalchemy.exc import IntegrityError, NoResultFound
-from sqlalchemy.orm import Session
-
+from sqlalchemy.orm import Query, Session, selectinload
+
+from crafty.cache.hotkeys import get_hot_keys
+from crafty.cache.store import invalidate, read_through, refresh
+from crafty.config import get_settings
+from crafty.constants import ProductSort
+from crafty.db.coalesce import coalesced
+from crafty.db.models.join_tables import products_tags
 from crafty.db.models.product import Product, ProductImage
+from crafty.db.models.tag import Tag
+from crafty.db.models.user import Seller
+from crafty.db.models.versioning import utcnow
+from crafty.db.session import db_session, replica_reads
+from crafty.db.writes import insert_one, is_duplicate_key
 from crafty.exceptions import (NoProductsFoundError, ProductAlreadyExistsError,
                                ProductImageNotFoundError, ProductNotFoundError)
-from crafty.schemas.product import ProductCreate, ProductUpdate
+from crafty.pagination import decode_cursor, paginate
+from crafty.schemas.product import Product as ProductSchema
+from crafty.schemas.product import ProductBulkCreate, ProductCreate
+from crafty.schemas.product import ProductImage as ProductImageSchema
+from crafty.schemas.product import ProductUpdate
+from crafty.schemas.tag import Tag as TagSchema
+from crafty.search import product_index
 
 logger = logging.getLogger(__name__)
 
+# Relationships callers can ask the product getters to load
+PRODUCT_RELATIONSHIPS = {
+    "images": Product.images,
+    "tags": Product.tags,
+}
+
+# Relationships loaded when the caller does not ask for any
+DEFAULT_PRODUCT_RELATIONSHIPS = ("images",)
+
+# Columns product pages are sorted and keyed by
+PRODUCT_PAGE_KEY = (Product.id,)
+
+# Columns and direction of each sort order of the product list
+PRODUCT_SORTS = {
+    ProductSort.id: (PRODUCT_PAGE_KEY, False),
+    ProductSort.price_asc: ((Product.price, Product.id), False),
+    ProductSort.price_desc: ((Product.price, Product.id), True),
+}
+
+# Upper bounds (exclusive) of the price facet buckets, the last bucket is open
+PRICE_FACET_BOUNDS = (25, 50, 100, 250, 500, 1000)
+
+# Keys of search result pages, both sorted in descending order, and their types
+SEARCH_PAGE_KEY = ("relevance", "id")
+SEARCH_CURSOR_TYPES = ((int, float), (int,))
+
+# Number of ranked candidates the fallback search loads per query
+SEARCH_BATCH_SIZE = 100
+
+
+def product_loader_options(include: Iterable[str]) -> list:
+    """
+    Build the loader options for the requested product relationships.
+
+    Every relationship is loaded with a single SELECT ... IN query, so the
+    number of queries does not grow with the number of products loaded.
+
+    Args:
+        include (Iterable[str]): Names of the relationships to load.
+
+    Returns:
+        list: Loader options to pass to Query.options.
+
+    Raises:
+        ValueError: If an unknown relationship is requested.
+    """
+    unknown = set(include) - PRODUCT_RELATIONSHIPS.keys()
+    if unknown:
+        raise ValueError(f"Unknown product relationships: {sorted(unknown)}")
+    return [selectinload(PRODUCT_RELATIONSHIPS[name]) for name in include]
+
+
+def _filter_products(
+    query: Query,
+    seller_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+) -> Query:
+    """Restrict a product query to a seller, a tag name and a price range."""
+    if seller_id is not None:
+        query = query.filter(Product.seller_id == seller_id)
+    if tag is not None:
+        query = query.filter(Product.tags.any(Tag.name == tag))
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    return query
+
+
+def product_cache_key(product_id: int, include: Iterable[str]) -> str:
+    """Return the cache key of a product loaded with the given relationships."""
+    return f"product:{product_id}:{','.join(sorted(set(include)))}"
+
+
+def product_cache_keys(product_id: int) -> list[str]:
+    """Return the cache keys of a product for every combination of relationships."""
+    return [
+        product_cache_key(product_id, include)
+        for count in range(len(PRODUCT_RELATIONSHIPS) + 1)
+        for include in combinations(PRODUCT_RELATIONSHIPS, count)
+    ]
+
+
+def product_image_cache_key(image_id: int) -> str:
+    """Return the cache key of a product image."""
+    return f"product_image:{image_id}"
+
+
+def touch_products(db: Session, product_ids: Iterable[int]) -> None:
+    """
+    Bump the version and updated_at of products whose related rows changed.
+
+    Changes to images and tags don't update the products row, but they change
+    the product's representation, so its ETag has to change too. The caller
+    commits.
+
+    Args:
+        db (Session): The database session.
+        product_ids (Iterable[int]): The IDs of the changed products.
+    """
+    product_ids = set(product_ids)
+    if product_ids:
+        db.execute(
+            update(Product.__table__)
+            .where(Product.id.in_(product_ids))
+            .values(version=Product.version + 1, updated_at=utcnow())
+        )
+
+
+def product_page_key(sort: ProductSort) -> tuple[tuple, bool]:
+    """
+    Return the columns product pages are keyed by for a sort order.
+
+    Args:
+        sort (ProductSort): The sort order.
+
+    Returns:
+        tuple[tuple, bool]: The columns and whether they are sorted descending.
+    """
+    return PRODUCT_SORTS[sort]
+
 
 def create_product(db: Session, product: ProductCreate) -> Product:
     """
@@ -28,17 +176,14 @@ def create_product(db: Session, product: ProductCreate) -> Product:
         ProductAlreadyExistsError: If a product with the same name already exists.
     """
     try:
-        if db.query(Product).filter(Product.name == product.name).first():
-            raise ProductAlreadyExistsError(product.name)
-
-        db_product = Product(**product.dict())
-        db.add(db_product)
-        db.commit()
-        db.refresh(db_product)
+        # A new product has no images, listing none saves loading them
+        db_product = insert_one(db, Product(**product.model_dump(), images=[]))
+        product_index.add(db_product.id, db_product.name, db_product.description)
         return db_product
     except IntegrityError as e:
         logger.error(f"IntegrityError: {e}")
-        db.rollback()
+        if is_duplicate_key(e):
+            raise ProductAlreadyExistsError(product.name)
         raise
     except AttributeError as e:
         logger.error(f"AttributeError while creating product: {e}")
@@ -48,40 +193,370 @@ def create_product(db: Session, product: ProductCreate) -> Product:
         raise
 
 
-def get_product(db: Session, product_id: int) -> Product:
+def create_products(
+    db: Session, products: list[ProductBulkCreate], batch_size: Optional[int] = None
+) -> list[dict]:
+    """
+    Create many products with their images and tags in one transaction.
+
+    The names, sellers and tags of all products are checked up front, with one
+    query each. The valid products are then written batch_size at a time by
+    multi-row INSERT statements, followed by their images and tags. A batch
+    failing anyway, e.g. on a name taken concurrently, is rolled back to its
+    savepoint and written again one product at a time, so only the products
+    at fault fail.
+
+    Args:
+        db (Session): The database session.
+        products (list[ProductBulkCreate]): The products to create.
+        batch_size (int, optional): Products per INSERT. Defaults to
+            PRODUCT_BULK_BATCH_SIZE.
+
+    Returns:
+        list[dict]: The result of every product, in request order, holding
+            either the created product or the reason it was not created.
+    """
+    batch_size = batch_size or get_settings().product_bulk_batch_size
+    results = [
+        {"index": index, "product": None, "error": None}
+        for index in range(len(products))
+    ]
+    try:
+        tags = _check_bulk_products(db, products, results)
+        valid = [result["index"] for result in results if result["error"] is None]
+        updated_at = utcnow()
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start : start + batch_size]
+            try:
+                with db.begin_nested():
+                    _insert_products(db, products, batch, tags, updated_at, results)
+            except IntegrityError as e:
+                logger.warning(f"Retrying failed product batch one by one: {e}")
+                for index in batch:
+                    try:
+                        with db.begin_nested():
+                            _insert_products(
+                                db, products, [index], tags, updated_at, results
+                            )
+                    except IntegrityError as e:
+                        results[index]["error"] = (
+                            ProductAlreadyExistsError(products[index].name).message
+                            if is_duplicate_key(e)
+                            else str(e.orig)
+                        )
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error creating products: {e}")
+        db.rollback()
+        raise
+
+    for result in results:
+        product = result["product"]
+        if product is not None:
+            product_index.add(product["id"], product["name"], product["description"])
+    return results
+
+
+def _check_bulk_products(
+    db: Session, products: list[ProductBulkCreate], results: list[dict]
+) -> dict[str, TagSchema]:
     """
-    Retrieve a product by ID.
+    Record the error of every product that cannot be created in its result.
+
+    Returns:
+        dict[str, TagSchema]: The tags named by the products, by name.
+    """
+    names = {product.name for product in products}
+    taken = set(db.scalars(select(Product.name).where(Product.name.in_(names))))
+    seller_ids = {product.seller_id for product in products}
+    sellers = set(
+        db.scalars(select(Seller.user_id).where(Seller.user_id.in_(seller_ids)))
+    )
+    tag_names = {name for product in products for name in product.tags}
+    tags = {
+        tag.name: TagSchema.model_validate(tag)
+        for tag in db.scalars(select(Tag).where(Tag.name.in_(tag_names)))
+    }
+
+    for product, result in zip(products, results):
+        missing_tags = [name for name in product.tags if name not in tags]
+        if product.name in taken:
+            result["error"] = ProductAlreadyExistsError(product.name).message
+        elif product.seller_id not in sellers:
+            result["error"] = f"Seller with ID {product.seller_id} not found"
+        elif missing_tags:
+            result["error"] = f"Tags not found: {', '.join(missing_tags)}"
+        else:
+            # Later products with the same name are duplicates of this one
+            taken.add(product.name)
+    return tags
+
+
+def _insert_products(
+    db: Session,
+    products: list[ProductBulkCreate],
+    indexes: list[int],
+    tags: dict[str, TagSchema],
+    updated_at,
+    results: list[dict],
+) -> None:
+    """Insert the products at indexes, their images and tags, and fill their results."""
+    rows = [
+        {
+            **products[index].model_dump(exclude={"images", "tags"}),
+            "updated_at": updated_at,
+        }
+        for index in indexes
+    ]
+    db.execute(insert(Product), rows)
+    # Names are unique, which finds the new IDs on databases without RETURNING
+    ids = dict(
+        db.execute(
+            select(Product.name, Product.id).where(
+                Product.name.in_([row["name"] for row in rows])
+            )
+        ).all()
+    )
+
+    created = {}
+    for index, row in zip(indexes, rows):
+        product = products[index]
+        product_id = ids[row["name"]]
+        created[index] = {
+            **row,
+            "id": product_id,
+            "version": 1,
+            "images": [
+                {"image_url": url, "product_id": product_id} for url in product.images
+            ],
+            "tags": [tags[name] for name in dict.fromkeys(product.tags)],
+        }
+    images = [image for product in created.values() for image in product["images"]]
+    if images:
+        db.execute(insert(ProductImage), images)
+    product_tags = [
+        {"product_id": product["id"], "tag_id": tag.id}
+        for product in created.values()
+        for tag in product["tags"]
+    ]
+    if product_tags:
+        db.execute(insert(products_tags), product_tags)
+
+    for index, product in created.items():
+        results[index]["product"] = product
+
+
+@coalesced
+@replica_reads
+def get_product(
+    db: Session,
+    product_id: int,
+    include: Iterable[str] = DEFAULT_PRODUCT_RELATIONSHIPS,
+) -> ProductSchema:
+    """
+    Retrieve a product by ID, from the cache when possible.
 
     Args:
         db (Session): The database session.
         product_id (int): The ID of the product to retrieve.
+        include (Iterable[str], optional): Relationships to load. Defaults to images.
 
     Returns:
-        Product: The retrieved product object.
+        ProductSchema: The retrieved product.
 
     Raises:
         ProductNotFoundError: If no product with the given ID exists.
     """
-    product = db.query(Product).filter(Product.id == product_id).one_or_none()
+
+    key = product_cache_key(product_id, include)
+    product = read_through(
+        key, ProductSchema, lambda: _load_product(db, product_id, include)
+    )
+    get_hot_keys().record(key, partial(_refresh_product, product_id, tuple(include)))
+    return product
+
+
+def _load_product(db: Session, product_id: int, include: Iterable[str]) -> Product:
+    product = (
+        db.query(Product)
+        .options(*product_loader_options(include))
+        .filter(Product.id == product_id)
+        .one_or_none()
+    )
     if not product:
         logger.warning(f"Product with ID {product_id} not found")
         raise ProductNotFoundError(product_id)
     return product
 
 
-def get_products(db: Session, skip: int = 0, limit: int = 10) -> list[Product]:
+@replica_reads
+def _refresh_product(product_id: int, include: Iterable[str]) -> None:
+    """Reload the cache entry of a hot product ahead of its expiry."""
+    with db_session() as db:
+        refresh(
+            product_cache_key(product_id, include),
+            ProductSchema,
+            lambda: _load_product(db, product_id, include),
+        )
+
+
+@coalesced
+@replica_reads
+def get_product_version(db: Session, product_id: int) -> Row:
     """
-    Retrieve a list of products with optional pagination.
+    Retrieve the version of a product without loading the product.
+
+    Args:
+        db (Session): The database session.
+        product_id (int): The ID of the product.
+
+    Returns:
+        Row: The id, version and updated_at of the product.
+
+    Raises:
+        ProductNotFoundError: If no product with the given ID exists.
+    """
+    version = (
+        db.query(Product.id, Product.version, Product.updated_at)
+        .filter(Product.id == product_id)
+        .one_or_none()
+    )
+    if version is None:
+        raise ProductNotFoundError(product_id)
+    return version
+
+
+@coalesced
+@replica_reads
+def get_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    include: Iterable[str] = DEFAULT_PRODUCT_RELATIONSHIPS,
+    cursor: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    sort: ProductSort = ProductSort.id,
+) -> list[ProductSchema]:
+    """
+    Retrieve a filtered and sorted list of products with optional pagination.
+
+    The products are returned as schema objects, detached from the session, so
+    concurrent callers sharing the fetch can serialize them.
 
     Args:
         db (Session): The database session.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        include (Iterable[str], optional): Relationships to load. Defaults to images.
+        cursor (str, optional): Cursor returned with the previous page; when given,
+            skip is ignored. Defaults to None.
+        seller_id (int, optional): Only return products of this seller. Defaults to None.
+        tag (str, optional): Only return products with the tag of this name. Defaults to None.
+        min_price (int, optional): Lowest price to return, inclusive. Defaults to None.
+        max_price (int, optional): Highest price to return, inclusive. Defaults to None.
+        sort (ProductSort, optional): The sort order. Defaults to ProductSort.id.
 
     Returns:
-        list[Product]: List of product objects.
+        list[ProductSchema]: List of products.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
     """
-    return db.query(Product).offset(skip).limit(limit).all()
+    query = _filter_products(
+        db.query(Product).options(*product_loader_options(include)),
+        seller_id,
+        tag,
+        min_price,
+        max_price,
+    )
+    columns, descending = product_page_key(sort)
+    products = paginate(query, columns, cursor, skip, limit, descending).all()
+    return [
+        ProductSchema.model_validate(product, from_attributes=True)
+        for product in products
+    ]
+
+
+@coalesced
+@replica_reads
+def get_product_facets(
+    db: Session,
+    seller_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+) -> dict:
+    """
+    Count the products matching the filters per tag and per price bucket.
+
+    Both facets are computed by a single UNION ALL statement.
+
+    Args:
+        db (Session): The database session.
+        seller_id (int, optional): Only count products of this seller. Defaults to None.
+        tag (str, optional): Only count products with the tag of this name. Defaults to None.
+        min_price (int, optional): Lowest price to count, inclusive. Defaults to None.
+        max_price (int, optional): Highest price to count, inclusive. Defaults to None.
+
+    Returns:
+        dict: The tag counts under "tags" and the price bucket counts under "prices".
+    """
+    products = _filter_products(
+        db.query(Product.id, Product.price), seller_id, tag, min_price, max_price
+    ).subquery()
+
+    tag_counts = (
+        select(
+            literal("tag").label("facet"),
+            Tag.name.label("value"),
+            func.count().label("count"),
+        )
+        .select_from(products)
+        .join(products_tags, products_tags.c.product_id == products.c.id)
+        .join(Tag, Tag.id == products_tags.c.tag_id)
+        .group_by(Tag.name)
+    )
+    bucket = case(
+        *(
+            (products.c.price < bound, index)
+            for index, bound in enumerate(PRICE_FACET_BOUNDS)
+        ),
+        else_=len(PRICE_FACET_BOUNDS),
+    )
+    price_counts = (
+        select(
+            literal("price").label("facet"),
+            cast(bucket, String).label("value"),
+            func.count().label("count"),
+        )
+        .select_from(products)
+        .group_by(bucket)
+    )
+
+    # Bound to the mapper so the statement may be routed to a replica
+    statement = union_all(tag_counts, price_counts)
+    rows = db.execute(statement, bind_arguments={"mapper": Product.__mapper__}).all()
+
+    bounds = (0, *PRICE_FACET_BOUNDS, None)
+    facets = {"tags": [], "prices": []}
+    for facet, value, count in rows:
+        if facet == "tag":
+            facets["tags"].append({"name": value, "count": count})
+        else:
+            index = int(value)
+            facets["prices"].append(
+                {
+                    "min_price": bounds[index],
+                    "max_price": bounds[index + 1],
+                    "count": count,
+                }
+            )
+    facets["tags"].sort(key=lambda item: (-item["count"], item["name"]))
+    facets["prices"].sort(key=lambda item: item["min_price"])
+    return facets
 
 
 def update_product(
@@ -100,16 +575,30 @@ def update_product(
 
     Raises:
         ProductNotFoundError: If the product with the given ID does not exist.
+        ProductAlreadyExistsError: If another product has the new name.
     """
-    db_product = db.query(Product).filter(Product.id == product_id).one_or_none()
+    db_product = (
+        db.query(Product)
+        .options(*product_loader_options(DEFAULT_PRODUCT_RELATIONSHIPS))
+        .filter(Product.id == product_id)
+        .one_or_none()
+    )
     if db_product is None:
         raise ProductNotFoundError(product_id)
 
     for field, value in product_update.dict(exclude_unset=True).items():
         setattr(db_product, field, value)
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if is_duplicate_key(e):
+            raise ProductAlreadyExistsError(product_update.name)
+        raise
     db.refresh(db_product)
+    invalidate(product_cache_keys(product_id))
+    product_index.add(db_product.id, db_product.name, db_product.description)
     return db_product
 
 
@@ -128,8 +617,14 @@ def delete_product(db: Session, product_id: int):
     if db_product is None:
         raise ProductNotFoundError(product_id)
 
+    image_ids = [image.id for image in db_product.images]
     db.delete(db_product)
     db.commit()
+    invalidate(
+        product_cache_keys(product_id)
+        + [product_image_cache_key(image_id) for image_id in image_ids]
+    )
+    product_index.remove(product_id)
 
 
 def create_product_image(db: Session, image_url: str, product_id: int) -> ProductImage:
@@ -152,34 +647,50 @@ def create_product_image(db: Session, image_url: str, product_id: int) -> Produc
 
     db_product_image = ProductImage(image_url=image_url, product_id=product_id)
     db.add(db_product_image)
+    touch_products(db, [product_id])
     db.commit()
     db.refresh(db_product_image)
+    invalidate(product_cache_keys(product_id))
     return db_product_image
 
 
-def get_product_image(db: Session, image_id: int) -> ProductImage:
+@coalesced
+@replica_reads
+def get_product_image(db: Session, image_id: int) -> ProductImageSchema:
     """
-    Retrieve a product image by ID.
+    Retrieve a product image by ID, from the cache when possible.
 
     Args:
         db (Session): The database session.
         image_id (int): The ID of the image to retrieve.
 
     Returns:
-        ProductImage: The retrieved product image object.
+        ProductImageSchema: The retrieved product image.
 
     Raises:
         ProductImageNotFoundError: If no image with the given ID exists.
     """
-    product_image = (
-        db.query(ProductImage).filter(ProductImage.id == image_id).one_or_none()
-    )
-    if not product_image:
-        raise ProductImageNotFoundError(image_id)
-    return product_image
-
 
-def get_products_by_seller(db: Session, seller_id: int, skip: int = 0, limit: int = 10):
+    def load():
+        product_image = (
+            db.query(ProductImage).filter(ProductImage.id == image_id).one_or_none()
+        )
+        if not product_image:
+            raise ProductImageNotFoundError(image_id)
+        return product_image
+
+    return read_through(product_image_cache_key(image_id), ProductImageSchema, load)
+
+
+@replica_reads
+def get_products_by_seller(
+    db: Session,
+    seller_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    include: Iterable[str] = DEFAULT_PRODUCT_RELATIONSHIPS,
+    cursor: Optional[str] = None,
+):
     """
     Retrieve all products associated with a specific seller.
 
@@ -188,22 +699,26 @@ def get_products_by_seller(db: Session, seller_id: int, skip: int = 0, limit: in
         seller_id (int): The ID of the seller whose products to retrieve.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        include (Iterable[str], optional): Relationships to load. Defaults to images.
+        cursor (str, optional): Cursor returned with the previous page; when given,
+            skip is ignored. Defaults to None.
 
     Returns:
         List[Product]: A list of products associated with the specified seller.
 
     Raises:
-        NoProductsFoundError: If no products are found for the seller.
+        NoProductsFoundError: If the first page of products of the seller is empty.
+        InvalidCursorError: If the cursor cannot be decoded.
     """
     try:
-        products = (
+        query = (
             db.query(Product)
+            .options(*product_loader_options(include))
             .filter(Product.seller_id == seller_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
-        if not products:
+        products = paginate(query, PRODUCT_PAGE_KEY, cursor, skip, limit).all()
+        # Running past the last page with a cursor is not an error
+        if not products and cursor is None:
             raise NoProductsFoundError(seller_id)
         return products
     except AttributeError as e:
@@ -216,3 +731,162 @@ def get_products_by_seller(db: Session, seller_id: int, skip: int = 0, limit: in
             f"Unexpected error while retrieving products for seller {seller_id}: {e}"
         )
         raise
+
+
+def _fulltext_search(query: Query, q: str, limit: int, after: Optional[list]):
+    """Rank products with the MySQL FULLTEXT index on name and description."""
+    relevance = match(Product.name, Product.description, against=q)
+    query = query.add_columns(relevance.label("relevance")).filter(relevance > 0)
+    if after is not None:
+        query = query.filter(tuple_(relevance, Product.id) < tuple_(*after))
+    rows = query.order_by(relevance.desc(), Product.id.desc()).limit(limit).all()
+    return [(product, relevance) for product, relevance in rows]
+
+
+def _index_search(db: Session, query: Query, q: str, limit: int, after: Optional[list]):
+    """Rank products with the in-process inverted index."""
+    documents = db.query(Product.id, Product.name, Product.description)
+    product_index.build(lambda: documents.yield_per(1000))
+    ranked = [
+        (product_id, relevance)
+        for product_id, relevance in product_index.search(q)
+        if after is None or (relevance, product_id) < tuple(after)
+    ]
+
+    # The filters are applied by the database, batch by batch of candidates
+    results = []
+    for start in range(0, len(ranked), SEARCH_BATCH_SIZE):
+        batch = ranked[start : start + SEARCH_BATCH_SIZE]
+        products = {
+            product.id: product
+            for product in query.filter(
+                Product.id.in_([product_id for product_id, _ in batch])
+            )
+        }
+        results.extend(
+            (products[product_id], relevance)
+            for product_id, relevance in batch
+            if product_id in products
+        )
+        if len(results) >= limit:
+            break
+    return results[:limit]
+
+
+@replica_reads
+def search_products(
+    db: Session,
+    q: str,
+    seller_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include: Iterable[str] = DEFAULT_PRODUCT_RELATIONSHIPS,
+) -> list[tuple[Product, float]]:
+    """
+    Search products by name and description, most relevant first.
+
+    MySQL ranks the products with the FULLTEXT index on name and description.
+    Other databases fall back to an in-process inverted index.
+
+    Pages are keyed by relevance and then product ID, so products with the same
+    score are never skipped or repeated. Scores are a snapshot: they are
+    computed again for every page from the current index, and writes between
+    two pages change them, which can move a product across the cursor.
+
+    Args:
+        db (Session): The database session.
+        q (str): The search query; products matching any of its words are returned.
+        seller_id (int, optional): Only return products of this seller. Defaults to None.
+        tag (str, optional): Only return products with the tag of this name. Defaults to None.
+        limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): Cursor returned with the previous page. Defaults to None.
+        include (Iterable[str], optional): Relationships to load. Defaults to images.
+
+    Returns:
+        list[tuple[Product, float]]: The products with their relevance.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor, SEARCH_PAGE_KEY, SEARCH_CURSOR_TYPES)
+    query = _filter_products(
+        db.query(Product).options(*product_loader_options(include)), seller_id, tag
+    )
+    if db.get_bind().dialect.name == "mysql":
+        return _fulltext_search(query, q, limit, after)
+    return _index_search(db, query, q, limit, after)
+
+
+# Columns of exported products, selected as plain rows the session does not keep
+EXPORT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.seller_id,
+    Product.version,
+    Product.updated_at,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS) + ("images", "tags")
+
+
+def export_products(
+    db: Session,
+    side_db: Session,
+    since: Optional[datetime] = None,
+    batch_size: int = 1000,
+) -> Iterator[list[dict]]:
+    """
+    Stream the product catalog with images and tags, in batches.
+
+    The products are read through a server-side cursor, batch_size rows per
+    fetch, as plain rows that never enter the identity map, so neither the
+    driver nor the session holds more than a batch. The images and the tags
+    of every batch are read by one query each on side_db, as MySQL cannot run
+    other statements on a connection while a server-side cursor is open.
+
+    Args:
+        db (Session): The session streaming the products.
+        side_db (Session): The session reading images and tags.
+        since (datetime, optional): Only export the products updated at or after
+            this time, including changes to their images and tags. Naive times
+            are taken as UTC.
+        batch_size (int): Products per batch.
+
+    Yields:
+        list[dict]: The next products by ID, with the URLs of their images and
+            the names of their tags.
+    """
+    statement = select(*EXPORT_COLUMNS).order_by(Product.id)
+    if since is not None:
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        statement = statement.where(Product.updated_at >= since)
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+
+    for partition in result.mappings().partitions():
+        products = [dict(row) for row in partition]
+        ids = [product["id"] for product in products]
+        images = defaultdict(list)
+        for product_id, image_url in side_db.execute(
+            select(ProductImage.product_id, ProductImage.image_url)
+            .where(ProductImage.product_id.in_(ids))
+            .order_by(ProductImage.id)
+        ):
+            images[product_id].append(image_url)
+        tags = defaultdict(list)
+        for product_id, name in side_db.execute(
+            select(products_tags.c.product_id, Tag.name)
+            .join(Tag, Tag.id == products_tags.c.tag_id)
+            .where(products_tags.c.product_id.in_(ids))
+            .order_by(Tag.name)
+        ):
+            tags[product_id].append(name)
+
+        for product in products:
+            product["images"] = images[product["id"]]
+            product["tags"] = tags[product["id"]]
+        yield products
@@ -1,26 +1,41 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.orm import Session
 
+from crafty.constants import OnConflict
+from crafty.db.coalesce import coalesced
 from crafty.db.models.review import Review
+from crafty.db.session import replica_reads
+from crafty.db.writes import insert_one, is_duplicate_key, upsert_one
 from crafty.exceptions import ReviewAlreadyExistsError, ReviewNotFoundError
+from crafty.pagination import paginate
+from crafty.schemas.review import Review as ReviewSchema
 from crafty.schemas.review import ReviewCreate
 
 logger = logging.getLogger(__name__)
 
+# Columns review pages are sorted and keyed by
+REVIEW_PAGE_KEY = (Review.id,)
 
-def create_review(db: Session, review: ReviewCreate) -> Review:
+
+def create_review(
+    db: Session, review: ReviewCreate, on_conflict: OnConflict = OnConflict.error
+) -> Review:
     """
     Create a new review in the database.
 
-    This function checks if a review already exists for the specified reviewer,
-    reviewed user, and product. If it exists, a ReviewAlreadyExistsError is raised.
+    The review is inserted right away, a review that already exists for the
+    specified reviewer, reviewed user, and product is detected by the unique
+    constraint on them.
 
     Args:
         db (Session): The database session used for the operation.
         review (ReviewCreate): The review data to be created.
+        on_conflict (OnConflict): What to do when the review already exists,
+            raise by default, return it unchanged or overwrite its rating and
+            comment.
 
     Returns:
         Review: The created review object.
@@ -31,39 +46,30 @@ def create_review(db: Session, review: ReviewCreate) -> Review:
         Exception: If any unexpected error occurs during the operation.
     """
     try:
-        existing_review = (
-            db.query(Review)
-            .filter(
-                Review.reviewer_id == review.reviewer_id,
-                Review.reviewed_user_id == review.reviewed_user_id,
-                Review.product_id == review.product_id,
+        if on_conflict != OnConflict.error:
+            return upsert_one(
+                db,
+                Review,
+                review.model_dump(),
+                ("reviewer_id", "reviewed_user_id", "product_id"),
+                on_conflict,
             )
-            .one_or_none()
-        )
-        if existing_review:
+        return insert_one(db, Review(**review.model_dump()))
+    except IntegrityError as e:
+        logger.error(f"IntegrityError while creating review: {e}")
+        if is_duplicate_key(e):
             raise ReviewAlreadyExistsError(
                 f"Review already exists for user {review.reviewer_id} on product {review.product_id}."
             )
-
-        db_review = Review(**review.model_dump())
-        db.add(db_review)
-        db.commit()
-        db.refresh(db_review)
-        return db_review
-    except IntegrityError as e:
-        logger.error(f"IntegrityError while creating review: {e}")
-        db.rollback()
-        raise ReviewAlreadyExistsError(
-            f"Review already exists for user {review.reviewer_id} on product {review.product_id}."
-        )
+        raise
     except Exception as e:
-        breakpoint()
         logger.error(f"Unexpected error while creating review: {e}")
-        db.rollback()
         raise
 
 
-def get_review(db: Session, review_id: int) -> Review:
+@coalesced
+@replica_reads
+def get_review(db: Session, review_id: int) -> ReviewSchema:
     """
     Retrieve a review from the database by its ID.
 
@@ -72,18 +78,23 @@ def get_review(db: Session, review_id: int) -> Review:
         review_id (int): The ID of the review to be retrieved.
 
     Returns:
-        Review: The retrieved review object.
+        ReviewSchema: The retrieved review, detached from the session.
 
     Raises:
         ReviewNotFoundError: If no review with the specified ID is found.
     """
     try:
-        return db.query(Review).filter(Review.id == review_id).one()
+        review = db.query(Review).filter(Review.id == review_id).one()
+        return ReviewSchema.model_validate(review)
     except NoResultFound:
         raise ReviewNotFoundError(review_id)
 
 
-def get_reviews(db: Session, skip: int = 0, limit: int = 10) -> List[Review]:
+@coalesced
+@replica_reads
+def get_reviews(
+    db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None
+) -> List[ReviewSchema]:
     """
     Retrieve a list of reviews from the database with optional pagination.
 
@@ -91,11 +102,17 @@ def get_reviews(db: Session, skip: int = 0, limit: int = 10) -> List[Review]:
         db (Session): The database session used for the operation.
         skip (int, optional): The number of records to skip. Defaults to 0.
         limit (int, optional): The maximum number of records to return. Defaults to 10.
+        cursor (str, optional): Cursor returned with the previous page; when given,
+            skip is ignored. Defaults to None.
 
     Returns:
-        List[Review]: A list of review objects.
+        List[ReviewSchema]: A list of reviews, detached from the session.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
     """
-    return db.query(Review).offset(skip).limit(limit).all()
+    reviews = paginate(db.query(Review), REVIEW_PAGE_KEY, cursor, skip, limit).all()
+    return [ReviewSchema.model_validate(review) for review in reviews]
 
 
 def delete_review(db: Session, review_id: int) -> None:
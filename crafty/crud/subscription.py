@@ -1,15 +1,21 @@
 import logging
+from typing import Optional
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from crafty.db.models.subscription import Subscription
+from crafty.db.session import replica_reads
 from crafty.exceptions import (SubscriptionAlreadyExistsError,
                                SubscriptionNotFoundError)
+from crafty.pagination import paginate
 from crafty.schemas.subscription import SubscriptionCreate
 
 logger = logging.getLogger(__name__)
 
+# Columns subscription pages are sorted and keyed by
+SUBSCRIPTION_PAGE_KEY = (Subscription.id,)
+
 
 def create_subscription(db: Session, subscription: SubscriptionCreate) -> Subscription:
     """
@@ -41,6 +47,7 @@ def create_subscription(db: Session, subscription: SubscriptionCreate) -> Subscr
         raise
 
 
+@replica_reads
 def get_subscription(db: Session, subscription_id: int) -> Subscription:
     """
     Retrieve a subscription by ID.
@@ -63,8 +70,9 @@ def get_subscription(db: Session, subscription_id: int) -> Subscription:
     return subscription
 
 
+@replica_reads
 def get_subscriptions(
-    db: Session, skip: int = 0, limit: int = 10
+    db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None
 ) -> list[Subscription]:
     """
     Retrieve a list of subscriptions with optional pagination.
@@ -73,8 +81,14 @@ def get_subscriptions(
         db (Session): The database session.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): Cursor returned with the previous page; when given,
+            skip is ignored. Defaults to None.
 
     Returns:
         list[Subscription]: List of subscription objects.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
     """
-    return db.query(Subscription).offset(skip).limit(limit).all()
+    query = db.query(Subscription)
+    return paginate(query, SUBSCRIPTION_PAGE_KEY, cursor, skip, limit).all()
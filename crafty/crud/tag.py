@@ -1,60 +1,151 @@
+import bisect
 import logging
-from typing import List
+from typing import Iterable, List, Optional
 
+from sqlalchemy import delete, tuple_
 from sqlalchemy.exc import IntegrityError, NoResultFound
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
+from crafty.cache.hotkeys import get_hot_keys
+from crafty.cache.store import invalidate, on_invalidate
+from crafty.cache.tags import TagDictionary
+from crafty.config import get_settings
+from crafty.constants import OnConflict
+from crafty.crud.product import (DEFAULT_PRODUCT_RELATIONSHIPS,
+                                 PRODUCT_PAGE_KEY, product_cache_keys,
+                                 product_loader_options, touch_products)
+from crafty.db.models.join_tables import products_tags
+from crafty.db.models.product import Product
 from crafty.db.models.tag import Tag
-from crafty.exceptions import TagAlreadyExistsError, TagNotFoundError
+from crafty.db.session import replica_reads
+from crafty.db.statements import insert_ignoring_duplicates
+from crafty.db.writes import insert_one, is_duplicate_key, upsert_one
+from crafty.exceptions import (ProductNotFoundError, TagAlreadyExistsError,
+                               TagNotFoundError)
+from crafty.pagination import cursor_types, decode_cursor, paginate
+from crafty.schemas.tag import ProductTagsUpdate
+from crafty.schemas.tag import Tag as TagSchema
 from crafty.schemas.tag import TagCreate
 
 logger = logging.getLogger(__name__)
 
+# Columns tag pages are sorted and keyed by
+TAG_PAGE_KEY = (Tag.id,)
 
-def create_tag(db: Session, tag: TagCreate) -> Tag:
-    """Create a new tag in the database."""
-    try:
-        existing_tag = db.query(Tag).filter(Tag.name == tag.name).first()
-        if existing_tag:
-            raise TagAlreadyExistsError(tag.name)
+# Maximum number of (product, tag) rows written by one statement
+PRODUCT_TAGS_BATCH_SIZE = 500
 
-        db_tag = Tag(**tag.model_dump())
-        db.add(db_tag)
-        db.commit()
-        db.refresh(db_tag)
+# Tags of the database, answering the tag lookups of this process
+tag_dictionary = TagDictionary(get_settings().tag_dictionary_ttl)
+
+# Cache key invalidated by tag writes, reloads the tag dictionary of every process
+TAG_DICTIONARY_KEY = "tags"
+
+
+def _follow_tag_writes(keys: Optional[list[str]]) -> None:
+    if keys is None or TAG_DICTIONARY_KEY in keys:
+        tag_dictionary.invalidate()
+
+
+on_invalidate(_follow_tag_writes)
+
+
+@replica_reads
+def _load_tags(db: Session) -> list[TagSchema]:
+    return [TagSchema.model_validate(tag) for tag in db.query(Tag)]
+
+
+def load_tag_dictionary(db: Session) -> None:
+    """Load every tag into the tag dictionary, e.g. at startup."""
+    tag_dictionary.replace(_load_tags(db))
+
+
+def _tags(db: Session) -> TagDictionary:
+    """Return the tag dictionary, loading it first when it is stale."""
+    tag_dictionary.ensure(lambda: _load_tags(db))
+    return tag_dictionary
+
+
+@replica_reads
+def _find_tag(db: Session, tag_filter, identifier) -> TagSchema:
+    """
+    Look up a tag missing from the tag dictionary in the database.
+
+    The tag may have been created by another process since the dictionary was
+    loaded, in which case the dictionary is reloaded on the next lookup. Tags
+    the dictionary already holds, e.g. found by a name differing in a way the
+    database collation ignores, do not reload it.
+    """
+    tag = db.query(Tag).filter(tag_filter).one_or_none()
+    if tag is None:
+        raise TagNotFoundError(identifier)
+    if tag_dictionary.get(tag.id) is None:
+        tag_dictionary.invalidate()
+    return TagSchema.model_validate(tag)
+
+
+def create_tag(
+    db: Session, tag: TagCreate, on_conflict: OnConflict = OnConflict.error
+) -> Tag:
+    """Create a new tag, or return the existing one when on_conflict allows it."""
+    try:
+        if on_conflict != OnConflict.error:
+            db_tag = upsert_one(db, Tag, tag.model_dump(), ("name",), on_conflict)
+        else:
+            db_tag = insert_one(db, Tag(**tag.model_dump()))
+        invalidate([TAG_DICTIONARY_KEY])
         return db_tag
     except IntegrityError as e:
         logger.error(f"IntegrityError while creating tag: {e}")
-        db.rollback()
-        raise TagAlreadyExistsError(tag.name)
+        if is_duplicate_key(e):
+            raise TagAlreadyExistsError(tag.name)
+        raise
     except Exception as e:
         logger.error(f"Unexpected error while creating tag: {e}")
-        db.rollback()
         raise
 
 
-def get_tag(db: Session, tag_id: int) -> Tag:
-    """Retrieve a tag by ID."""
-    try:
-        return db.query(Tag).filter(Tag.id == tag_id).one()
-    except NoResultFound:
-        raise TagNotFoundError(tag_id)
+def get_tag(db: Session, tag_id: int) -> TagSchema:
+    """Retrieve a tag by ID from the tag dictionary."""
+    tag = _tags(db).get(tag_id)
+    if tag is None:
+        tag = _find_tag(db, Tag.id == tag_id, tag_id)
+    # Tags are in memory anyway, they are only counted
+    get_hot_keys().record(f"tag:{tag.id}")
+    return tag
 
 
-def get_tag_by_name(db: Session, tag_name: str) -> Tag:
-    """Retrieve a tag by name."""
-    try:
-        return db.query(Tag).filter(Tag.name == tag_name).one()
-    except NoResultFound:
-        raise TagNotFoundError(tag_name)
+def get_tag_by_name(db: Session, tag_name: str) -> TagSchema:
+    """
+    Retrieve a tag by name from the tag dictionary.
+
+    Names are matched exactly, else ignoring case as the database collation
+    usually does.
+    """
+    tag = _tags(db).get_by_name(tag_name)
+    if tag is None:
+        tag = _find_tag(db, Tag.name == tag_name, tag_name)
+    get_hot_keys().record(f"tag:{tag.id}")
+    return tag
 
 
 def delete_tag(db: Session, tag_id: int) -> None:
     """Delete a tag by ID."""
     try:
         tag = db.query(Tag).filter(Tag.id == tag_id).one()
+        # Deleting the tag detaches it from its products
+        product_ids = [product.id for product in tag.products]
         db.delete(tag)
+        touch_products(db, product_ids)
         db.commit()
+        invalidate(
+            [TAG_DICTIONARY_KEY]
+            + [
+                key
+                for product_id in product_ids
+                for key in product_cache_keys(product_id)
+            ]
+        )
     except NoResultFound:
         raise TagNotFoundError(tag_id)
     except Exception as e:
@@ -63,6 +154,191 @@ def delete_tag(db: Session, tag_id: int) -> None:
         raise
 
 
-def get_tags(db: Session, skip: int = 0, limit: int = 10) -> List[Tag]:
-    """Retrieve a list of tags with optional pagination."""
-    return db.query(Tag).offset(skip).limit(limit).all()
+def get_tags(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    prefix: Optional[str] = None,
+) -> List[TagSchema]:
+    """
+    Retrieve a page of tags from the tag dictionary, sorted by ID.
+
+    Args:
+        db (Session): The database session, used when the dictionary is stale.
+        skip (int, optional): The number of records to skip when no cursor is
+            given, negative values count as 0. Defaults to 0.
+        limit (int, optional): The maximum number of records to return. Defaults to 10.
+        cursor (str, optional): Cursor returned with the previous page. Defaults to None.
+        prefix (str, optional): Only return tags whose name starts with prefix,
+            ignoring case. Defaults to None.
+
+    Returns:
+        List[TagSchema]: The tags of the page.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    tags = _tags(db)
+    matches = tags.all() if prefix is None else tags.with_prefix(prefix)
+    if cursor is not None:
+        (after,) = decode_cursor(
+            cursor, [column.key for column in TAG_PAGE_KEY], cursor_types(TAG_PAGE_KEY)
+        )
+        start = bisect.bisect_right(matches, after, key=lambda tag: tag.id)
+    else:
+        start = max(skip, 0)
+    return matches[start : start + limit]
+
+
+def _check_product_tags(db: Session, updates: List[ProductTagsUpdate]) -> list[dict]:
+    """
+    Expand tag updates into products_tags rows after checking the ids exist.
+
+    Raises:
+        ProductNotFoundError: If a product does not exist.
+        TagNotFoundError: If a tag does not exist.
+    """
+    product_ids = {update.product_id for update in updates}
+    tag_ids = {tag_id for update in updates for tag_id in update.tag_ids}
+
+    products = db.query(Product.id).filter(Product.id.in_(product_ids))
+    missing = product_ids - {product_id for product_id, in products}
+    if missing:
+        raise ProductNotFoundError(min(missing))
+    tags = db.query(Tag.id).filter(Tag.id.in_(tag_ids))
+    missing = tag_ids - {tag_id for tag_id, in tags}
+    if missing:
+        raise TagNotFoundError(min(missing))
+
+    # Sorted so concurrent writers lock the rows in the same order
+    rows = sorted(
+        {(update.product_id, tag_id) for update in updates for tag_id in update.tag_ids}
+    )
+    return [{"product_id": product_id, "tag_id": tag_id} for product_id, tag_id in rows]
+
+
+def _product_tag_sets(db: Session, product_ids: Iterable[int]) -> list[Product]:
+    """Load the products with their tags, ordered by product ID."""
+    return (
+        db.query(Product)
+        .options(selectinload(Product.tags))
+        .filter(Product.id.in_(set(product_ids)))
+        .order_by(Product.id)
+        .all()
+    )
+
+
+def _invalidate_products(updates: List[ProductTagsUpdate]) -> None:
+    """Drop the cached products whose tags were updated."""
+    invalidate(
+        key
+        for product_id in {update.product_id for update in updates}
+        for key in product_cache_keys(product_id)
+    )
+
+
+def attach_tags(db: Session, updates: List[ProductTagsUpdate]) -> list[dict]:
+    """
+    Attach tags to products, leaving tags that are already attached in place.
+
+    The rows are written with multi-row INSERT statements ignoring duplicate
+    keys, PRODUCT_TAGS_BATCH_SIZE rows at a time, in a single transaction.
+
+    Args:
+        db (Session): The database session.
+        updates (List[ProductTagsUpdate]): The tags to attach to each product.
+
+    Returns:
+        list[dict]: The resulting tags of every updated product.
+
+    Raises:
+        ProductNotFoundError: If a product does not exist.
+        TagNotFoundError: If a tag does not exist.
+    """
+    try:
+        rows = _check_product_tags(db, updates)
+        for start in range(0, len(rows), PRODUCT_TAGS_BATCH_SIZE):
+            batch = rows[start : start + PRODUCT_TAGS_BATCH_SIZE]
+            db.execute(insert_ignoring_duplicates(db, products_tags, batch))
+        touch_products(db, (update.product_id for update in updates))
+        db.commit()
+    except IntegrityError as e:
+        logger.error(f"IntegrityError while attaching tags: {e}")
+        db.rollback()
+        raise
+    _invalidate_products(updates)
+    products = _product_tag_sets(db, (update.product_id for update in updates))
+    return [{"product_id": product.id, "tags": product.tags} for product in products]
+
+
+def detach_tags(db: Session, updates: List[ProductTagsUpdate]) -> list[dict]:
+    """
+    Detach tags from products, ignoring tags that are not attached.
+
+    Args:
+        db (Session): The database session.
+        updates (List[ProductTagsUpdate]): The tags to detach from each product.
+
+    Returns:
+        list[dict]: The resulting tags of every updated product.
+
+    Raises:
+        ProductNotFoundError: If a product does not exist.
+        TagNotFoundError: If a tag does not exist.
+    """
+    rows = _check_product_tags(db, updates)
+    for start in range(0, len(rows), PRODUCT_TAGS_BATCH_SIZE):
+        batch = rows[start : start + PRODUCT_TAGS_BATCH_SIZE]
+        db.execute(
+            delete(products_tags).where(
+                tuple_(products_tags.c.product_id, products_tags.c.tag_id).in_(
+                    [(row["product_id"], row["tag_id"]) for row in batch]
+                )
+            )
+        )
+    touch_products(db, (update.product_id for update in updates))
+    db.commit()
+    _invalidate_products(updates)
+    products = _product_tag_sets(db, (update.product_id for update in updates))
+    return [{"product_id": product.id, "tags": product.tags} for product in products]
+
+
+@replica_reads
+def get_tag_products(
+    db: Session,
+    tag_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include: Iterable[str] = DEFAULT_PRODUCT_RELATIONSHIPS,
+) -> list[Product]:
+    """
+    Retrieve the products with a tag, walking the (tag_id, product_id) index.
+
+    Args:
+        db (Session): The database session.
+        tag_id (int): The ID of the tag.
+        skip (int, optional): Number of records to skip. Defaults to 0.
+        limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): Cursor returned with the previous page; when given,
+            skip is ignored. Defaults to None.
+        include (Iterable[str], optional): Relationships to load. Defaults to images.
+
+    Returns:
+        list[Product]: List of product objects.
+
+    Raises:
+        TagNotFoundError: If no tag with the given ID exists.
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    if not db.query(Tag.id).filter(Tag.id == tag_id).one_or_none():
+        raise TagNotFoundError(tag_id)
+
+    query = (
+        db.query(Product)
+        .options(*product_loader_options(include))
+        .join(products_tags, products_tags.c.product_id == Product.id)
+        .filter(products_tags.c.tag_id == tag_id)
+    )
+    return paginate(query, PRODUCT_PAGE_KEY, cursor, skip, limit).all()
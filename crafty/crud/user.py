@@ -1,77 +1,505 @@
 import logging
-from typing import List
+import threading
+from functools import partial
+from typing import List, Optional
 
+from pydantic import ValidationError
+from sqlalchemy import Row, bindparam, insert, or_, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from crafty.cache.bloom import CountingBloomFilter
+from crafty.cache.hotkeys import get_hot_keys
+from crafty.cache.store import (get_cache, invalidate, on_invalidate,
+                                read_through, refresh)
+from crafty.config import get_settings
 from crafty.constants import SubscriptionLevel, UserType
+from crafty.db.coalesce import coalesced
 from crafty.db.models.user import Buyer, Seller, User
+from crafty.db.models.versioning import utcnow
+from crafty.db.session import db_session, replica_reads
+from crafty.db.writes import insert_one, is_duplicate_key
 from crafty.exceptions import (InvalidUserTypeError, UserAlreadyExistsError,
                                UserNotFoundError)
-from crafty.schemas.user import UserCreate
+from crafty.importing import ImportRow
+from crafty.pagination import paginate
+from crafty.schemas.user import UserCreate, UserResponse
 
 logger = logging.getLogger(__name__)
 
+# Columns user pages are sorted and keyed by
+USER_PAGE_KEY = (User.id,)
 
-def create_user(db: Session, user: UserCreate) -> User:
-    """Create a new user in the database."""
-    try:
-        if db.query(User).filter(User.username == user.username).first():
-            raise UserAlreadyExistsError(user.username, "username")
-        if db.query(User).filter(User.email == user.email).first():
-            raise UserAlreadyExistsError(user.email, "email")
-
-        db_user = (
-            Buyer(**user.model_dump())
-            if user.user_type == UserType.buyer
-            else Seller(**user.model_dump())
+# Statements looking up a user by each identifier type, built once
+_USER_COLUMNS = {
+    "id": User.id,
+    "username": User.username,
+    "email": User.email,
+}
+_USER_LOOKUPS = {
+    identifier_type: select(User).where(column == bindparam("identifier"))
+    for identifier_type, column in _USER_COLUMNS.items()
+}
+_USER_VERSION_LOOKUPS = {
+    identifier_type: select(User.id, User.version, User.updated_at).where(
+        column == bindparam("identifier")
+    )
+    for identifier_type, column in _USER_COLUMNS.items()
+}
+_USER_EXISTS = {
+    identifier_type: select(User.id).where(column == bindparam("identifier")).limit(1)
+    for identifier_type, column in _USER_COLUMNS.items()
+}
+
+# Usernames and emails of every user, checked before the database when
+# looking for free ones
+user_identifiers = CountingBloomFilter(2 * get_settings().user_filter_capacity)
+
+# Rows fetched per round trip while the filter is built
+USER_FILTER_SCAN_BATCH_SIZE = 1000
+
+# Identifier types kept in the filter
+_FILTERED = ("username", "email")
+
+
+def _filter_value(identifier_type: str, identifier: str) -> str:
+    # Case-folded, so values the database collation considers equal are never
+    # reported free
+    return f"{identifier_type}:{identifier.casefold()}"
+
+
+@replica_reads
+def load_user_filter(db: Session) -> None:
+    """Build the username and email filter with a streaming scan of the users."""
+    rows = db.execute(
+        select(User.username, User.email).execution_options(
+            yield_per=USER_FILTER_SCAN_BATCH_SIZE
+        )
+    )
+    user_identifiers.build(
+        value
+        for username, email in rows
+        for value in (
+            _filter_value("username", username),
+            _filter_value("email", email),
         )
-        if user.user_type == UserType.seller:
-            db_user.subscription_level = SubscriptionLevel.basic
+    )
 
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+
+def _rebuild_user_filter() -> None:
+    try:
+        with db_session() as db:
+            load_user_filter(db)
+    except Exception as e:
+        logger.error(f"Could not rebuild the username and email filter: {e}")
+
+
+def _follow_user_writes(keys: Optional[list[str]]) -> None:
+    # Users created by other processes arrive as invalidations of their cache
+    # keys, the writes of this process update the filter themselves. Deleted
+    # users arrive the same way and are added as well: counting a value too
+    # often only costs a query, missing one would report a taken name free.
+    if keys is None:
+        # Users may have been missed, distrust the filter until it is rebuilt
+        user_identifiers.built = False
+        threading.Thread(target=_rebuild_user_filter, daemon=True).start()
+        return
+    for key in keys:
+        parts = key.split(":", 2)
+        if len(parts) < 3 or parts[0] != "user" or parts[1] not in _FILTERED:
+            continue
+        user_identifiers.add(_filter_value(parts[1], parts[2]))
+
+
+on_invalidate(_follow_user_writes, remote_only=True)
+
+
+def _filter_authoritative() -> bool:
+    """
+    Check whether identifiers missing from the filter are certainly free.
+
+    The filter of a process only holds the users created by other processes
+    when a shared cache backend brings their invalidations, see
+    USER_FILTER_AUTHORITATIVE.
+    """
+    if not user_identifiers.built:
+        return False
+    authoritative = get_settings().user_filter_authoritative
+    if authoritative is None:
+        return get_cache().shared
+    return authoritative
+
+
+def _identifier_taken(db: Session, identifier_type: str, identifier: str) -> bool:
+    """
+    Check whether a user has the username or email.
+
+    The database is only queried when the filter may contain the identifier,
+    or cannot tell because it may lack the users of other processes.
+    """
+    if (
+        _filter_authoritative()
+        and _filter_value(identifier_type, identifier) not in user_identifiers
+    ):
+        return False
+    exists = db.execute(_USER_EXISTS[identifier_type], {"identifier": identifier})
+    return exists.first() is not None
+
+
+def create_user(db: Session, user: UserCreate) -> User:
+    """
+    Create a new user in the database.
+
+    The user is inserted right away, a taken username or email is detected by
+    the unique constraints and only then looked up to report which one it is.
+    """
+    identifiers = (("username", user.username), ("email", user.email))
+    db_user = (
+        Buyer(**user.model_dump())
+        if user.user_type == UserType.buyer
+        else Seller(**user.model_dump())
+    )
+    if user.user_type == UserType.seller:
+        db_user.subscription_level = SubscriptionLevel.basic.value
+
+    try:
+        insert_one(db, db_user)
     except IntegrityError as e:
         logger.error(f"IntegrityError: {e}")
-        db.rollback()
+        if not is_duplicate_key(e):
+            raise
+        # Created concurrently, e.g. by another process the filter did not know of
+        for identifier_type, identifier in identifiers:
+            value = _filter_value(identifier_type, identifier)
+            if value not in user_identifiers:
+                user_identifiers.add(value)
+            if _identifier_taken(db, identifier_type, identifier):
+                raise UserAlreadyExistsError(identifier, identifier_type)
         raise
     except Exception as e:
         logger.error(f"Error creating user: {e}")
         raise
 
+    for identifier_type, identifier in identifiers:
+        user_identifiers.add(_filter_value(identifier_type, identifier))
+    # Forget the lookups that found no user under the new identifiers
+    invalidate(user_cache_keys(db_user))
+    return db_user
 
-def get_user(db: Session, identifier: str, identifier_type: str) -> User:
-    """Retrieve a user based on a dynamic identifier (ID, username, or email)."""
-    filters = {
-        "id": db.query(User).filter(User.id == int(identifier)).one_or_none,
-        "username": db.query(User).filter(User.username == identifier).one_or_none,
-        "email": db.query(User).filter(User.email == identifier).one_or_none,
-    }
 
-    if identifier_type not in filters:
+def import_users(db: Session, rows: list[ImportRow]) -> dict:
+    """
+    Import a batch of users with set-based statements and commit it.
+
+    The rows are validated with UserCreate. Usernames and emails taken by
+    existing users, or by an earlier row, are found by one query for the whole
+    batch. The users are then written by one multi-row INSERT into users and
+    one into each of buyers and sellers. A batch failing anyway, e.g. on a user
+    created concurrently, is rolled back to its savepoint and written again one
+    user at a time, so only the rows at fault fail.
+
+    Args:
+        db (Session): The database session.
+        rows (list[ImportRow]): The rows of the batch, as read by
+            crafty.importing.
+
+    Returns:
+        dict: The number of rows and of imported users, and the line and error
+            of every row that was not imported.
+    """
+    errors = []
+    users = []
+    for line, row in rows:
+        if isinstance(row, str):
+            errors.append((line, row))
+            continue
+        try:
+            users.append((line, UserCreate.model_validate(row)))
+        except ValidationError as e:
+            errors.append((line, _validation_error(e)))
+
+    valid = []
+    taken = _taken_identifiers(db, [user for _, user in users])
+    for line, user in users:
+        identifiers = (("username", user.username), ("email", user.email))
+        for identifier_type, identifier in identifiers:
+            if identifier in taken[identifier_type]:
+                error = UserAlreadyExistsError(identifier, identifier_type)
+                errors.append((line, error.message))
+                break
+        else:
+            for identifier_type, identifier in identifiers:
+                taken[identifier_type].add(identifier)
+            valid.append((line, user))
+
+    imported = {}
+    try:
+        try:
+            with db.begin_nested():
+                imported = _insert_users(db, [user for _, user in valid])
+        except IntegrityError as e:
+            logger.warning(f"Retrying failed user batch one by one: {e}")
+            for line, user in valid:
+                try:
+                    with db.begin_nested():
+                        imported.update(_insert_users(db, [user]))
+                except IntegrityError as e:
+                    if not is_duplicate_key(e):
+                        raise
+                    errors.append((line, "User already exists"))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error importing users: {e}")
+        db.rollback()
+        raise
+
+    keys = []
+    for user, user_id in imported.values():
+        user_identifiers.add(_filter_value("username", user.username))
+        user_identifiers.add(_filter_value("email", user.email))
+        keys += [
+            user_cache_key("id", user_id),
+            user_cache_key("username", user.username),
+            user_cache_key("email", user.email),
+        ]
+    # Forget the lookups that found no user under the new identifiers
+    invalidate(keys)
+    return {"rows": len(rows), "imported": len(imported), "errors": sorted(errors)}
+
+
+def _validation_error(error: ValidationError) -> str:
+    """Summarize the errors of a row on one line."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _taken_identifiers(db: Session, users: list[UserCreate]) -> dict[str, set]:
+    """Return the usernames and emails of the users that exist already."""
+    taken = {"username": set(), "email": set()}
+    if not users:
+        return taken
+    existing = db.execute(
+        select(User.username, User.email).where(
+            or_(
+                User.username.in_({user.username for user in users}),
+                User.email.in_({user.email for user in users}),
+            )
+        )
+    )
+    for username, email in existing:
+        taken["username"].add(username)
+        taken["email"].add(email)
+    return taken
+
+
+def _insert_users(db: Session, users: list[UserCreate]) -> dict:
+    """
+    Insert users with one multi-row INSERT per table of the user hierarchy.
+
+    Returns:
+        dict: The user and its new ID, by username.
+    """
+    if not users:
+        return {}
+    updated_at = utcnow()
+    db.execute(
+        insert(User.__table__),
+        [
+            {
+                **user.model_dump(),
+                "user_type": UserType(user.user_type),
+                "version": 1,
+                "updated_at": updated_at,
+            }
+            for user in users
+        ],
+    )
+    # Usernames are unique, which finds the new IDs on databases without RETURNING
+    ids = dict(
+        db.execute(
+            select(User.username, User.id).where(
+                User.username.in_([user.username for user in users])
+            )
+        ).all()
+    )
+    buyers = [
+        {"user_id": ids[user.username]}
+        for user in users
+        if user.user_type == UserType.buyer
+    ]
+    sellers = [
+        {
+            "user_id": ids[user.username],
+            "subscription_level": SubscriptionLevel.basic.value,
+        }
+        for user in users
+        if user.user_type == UserType.seller
+    ]
+    if buyers:
+        db.execute(insert(Buyer.__table__), buyers)
+    if sellers:
+        db.execute(insert(Seller.__table__), sellers)
+    return {user.username: (user, ids[user.username]) for user in users}
+
+
+def user_cache_key(identifier_type: str, identifier) -> str:
+    """
+    Return the cache key of the user looked up by an identifier.
+
+    Usernames and emails are case-folded, like _filter_value does, since the
+    database collation matches them ignoring case: every spelling of a name
+    shares one entry, which the writes of the user invalidate.
+    """
+    if identifier_type in _FILTERED:
+        identifier = identifier.casefold()
+    return f"user:{identifier_type}:{identifier}"
+
+
+def user_cache_keys(user: User) -> list[str]:
+    """Return the cache keys of every identifier of a user, hit or miss."""
+    return [
+        user_cache_key("id", user.id),
+        user_cache_key("username", user.username),
+        user_cache_key("email", user.email),
+    ]
+
+
+def _identifier_value(identifier: str, identifier_type: str):
+    """Convert an identifier to the type of the column it is looked up by."""
+    if identifier_type not in _USER_LOOKUPS:
         raise ValueError("Invalid identifier type")
+    if identifier_type == "id":
+        try:
+            return int(identifier)
+        except ValueError:
+            raise UserNotFoundError(identifier, identifier_type)
+    return identifier
 
-    user = filters[identifier_type]()
 
-    if not user:
-        raise UserNotFoundError(identifier, identifier_type)
+def _find_user(db: Session, identifier: str, identifier_type: str) -> Optional[User]:
+    """Look up a user by identifier on whichever database the session routes to."""
+    value = _identifier_value(identifier, identifier_type)
+    return (
+        db.execute(_USER_LOOKUPS[identifier_type], {"identifier": value})
+        .scalars()
+        .one_or_none()
+    )
+
+
+@coalesced
+@replica_reads
+def get_user(db: Session, identifier: str, identifier_type: str) -> UserResponse:
+    """
+    Retrieve a user based on a dynamic identifier (ID, username, or email).
 
+    Users are read through the cache, and so are identifiers no user has, for
+    USER_NEGATIVE_TTL seconds, which keeps repeated lookups of unknown names
+    off the database.
+
+    Raises:
+        UserNotFoundError: If no user has the identifier.
+        ValueError: If the identifier type is not "id", "username" or "email".
+    """
+    key = user_cache_key(identifier_type, identifier)
+    user = read_through(
+        key,
+        UserResponse,
+        lambda: _find_user(db, identifier, identifier_type),
+        negative_ttl=get_settings().user_negative_ttl,
+    )
+    if user is None:
+        get_hot_keys().record(key)
+        raise UserNotFoundError(identifier, identifier_type)
+    get_hot_keys().record(key, partial(_refresh_user, identifier, identifier_type))
     return user
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 10) -> List[User]:
-    """Retrieve a list of users with optional pagination."""
-    return db.query(User).offset(skip).limit(limit).all()
+@replica_reads
+def _refresh_user(identifier: str, identifier_type: str) -> None:
+    """Reload the cache entry of a hot user ahead of its expiry."""
+    with db_session() as db:
+        refresh(
+            user_cache_key(identifier_type, identifier),
+            UserResponse,
+            lambda: _find_user(db, identifier, identifier_type),
+        )
+
+
+@replica_reads
+def get_user_version(db: Session, identifier: str, identifier_type: str) -> Row:
+    """Retrieve the id, version and updated_at of a user by ID, username or email."""
+    value = _identifier_value(identifier, identifier_type)
+    version = db.execute(
+        _USER_VERSION_LOOKUPS[identifier_type], {"identifier": value}
+    ).one_or_none()
+
+    if version is None:
+        raise UserNotFoundError(identifier, identifier_type)
+
+    return version
+
+
+@replica_reads
+def get_users(
+    db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None
+) -> List[User]:
+    """Retrieve a list of users, after the cursor if one is given or else from skip."""
+    return paginate(db.query(User), USER_PAGE_KEY, cursor, skip, limit).all()
+
+
+@replica_reads
+def get_availability(
+    db: Session, username: Optional[str] = None, email: Optional[str] = None
+) -> dict:
+    """
+    Check whether a username and an email are still free.
+
+    When the username and email filter is authoritative, identifiers it has
+    never seen are reported free without a query and the database is only
+    asked about possible matches.
+
+    Args:
+        db (Session): The database session.
+        username (str, optional): The username to check. Defaults to None.
+        email (str, optional): The email to check. Defaults to None.
+
+    Returns:
+        dict: Whether each given identifier is available, None for the others.
+    """
+    return {
+        "username_available": (
+            None
+            if username is None
+            else not _identifier_taken(db, "username", username)
+        ),
+        "email_available": (
+            None if email is None else not _identifier_taken(db, "email", email)
+        ),
+    }
 
 
 def delete_user(db: Session, identifier: str, identifier_type: str) -> User:
     """Delete a user from the database based on a dynamic identifier."""
     try:
-        user = get_user(db, identifier, identifier_type)
+        # Looked up on the primary, the user is about to be deleted there
+        user = _find_user(db, identifier, identifier_type)
+        if user is None:
+            raise UserNotFoundError(identifier, identifier_type)
+        keys = user_cache_keys(user)
+        values = [
+            _filter_value("username", user.username),
+            _filter_value("email", user.email),
+        ]
         db.delete(user)
         db.commit()
+        invalidate(keys)
+        # Only an authoritative filter is known to count every stored user,
+        # removing a value it does not count would hide other values
+        if _filter_authoritative():
+            for value in values:
+                user_identifiers.remove(value)
         return user
     except UserNotFoundError:
         logger.warning(f"User not found for deletion: {identifier} ({identifier_type})")
@@ -0,0 +1,37 @@
+"""add_fulltext_index_to_products
+
+Revision ID: 3b8e4d2a9c51
+Revises: f09bf08f1fc4
+Create Date: 2026-10-16 23:25:12.418734
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8e4d2a9c51"
+down_revision: Union[str, None] = "f09bf08f1fc4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # FULLTEXT indexes are MySQL only, other databases use the in-process index
+    if op.get_bind().dialect.name != "mysql":
+        return
+    op.create_index(
+        "ix_products_name_description_fulltext",
+        "products",
+        ["name", "description"],
+        unique=False,
+        mysql_prefix="FULLTEXT",
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "mysql":
+        return
+    op.drop_index("ix_products_name_description_fulltext", table_name="products")
@@ -0,0 +1,44 @@
+"""add_product_filter_indexes
+
+Revision ID: 8c2f61d0e4a7
+Revises: 3b8e4d2a9c51
+Create Date: 2026-10-16 23:41:03.925164
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c2f61d0e4a7"
+down_revision: Union[str, None] = "3b8e4d2a9c51"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite index starts with seller_id, so it replaces the single
+    # column index, including as the index of the seller foreign key
+    op.create_index(
+        "ix_products_seller_id_price",
+        "products",
+        ["seller_id", "price"],
+        unique=False,
+    )
+    op.drop_index("ix_products_seller_id", table_name="products")
+    op.create_index("ix_products_price", "products", ["price"], unique=False)
+    op.create_index(
+        "ix_products_tags_tag_id_product_id",
+        "products_tags",
+        ["tag_id", "product_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_tags_tag_id_product_id", table_name="products_tags")
+    op.drop_index("ix_products_price", table_name="products")
+    op.create_index("ix_products_seller_id", "products", ["seller_id"], unique=False)
+    op.drop_index("ix_products_seller_id_price", table_name="products")
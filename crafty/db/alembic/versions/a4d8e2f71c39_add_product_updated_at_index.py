@@ -0,0 +1,25 @@
+"""add_product_updated_at_index
+
+Revision ID: a4d8e2f71c39
+Revises: e81f4b6c2d07
+Create Date: 2026-10-17 00:58:12.804416
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d8e2f71c39"
+down_revision: Union[str, None] = "e81f4b6c2d07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_products_updated_at", "products", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_updated_at", table_name="products")
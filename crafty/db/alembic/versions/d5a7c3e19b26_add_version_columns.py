@@ -0,0 +1,43 @@
+"""add_version_columns
+
+Revision ID: d5a7c3e19b26
+Revises: 8c2f61d0e4a7
+Create Date: 2026-10-16 23:58:41.207316
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a7c3e19b26"
+down_revision: Union[str, None] = "8c2f61d0e4a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ("products", "tags", "users")
+
+
+def upgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        )
+        op.add_column(
+            table,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "version")
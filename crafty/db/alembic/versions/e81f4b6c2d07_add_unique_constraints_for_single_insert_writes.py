@@ -0,0 +1,40 @@
+"""add_unique_constraints_for_single_insert_writes
+
+Revision ID: e81f4b6c2d07
+Revises: d5a7c3e19b26
+Create Date: 2026-10-17 00:21:37.540912
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e81f4b6c2d07"
+down_revision: Union[str, None] = "d5a7c3e19b26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the first of duplicate favorites, they were never meant to exist.
+    # The derived table lets MySQL select from the table it deletes from.
+    op.execute(
+        sa.text(
+            "DELETE FROM favorites WHERE id NOT IN ("
+            "SELECT id FROM (SELECT MIN(id) AS id FROM favorites "
+            "GROUP BY buyer_id, product_id) AS first_favorites)"
+        )
+    )
+    op.create_unique_constraint(
+        "unique_favorite_buyer_product", "favorites", ["buyer_id", "product_id"]
+    )
+    # Fails on products sharing a name, which have to be renamed first
+    op.create_unique_constraint("unique_product_name", "products", ["name"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("unique_product_name", "products", type_="unique")
+    op.drop_constraint("unique_favorite_buyer_product", "favorites", type_="unique")
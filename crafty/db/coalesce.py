@@ -0,0 +1,221 @@
+import asyncio
+import threading
+from functools import wraps
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crafty.config import get_settings
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """A fetch in progress, shared by the callers that joined it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller of a key (the leader) runs the call, callers arriving
+    while it runs wait for it and get the same result or exception. A key is
+    forgotten as soon as its call finishes, so nothing is cached beyond the
+    duration of a single fetch.
+
+    Threads and coroutines are coalesced separately: do() makes threads wait on
+    the leader thread, do_async() makes coroutines await the leader coroutine
+    without occupying a thread.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self.in_flight_peak = 0
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """Run func, or wait for the call of another thread with the same key."""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._started()
+                leader = True
+            else:
+                self.collapsed += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Await func, or the call of another coroutine with the same key.
+
+        The call uses the resources of its leader, e.g. its session, so it is
+        cancelled along with the leader. Its followers then retry with their own
+        func, one of them leading the next call.
+        """
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is not None:
+                self.collapsed += 1
+        if task is not None:
+            try:
+                # Shielded so a cancelled follower does not cancel the shared fetch
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await self.do_async(key, func)
+        task = asyncio.ensure_future(func())
+        with self._lock:
+            self._tasks[key] = task
+            self._started()
+        task.add_done_callback(lambda _: self._finish(key, task))
+        return await task
+
+    def stats(self) -> dict:
+        """Return the counters of the coalesced calls."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._flights) + len(self._tasks),
+                "in_flight_peak": self.in_flight_peak,
+            }
+
+    def reset(self) -> None:
+        """Reset the counters. Calls in flight are not affected."""
+        with self._lock:
+            self.calls = self.executions = self.collapsed = self.in_flight_peak = 0
+
+    def _started(self):
+        self.executions += 1
+        self.in_flight_peak = max(
+            self.in_flight_peak, len(self._flights) + len(self._tasks)
+        )
+
+    def _finish(self, key, task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        # Followers retrieve the exception, keep asyncio from logging it as lost
+        if not task.cancelled():
+            task.exception()
+
+
+# Coalesces the crud reads of this process
+crud_flights = SingleFlight()
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    hash(value)
+    return value
+
+
+def flight_key(func: Callable, args: tuple, kwargs: dict) -> Optional[Hashable]:
+    """
+    Build the key identifying a crud call, without the session.
+
+    Args:
+        func (Callable): The crud function.
+        args (tuple): Positional arguments following the session.
+        kwargs (dict): Keyword arguments.
+
+    Returns:
+        Optional[Hashable]: The key, or None when an argument is not hashable
+            and the call cannot be coalesced.
+    """
+    try:
+        return (
+            func.__module__,
+            func.__qualname__,
+            _freeze(args),
+            _freeze(kwargs),
+        )
+    except TypeError:
+        return None
+
+
+def _wrote(db) -> bool:
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    return bool(session.info.get("wrote"))
+
+
+def coalesce_key(func: Callable, db, args: tuple, kwargs: dict) -> Optional[Hashable]:
+    """
+    Return the flight key of a call to a coalesced crud function.
+
+    Args:
+        func (Callable): The crud function.
+        db (Session | AsyncSession): The session the call was made with.
+        args (tuple): Positional arguments following the session.
+        kwargs (dict): Keyword arguments.
+
+    Returns:
+        Optional[Hashable]: The key, or None when the call must run on its own:
+            the function is not marked with coalesced, coalescing is disabled,
+            an argument is not hashable or the session already wrote, in which
+            case sharing another request's fetch could hide its own writes.
+    """
+    if not getattr(func, "coalesced", False) or not get_settings().db_coalesce_reads:
+        return None
+    if _wrote(db):
+        return None
+    return flight_key(func, args, kwargs)
+
+
+def coalesced(func):
+    """Mark a crud getter whose result can be shared between concurrent callers.
+
+    Concurrent calls with equal arguments, other than the session, share one
+    fetch. Only mark getters returning values that stay usable outside the
+    session that loaded them, i.e. schema objects, dicts or result rows, never
+    ORM instances: those belong to the leader's session, which may be closed or
+    in use by then. Shared values must not be modified by the caller.
+
+    run_crud coalesces the calls of concurrent requests in the "async" and
+    "executor" modes before they take a thread or connection. In "sync" mode
+    routes call getters on the event loop thread one at a time, so there is
+    nothing to share and run_crud calls them directly. Called directly from
+    concurrent threads, e.g. by background jobs, calls are coalesced as well.
+    """
+
+    @wraps(func)
+    def wrapper(db, *args, **kwargs):
+        key = coalesce_key(wrapper, db, args, kwargs)
+        if key is None:
+            return func(db, *args, **kwargs)
+        return crud_flights.do(key, lambda: func(db, *args, **kwargs))
+
+    wrapper.coalesced = True
+    return wrapper
@@ -1,16 +1,95 @@
+from functools import lru_cache
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 
 from crafty.config import get_settings
 
+from .telemetry import (InstrumentedAsyncQueuePool, InstrumentedQueuePool,
+                        instrument_engine)
+
+# Async drivers used for each backend when running in "async" database mode
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+# Connection pool options shared by every engine, sync and async
+ENGINE_OPTIONS = {
+    "pool_size": get_settings().db_pool_size,
+    "max_overflow": get_settings().db_max_overflow,
+    "pool_timeout": get_settings().db_pool_timeout,
+    "pool_recycle": get_settings().db_pool_recycle,
+    "pool_pre_ping": get_settings().db_pool_pre_ping,
+}
+
 # Create SQLAlchemy engine
 engine = create_engine(
-    get_settings().database_url,
-    pool_size=150,
-    max_overflow=10,
-    pool_recycle=3600,
-    pool_pre_ping=True,
+    get_settings().database_url, poolclass=InstrumentedQueuePool, **ENGINE_OPTIONS
 )
+instrument_engine(engine, "primary")
+
+# Engines for the read replicas of the primary database
+replica_engines = [
+    create_engine(url, poolclass=InstrumentedQueuePool, **ENGINE_OPTIONS)
+    for url in get_settings().replica_urls
+]
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine, f"replica-{index}")
 
 # Base class for declarative models
 Base = declarative_base()
+
+
+def to_async_url(url: str) -> URL:
+    """Swap the driver of a database URL for its async counterpart.
+
+    For example mysql+pymysql://... becomes mysql+aiomysql://...
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def get_async_database_url() -> URL:
+    """Return the URL used by the async engine.
+
+    The URL is taken from the ASYNC_DATABASE_URL setting when present, otherwise
+    it is derived from DATABASE_URL.
+    """
+    settings = get_settings()
+    if settings.async_database_url:
+        return make_url(settings.async_database_url)
+    return to_async_url(settings.database_url)
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """Getter for the async SQLAlchemy engine.
+
+    The engine is created on first use so the async driver is only required
+    when the application actually runs in "async" database mode.
+    """
+    async_engine = create_async_engine(
+        get_async_database_url(), poolclass=InstrumentedAsyncQueuePool, **ENGINE_OPTIONS
+    )
+    instrument_engine(async_engine.sync_engine, "async-primary")
+    return async_engine
+
+
+@lru_cache
+def get_async_replica_engines() -> list[AsyncEngine]:
+    """Getter for the async engines of the read replicas."""
+    async_engines = [
+        create_async_engine(
+            to_async_url(url), poolclass=InstrumentedAsyncQueuePool, **ENGINE_OPTIONS
+        )
+        for url in get_settings().replica_urls
+    ]
+    for index, async_engine in enumerate(async_engines):
+        instrument_engine(async_engine.sync_engine, f"async-replica-{index}")
+    return async_engines
@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+from functools import partial
+from typing import Any, Callable, TypeVar, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from crafty.config import get_settings
+
+from .coalesce import coalesce_key, crud_flights
+from .executor import get_executor
+
+T = TypeVar("T")
+
+
+async def run_crud(
+    func: Callable[..., T], db: Union[Session, AsyncSession], *args: Any, **kwargs: Any
+) -> T:
+    """Run a crafty.crud function with the session provided by get_db.
+
+    With a blocking Session the function is called directly, exactly as the
+    routes used to do ("sync" database mode). With an AsyncSession the same
+    function is executed through AsyncSession.run_sync, which drives it on the
+    async driver without blocking the event loop ("async" database mode). In
+    "executor" mode the function runs on the database thread pool, with the
+    caller's context variables copied to the worker thread.
+
+    Concurrent calls of a getter marked with coalesced share one execution in
+    the "async" and "executor" modes. The callers joining a fetch in flight only
+    await it, so in "executor" mode they do not take a worker thread either. In
+    "sync" mode a getter blocks the event loop until it returns, so no other
+    call could join it and getters are called directly.
+
+    Args:
+        func (Callable): The crud function. Its first argument must be the session.
+        db (Session | AsyncSession): The database session.
+        *args: Positional arguments passed to the crud function.
+        **kwargs: Keyword arguments passed to the crud function.
+
+    Returns:
+        The value returned by the crud function.
+    """
+    key = None
+    if isinstance(db, AsyncSession) or get_settings().db_mode == "executor":
+        key = coalesce_key(func, db, args, kwargs)
+    if key is None:
+        return await _call(func, db, *args, **kwargs)
+    # The call is shared already, skip the thread level coalescing of the getter
+    return await crud_flights.do_async(
+        key, partial(_call, func.__wrapped__, db, *args, **kwargs)
+    )
+
+
+async def _call(func, db, *args, **kwargs):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args, **kwargs)
+    if get_settings().db_mode == "executor":
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(), partial(context.run, func, db, *args, **kwargs)
+        )
+    return func(db, *args, **kwargs)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException
+
+from crafty.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolAdmission:
+    """Admission control for the "executor" database mode.
+
+    A request holds a permit for as long as it holds a database session, and
+    there are exactly as many permits as the connection pool can hand out.
+    Requests therefore queue here, where the wait is visible and bounded,
+    instead of piling up on the pool until the pool timeout expires.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    async def acquire(self, max_wait: float, retry_after: int) -> None:
+        """Wait for a free connection permit.
+
+        Args:
+            max_wait (float): Seconds to wait before rejecting the request.
+            retry_after (int): Value of the Retry-After header on rejection.
+
+        Raises:
+            HTTPException: 503 Service Unavailable if no permit was freed in time.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.capacity)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logger.warning(
+                f"No database connection freed within {max_wait}s, rejecting request"
+            )
+            raise HTTPException(
+                status_code=503,
+                detail="Database is busy, please retry later.",
+                headers={"Retry-After": str(retry_after)},
+            )
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+
+    def release(self) -> None:
+        """Return a permit taken with acquire."""
+        self.in_use -= 1
+        self._semaphore.release()
+
+
+# One permit per connection the pool can hand out
+pool_admission = PoolAdmission(
+    get_settings().db_pool_size + get_settings().db_max_overflow
+)
+
+
+@lru_cache
+def get_executor() -> ThreadPoolExecutor:
+    """Getter for the thread pool running crud functions in "executor" mode.
+
+    The pool has one worker per connection, so an admitted request never waits
+    for a thread.
+    """
+    return ThreadPoolExecutor(
+        max_workers=pool_admission.capacity, thread_name_prefix="crafty-db"
+    )
+
+
+async def admit_request() -> None:
+    """Take a connection permit using the configured wait threshold."""
+    settings = get_settings()
+    await pool_admission.acquire(
+        settings.db_executor_max_wait, settings.db_executor_retry_after
+    )
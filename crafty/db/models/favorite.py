@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Integer, String, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from crafty.db.database import Base
@@ -14,3 +14,9 @@ class Favorite(Base):
 
     buyer = relationship("User", back_populates="favorites")
     product = relationship("Product")
+
+    __table_args__ = (
+        UniqueConstraint(
+            "buyer_id", "product_id", name="unique_favorite_buyer_product"
+        ),
+    )
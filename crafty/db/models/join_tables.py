@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, Table
+from sqlalchemy import Column, ForeignKey, Index, Integer, Table
 
 from crafty.db.database import Base
 
@@ -7,4 +7,6 @@ products_tags = Table(
     Base.metadata,
     Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # The primary key starts with product_id, lookups by tag need their own index
+    Index("ix_products_tags_tag_id_product_id", "tag_id", "product_id"),
 )
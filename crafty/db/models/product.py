@@ -1,8 +1,10 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Text
+from sqlalchemy import (Column, DateTime, ForeignKey, Index, Integer, String,
+                        Text, UniqueConstraint, func)
 from sqlalchemy.orm import relationship
 
 from crafty.db.database import Base
 from crafty.db.models.join_tables import products_tags
+from crafty.db.models.versioning import utcnow
 
 
 class Product(Base):
@@ -12,7 +14,16 @@ class Product(Base):
     name = Column(String(100), nullable=False)
     description = Column(Text)
     price = Column(Integer, nullable=False)
-    seller_id = Column(Integer, ForeignKey("users.id"), index=True)
+    seller_id = Column(Integer, ForeignKey("users.id"))
+    # Bumped on every update, used for optimistic locking and ETags
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        default=utcnow,
+        onupdate=utcnow,
+        server_default=func.now(),
+    )
 
     seller = relationship("Seller", back_populates="products")
     reviews = relationship("Review", back_populates="product")
@@ -20,6 +31,25 @@ class Product(Base):
 
     tags = relationship("Tag", secondary=products_tags, back_populates="products")
 
+    __table_args__ = (
+        # Product names are unique, duplicates are rejected by the INSERT
+        UniqueConstraint("name", name="unique_product_name"),
+        # Serves seller filters, price filters within a seller and the seller FK
+        Index("ix_products_seller_id_price", "seller_id", "price"),
+        Index("ix_products_price", "price"),
+        # Serves the since filter of catalog exports
+        Index("ix_products_updated_at", "updated_at"),
+        # Used by product search; other databases search an in-process index
+        Index(
+            "ix_products_name_description_fulltext",
+            "name",
+            "description",
+            mysql_prefix="FULLTEXT",
+        ).ddl_if(dialect="mysql"),
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
 
 class ProductImage(Base):
     __tablename__ = "product_images"
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from crafty.db.database import Base
 from crafty.db.models.join_tables import products_tags
+from crafty.db.models.versioning import utcnow
 
 
 class Tag(Base):
@@ -10,5 +11,16 @@ class Tag(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
+    # Bumped on every update, used for optimistic locking and ETags
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        default=utcnow,
+        onupdate=utcnow,
+        server_default=func.now(),
+    )
 
     products = relationship("Product", secondary=products_tags, back_populates="tags")
+
+    __mapper_args__ = {"version_id_col": version}
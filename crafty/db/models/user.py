@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Enum, ForeignKey, Integer, String
+from sqlalchemy import (Column, DateTime, Enum, ForeignKey, Integer, String,
+                        func)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 from crafty.constants import UserType
 from crafty.db.database import Base
+from crafty.db.models.versioning import utcnow
 
 
 class User(Base):
@@ -14,6 +16,15 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(128), nullable=False)
     user_type = Column(Enum(UserType), nullable=False)
+    # Bumped on every update, used for optimistic locking and ETags
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        default=utcnow,
+        onupdate=utcnow,
+        server_default=func.now(),
+    )
 
     reviews_given = relationship(
         "Review", foreign_keys="Review.reviewer_id", back_populates="reviewer"
@@ -23,7 +34,11 @@ class User(Base):
     )
     favorites = relationship("Favorite", back_populates="buyer")
 
-    __mapper_args__ = {"polymorphic_identity": "user", "polymorphic_on": user_type}
+    __mapper_args__ = {
+        "polymorphic_identity": "user",
+        "polymorphic_on": user_type,
+        "version_id_col": version,
+    }
 
 
 class Seller(User):
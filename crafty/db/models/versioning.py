@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    """Return the current time as naive UTC, the way updated_at columns store it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
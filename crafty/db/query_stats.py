@@ -0,0 +1,124 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements of the request currently being handled
+_current_request = ContextVar("current_request_queries", default=None)
+
+# Aggregated statistics per route template
+route_stats = {}
+_route_stats_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so executions differing only in values compare equal.
+
+    Whitespace is collapsed, numeric literals are replaced and expanded IN
+    lists of any length are reduced to a single placeholder.
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _IN_LIST.sub("(?)", statement)
+    return _NUMBER.sub("N", statement)
+
+
+class RequestQueries:
+    """Statements executed while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> dict:
+        """Return the statements executed at least threshold times."""
+        return {
+            statement: count
+            for statement, count in self.fingerprints.items()
+            if count >= threshold
+        }
+
+
+class RouteQueryStats:
+    """Statement counts and database time aggregated over the requests of one route."""
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.db_time = 0.0
+        self.repeated = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "avg_statements": self.statements / self.requests if self.requests else 0,
+            "max_statements": self.max_statements,
+            "db_time": self.db_time,
+            "repeated": dict(self.repeated.most_common()),
+        }
+
+
+def start_request() -> RequestQueries:
+    """Start collecting the statements executed in the current context."""
+    queries = RequestQueries()
+    _current_request.set(queries)
+    return queries
+
+
+def current_request() -> Optional[RequestQueries]:
+    """Return the statements collected for the current request, if any."""
+    return _current_request.get()
+
+
+def record_request(route: str, queries: RequestQueries, threshold: int) -> None:
+    """Add a finished request to the statistics of its route."""
+    with _route_stats_lock:
+        stats = route_stats.setdefault(route, RouteQueryStats())
+        stats.requests += 1
+        stats.statements += queries.count
+        stats.max_statements = max(stats.max_statements, queries.count)
+        stats.db_time += queries.duration
+        stats.repeated.update(queries.repeated(threshold))
+
+
+def reset_route_stats() -> None:
+    """Forget the statistics collected so far."""
+    with _route_stats_lock:
+        route_stats.clear()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    queries = _current_request.get()
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - start)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # after_cursor_execute is skipped for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
@@ -1,11 +1,147 @@
+import asyncio
+import random
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
 
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, object_mapper, sessionmaker
+
+from crafty.cache.responses import bump_generations
+from crafty.config import get_settings
+
+from .database import (engine, get_async_engine, get_async_replica_engines,
+                       replica_engines)
+from .executor import admit_request, get_executor, pool_admission
+
+# Set while a crud getter marked with replica_reads is running
+_replica_reads = ContextVar("replica_reads", default=False)
+
+# Monotonic time of the last write per table, used for read-your-writes
+_last_write = {}
+
+
+def replica_reads(func):
+    """Mark a crud getter as safe to serve from a read replica.
+
+    Statements executed while the getter runs may be routed to a replica by
+    RoutingSession. Everything else, including lazy loads after the getter
+    returns, keeps using the primary.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    return wrapper
+
+
+def _recently_written(table_names) -> bool:
+    """Check whether any of the tables was written within the replica write window."""
+    window = get_settings().replica_write_window
+    now = time.monotonic()
+    return any(
+        now - _last_write.get(name, float("-inf")) < window for name in table_names
+    )
+
+
+def replicas_may_lag(table_names) -> bool:
+    """
+    Check whether the replicas may be missing recent writes of any of the tables.
+
+    Reads of such tables go to the primary, but a read of another table can
+    still join them on a replica. Only writes of this process are known.
+    """
+    return bool(replica_engines) and _recently_written(table_names)
+
+
+class RoutingSession(Session):
+    """Session sending replica-safe reads to replicas and everything else to the primary.
+
+    A read goes to a random replica only when it runs inside a getter marked
+    with replica_reads, the session has not written anything yet and none of
+    the mapped tables was written by this process within REPLICA_WRITE_WINDOW
+    seconds. Writes, reads following a write and reads of recently written
+    tables go to the primary, which gives read-your-writes consistency.
+    """
+
+    def __init__(self, *args, replicas=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = list(replicas)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+            self.info.setdefault("written_tables", set()).add(clause.table.name)
+            _last_write[clause.table.name] = time.monotonic()
+        elif (
+            self.replicas
+            and _replica_reads.get()
+            and getattr(clause, "is_select", False)
+            and mapper is not None
+            and not self._flushing
+            and not self.info.get("wrote")
+            and not _recently_written(table.name for table in mapper.tables)
+        ):
+            return random.choice(self.replicas)
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_writes(session, flush_context):
+    """Pin the session to the primary and stamp the tables written by the flush."""
+    session.info["wrote"] = True
+    written = session.info.setdefault("written_tables", set())
+    now = time.monotonic()
+    for obj in session.new | session.dirty | session.deleted:
+        for table in object_mapper(obj).tables:
+            _last_write[table.name] = now
+            written.add(table.name)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _bump_written_generations(session):
+    """Start a new response cache generation of the tables a commit wrote."""
+    written = session.info.pop("written_tables", None)
+    if written:
+        bump_generations(written)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop("written_tables", None)
 
-from .database import engine
 
 # Create a configured "Session" class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replica_engines,
+)
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Getter for the configured "AsyncSession" class.
+
+    Objects are not expired on commit because they are serialized after the
+    crud function returns, where lazy loads are not possible on an AsyncSession.
+    """
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        sync_session_class=RoutingSession,
+        replicas=[replica.sync_engine for replica in get_async_replica_engines()],
+        autoflush=False,
+        expire_on_commit=False,
+    )
 
 
 def get_db():
@@ -17,6 +153,34 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Provides an async database session for dependency injection.
+
+    Used in place of get_db when the application runs in "async" database mode.
+    """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def get_executor_db():
+    """Provides a database session for the "executor" database mode.
+
+    The request is admitted only while a pooled connection is free and keeps
+    its permit until the session is closed. Closing runs on the executor since
+    returning the connection to the pool rolls back the open transaction.
+
+    Raises:
+        HTTPException: 503 with Retry-After when no connection frees up in time.
+    """
+    await admit_request()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await asyncio.get_running_loop().run_in_executor(get_executor(), db.close)
+        pool_admission.release()
+
+
 @contextmanager
 def db_session():
     """Db session which can be used outside of FastAPI routes.
@@ -0,0 +1,84 @@
+from typing import Sequence
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import Insert
+
+
+def insert_ignoring_duplicates(db: Session, table: Table, rows: list[dict]) -> Insert:
+    """
+    Build a single multi-row INSERT skipping rows whose key already exists.
+
+    Unlike INSERT IGNORE on MySQL only duplicate keys are skipped, so other
+    errors such as foreign key violations still fail the statement.
+
+    Args:
+        db (Session): The session the statement will be executed with.
+        table (Table): The table to insert into.
+        rows (list[dict]): The rows to insert.
+
+    Returns:
+        Insert: The INSERT statement.
+
+    Raises:
+        NotImplementedError: If the database does not support it.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table).values(rows)
+        # Assigning a key column to itself leaves the existing row untouched
+        return statement.on_duplicate_key_update(
+            {
+                column.name: statement.inserted[column.name]
+                for column in table.primary_key
+            }
+        )
+    if dialect == "sqlite":
+        return sqlite.insert(table).values(rows).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(table).values(rows).on_conflict_do_nothing()
+    raise NotImplementedError(
+        f"Duplicate ignoring inserts are not supported on {dialect}"
+    )
+
+
+def upsert(
+    db: Session, table: Table, row: dict, keys: Sequence[str], update: Sequence[str]
+) -> Insert:
+    """
+    Build a single-row INSERT that resolves a duplicate key instead of failing.
+
+    Args:
+        db (Session): The session the statement will be executed with.
+        table (Table): The table to insert into.
+        row (dict): The row to insert.
+        keys (Sequence[str]): The columns of the unique constraint that may
+            conflict, needed by PostgreSQL and SQLite.
+        update (Sequence[str]): The columns overwritten with the values of row
+            when it conflicts. The existing row is kept unchanged when empty.
+
+    Returns:
+        Insert: The INSERT statement.
+
+    Raises:
+        NotImplementedError: If the database does not support it.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table).values(row)
+        # Assigning a key column to itself leaves the existing row untouched
+        assignments = {
+            column: statement.inserted[column] for column in update or keys[:1]
+        }
+        return statement.on_duplicate_key_update(assignments)
+    if dialect in ("sqlite", "postgresql"):
+        module = sqlite if dialect == "sqlite" else postgresql
+        statement = module.insert(table).values(row)
+        if not update:
+            return statement.on_conflict_do_nothing(index_elements=keys)
+        return statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: statement.excluded[column] for column in update},
+        )
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
@@ -0,0 +1,124 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from crafty.config import get_settings
+from crafty.metrics import Histogram
+
+# Instrumented engines by name, e.g. "primary" or "replica-0"
+instrumented_engines = {}
+
+
+class PoolTelemetry:
+    """Counters and latency histograms of one engine's connection pool."""
+
+    def __init__(self):
+        self.checkout_latency = Histogram()
+        self.pre_ping_latency = Histogram()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+
+
+class _TimedCheckoutMixin:
+    """Pool mixin timing every checkout.
+
+    The checkout latency covers waiting for a free connection, opening a new
+    one when the pool is allowed to overflow and the pre-ping.
+    """
+
+    telemetry = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.checkout_latency.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool reporting checkout latency."""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool reporting checkout latency."""
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolTelemetry:
+    """Attach pool telemetry to an engine using one of the instrumented pools.
+
+    Args:
+        engine (Engine): The engine to instrument. For an AsyncEngine pass its sync_engine.
+        name (str): Name the pool is reported under.
+
+    Returns:
+        PoolTelemetry: The telemetry collected for the engine's pool.
+    """
+    telemetry = PoolTelemetry()
+    engine.pool.telemetry = telemetry
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        telemetry.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        telemetry.checkouts += 1
+        telemetry.peak_checked_out = max(
+            telemetry.peak_checked_out, engine.pool.checkedout()
+        )
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        telemetry.invalidations += 1
+
+    # The pool pings through the dialect, so the ping is timed there
+    do_ping = engine.dialect.do_ping
+
+    def timed_ping(dbapi_connection):
+        start = time.perf_counter()
+        try:
+            return do_ping(dbapi_connection)
+        finally:
+            telemetry.pre_ping_latency.observe(time.perf_counter() - start)
+
+    engine.dialect.do_ping = timed_ping
+
+    instrumented_engines[name] = (engine, telemetry)
+    return telemetry
+
+
+def pool_status() -> list[dict]:
+    """Return the live state and telemetry of every instrumented pool."""
+    status = []
+    for name, (engine, telemetry) in instrumented_engines.items():
+        pool = engine.pool
+        status.append(
+            {
+                "name": name,
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                # QueuePool counts overflow from -pool_size until the pool is full
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": get_settings().db_max_overflow,
+                "timeout": pool.timeout(),
+                "peak_checked_out": telemetry.peak_checked_out,
+                "checkouts": telemetry.checkouts,
+                "connects": telemetry.connects,
+                "invalidations": telemetry.invalidations,
+                "checkout_latency": telemetry.checkout_latency.snapshot(),
+                "pre_ping_latency": telemetry.pre_ping_latency.snapshot(),
+            }
+        )
+    return status
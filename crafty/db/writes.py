@@ -0,0 +1,107 @@
+from typing import Sequence, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from crafty.constants import OnConflict
+from crafty.db.statements import upsert
+
+T = TypeVar("T")
+
+# Error codes of duplicate key violations, by driver
+MYSQL_DUPLICATE_ENTRY = 1062
+POSTGRESQL_UNIQUE_VIOLATION = "23505"
+
+
+def is_duplicate_key(error: IntegrityError) -> bool:
+    """
+    Check whether an integrity error is a unique constraint violation.
+
+    Other integrity errors, e.g. a foreign key pointing to a missing row, are
+    not, so they are not mistaken for a row that already exists.
+    """
+    orig = error.orig
+    if getattr(orig, "pgcode", None) is not None:
+        return orig.pgcode == POSTGRESQL_UNIQUE_VIOLATION
+    if orig is not None and orig.args and orig.args[0] == MYSQL_DUPLICATE_ENTRY:
+        return True
+    return "UNIQUE constraint failed" in str(orig)
+
+
+def insert_one(db: Session, instance: T) -> T:
+    """
+    Insert a new object with a single INSERT and commit it.
+
+    Duplicates are left to the unique constraints of the table instead of being
+    looked up first. The object is detached before the commit, which would
+    otherwise expire it and reload it with a SELECT when it is serialized;
+    every column is known after the INSERT since defaults are set in Python.
+    Relationships it is returned with must be set before, e.g. to an empty list.
+
+    Args:
+        db (Session): The database session.
+        instance: The new object.
+
+    Returns:
+        The inserted object, detached from the session.
+
+    Raises:
+        IntegrityError: If the INSERT violates a constraint. The transaction is
+            rolled back.
+    """
+    db.add(instance)
+    try:
+        db.flush()
+        db.expunge(instance)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    return instance
+
+
+def upsert_one(
+    db: Session,
+    model: type[T],
+    row: dict,
+    keys: Sequence[str],
+    on_conflict: OnConflict,
+) -> T:
+    """
+    Insert a row unless one with the same keys exists, and return the stored row.
+
+    The INSERT resolves the conflict itself, so concurrent calls with the same
+    keys all succeed with the same row.
+
+    Args:
+        db (Session): The database session.
+        model (type): The mapped class of the table.
+        row (dict): The column values of the row.
+        keys (Sequence[str]): The columns of the unique constraint identifying
+            the row.
+        on_conflict (OnConflict): ignore keeps an existing row as it is, update
+            overwrites its other columns with the values of row.
+
+    Returns:
+        The row stored under the keys, detached from the session.
+    """
+    update = []
+    if on_conflict == OnConflict.update:
+        update = [column for column in row if column not in keys]
+    try:
+        db.execute(upsert(db, model.__table__, row, keys, update))
+        # The newest row, keys with a NULL never conflict
+        stored = db.scalars(
+            select(model)
+            .filter_by(**{key: row[key] for key in keys})
+            .order_by(model.id.desc())
+            .limit(1)
+            .execution_options(populate_existing=True)
+        ).one()
+        db.expunge(stored)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return stored
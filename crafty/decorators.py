@@ -1,6 +1,11 @@
 from functools import wraps
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+
+from crafty.cache.responses import (get_response, response_cache_enabled,
+                                    response_cache_key, set_response)
+from crafty.db.session import replicas_may_lag
 
 
 def handle_http_exceptions(exception_mapping: dict):
@@ -45,3 +50,49 @@ def handle_http_exceptions(exception_mapping: dict):
         return wrapper
 
     return decorator
+
+
+def cached_response(tables: tuple, model):
+    """
+    Decorator caching the serialized JSON of a list route's responses.
+
+    Responses are keyed by route, query parameters and the generation of every
+    table they are built from; committing a write to one of the tables starts
+    a new generation, so no invalidation has to name the cached pages. A hit
+    returns the stored bytes without touching the database or the response
+    model. The route must take the request as a "request" parameter. Nothing
+    is cached unless response_cache_enabled() allows it.
+
+    While replicas may lag behind a write to one of the tables, responses are
+    served but not stored: the write started a new generation, which a page
+    read partly from a replica must not be cached under.
+
+    Args:
+        tables (tuple): Names of the tables the response is built from.
+        model: The response model the result of the route is serialized with.
+
+    Returns:
+        function: The wrapped route handler.
+    """
+    adapter = TypeAdapter(model)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not response_cache_enabled():
+                return await func(*args, **kwargs)
+            key = response_cache_key(kwargs["request"], tables)
+            body = get_response(key)
+            if body is not None:
+                return Response(body, media_type="application/json")
+            result = await func(*args, **kwargs)
+            body = adapter.dump_json(
+                adapter.validate_python(result, from_attributes=True)
+            )
+            if not replicas_may_lag(tables):
+                set_response(key, body)
+            return Response(body, media_type="application/json")
+
+        return wrapper
+
+    return decorator
@@ -114,3 +114,25 @@ class SubscriptionAlreadyExistsError(Exception):
 
     def __init__(self):
         super().__init__("A subscription with this name already exists.")
+
+
+class QueryBudgetExceededError(Exception):
+    """Raised in strict mode when a request exceeds its query budget or repeats statements."""
+
+    def __init__(self, route: str, statements: int, budget, repeated: dict):
+        self.route = route
+        self.statements = statements
+        self.budget = budget
+        self.repeated = repeated
+        super().__init__(
+            f"Route {route} executed {statements} statements (budget {budget}), "
+            f"repeated statements: {repeated}"
+        )
+
+
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be decoded."""
+
+    def __init__(self, cursor: str):
+        self.cursor = cursor
+        super().__init__(f"Invalid pagination cursor '{cursor}'")
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Literal, Sequence
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Separates the values of list fields within a CSV cell
+CSV_LIST_SEPARATOR = "|"
+
+
+def _json_default(value):
+    # datetimes, the only non-JSON values of the exported rows
+    return value.isoformat()
+
+
+def ndjson_chunks(batches: Iterable[list[dict]]) -> Iterator[bytes]:
+    """Serialize batches of rows to NDJSON, one chunk per batch."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(row, default=_json_default) + "\n" for row in batch
+        ).encode()
+
+
+def csv_chunks(batches: Iterable[list[dict]], fields: Sequence[str]) -> Iterator[bytes]:
+    """
+    Serialize batches of rows to CSV with a header line, one chunk per batch.
+
+    List values are joined with CSV_LIST_SEPARATOR into a single cell.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        for row in batch:
+            writer.writerow(
+                [
+                    (
+                        CSV_LIST_SEPARATOR.join(map(str, row[field]))
+                        if isinstance(row[field], list)
+                        else row[field]
+                    )
+                    for field in fields
+                ]
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header is left when there was no batch
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a stream of chunks into one gzip stream as they come."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,131 @@
+import codecs
+import csv
+import json
+from typing import (AsyncIterable, AsyncIterator, Iterable, Iterator, Literal,
+                    Union)
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# A parsed row with the line it was read from, or the error parsing it
+ImportRow = tuple[int, Union[dict, str]]
+
+
+class RowParser:
+    """
+    Turns the lines of an NDJSON or CSV import into rows, one line at a time.
+
+    NDJSON lines hold one JSON object each. CSV starts with a header line
+    naming the columns, and values may not span lines. Blank lines are skipped.
+    """
+
+    def __init__(self, format: ImportFormat):
+        self.format = format
+        self.line_number = 0
+        self.fieldnames = None
+
+    def parse(self, line: str) -> Union[dict, str, None]:
+        """Return the row of a line, the error parsing it, or None for no row."""
+        self.line_number += 1
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return None
+        if self.format == "ndjson":
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                return f"Invalid JSON: {e}"
+            return row if isinstance(row, dict) else "Expected a JSON object"
+        values = next(csv.reader([line]))
+        if self.fieldnames is None:
+            self.fieldnames = values
+            return None
+        if len(values) != len(self.fieldnames):
+            return f"Expected {len(self.fieldnames)} values, got {len(values)}"
+        return dict(zip(self.fieldnames, values))
+
+
+def read_batches(
+    lines: Iterable[str], format: ImportFormat, size: int
+) -> Iterator[list[ImportRow]]:
+    """
+    Read the rows of an import in batches, holding one batch at a time.
+
+    Args:
+        lines (Iterable[str]): The lines of the import, e.g. an open file.
+        format (ImportFormat): "ndjson" or "csv".
+        size (int): Rows per batch.
+
+    Yields:
+        list[ImportRow]: The line number and row, or parse error, of each row.
+    """
+    parser = RowParser(format)
+    batch = []
+    for line in lines:
+        row = parser.parse(line)
+        if row is None:
+            continue
+        batch.append((parser.line_number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def read_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 bytes, e.g. a request body, into lines."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def read_stream_batches(
+    chunks: AsyncIterable[bytes], format: ImportFormat, size: int
+) -> AsyncIterator[list[ImportRow]]:
+    """Read the rows of a streamed import in batches, like read_batches."""
+    parser = RowParser(format)
+    batch = []
+    async for line in read_lines(chunks):
+        row = parser.parse(line)
+        if row is None:
+            continue
+        batch.append((parser.line_number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ImportReport:
+    """Running totals of an import, keeping only its first max_errors errors."""
+
+    def __init__(self, max_errors: int = 100):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add(self, rows: int, imported: int, errors: list[tuple[int, str]]) -> None:
+        """Count the outcome of one batch."""
+        self.rows += rows
+        self.imported += imported
+        self.failed += len(errors)
+        room = self.max_errors - len(self.errors)
+        self.errors += [{"line": line, "error": error} for line, error in errors[:room]]
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
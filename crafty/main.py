@@ -1,4 +1,5 @@
 import logging
+from contextlib import asynccontextmanager
 from importlib.metadata import metadata
 
 import uvicorn
@@ -8,24 +9,55 @@ from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from sqlalchemy_utils import create_database, database_exists
 
-from crafty.routers import favorite, product, review, subscription, tag, user
 from crafty.config import get_settings
+from crafty.crud.tag import load_tag_dictionary
+from crafty.crud.user import load_user_filter
 from crafty.db.database import Base, engine
-from crafty.middleware import LoggingMiddleware
-
+from crafty.db.session import db_session, get_async_db, get_db, get_executor_db
+from crafty.middleware import LoggingMiddleware, QueryCountMiddleware
+from crafty.routers import (admin, favorite, product, review, subscription,
+                            tag, user)
 
 # Clear settings cache to ensure fresh configuration loading
 get_settings.cache_clear()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the in-process lookups before serving requests."""
+    try:
+        with db_session() as db:
+            load_tag_dictionary(db)
+    except Exception as e:
+        # The tags are loaded on the first lookup instead
+        logger.warning(f"Could not load the tag dictionary at startup: {e}")
+    try:
+        with db_session() as db:
+            load_user_filter(db)
+    except Exception as e:
+        # Availability checks query the database until the filter is built
+        logger.warning(f"Could not build the username and email filter: {e}")
+    yield
+
+
 # Initialize the FastAPI app
 app = FastAPI(
     title=metadata(__package__)["Name"],
     description=metadata(__package__)["Summary"],
     version=metadata(__package__)["Version"],
     contact={"name": "Mare i Vare", "email": "development@crafty.hr"},
+    lifespan=lifespan,
 )
 
+# Swap the blocking session dependency according to the database mode
+if get_settings().db_mode == "async":
+    app.dependency_overrides[get_db] = get_async_db
+elif get_settings().db_mode == "executor":
+    app.dependency_overrides[get_db] = get_executor_db
+
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(QueryCountMiddleware)
+app.include_router(admin.router)
 app.include_router(favorite.router)
 app.include_router(product.router)
 app.include_router(review.router)
@@ -37,6 +69,7 @@ app.include_router(user.router)
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+
 @app.get("/")
 def redirect_to_docs():
     """Redirect root URL to FastAPI documentation."""
@@ -0,0 +1,57 @@
+import bisect
+import threading
+from typing import Iterable
+
+# Latency buckets in seconds, from sub-millisecond up to the pool timeout
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """Thread-safe histogram with fixed buckets.
+
+    Bucket counts are reported cumulatively, so the value for a bucket is the
+    number of observations lower than or equal to its upper bound.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """Return the count, sum and cumulative bucket counts."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = cumulative + counts[-1]
+        return {"count": buckets["+Inf"], "sum": total, "buckets": buckets}
@@ -4,6 +4,10 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from crafty.config import get_settings
+from crafty.db.query_stats import record_request, start_request
+from crafty.exceptions import QueryBudgetExceededError
+
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -14,3 +18,35 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         logger.info(f"Response status: {response.status_code}")
         return response
+
+
+class QueryCountMiddleware(BaseHTTPMiddleware):
+    """Count the SQL statements executed for each request.
+
+    The statement count and database time are returned in the X-DB-Query-Count
+    and X-DB-Time-Ms headers and aggregated per route template. Requests over
+    their query budget, or executing one statement repeatedly (the N+1
+    pattern), are logged, or fail with QueryBudgetExceededError in strict mode.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        logger = logging.getLogger(__name__)
+        settings = get_settings()
+        queries = start_request()
+
+        response = await call_next(request)
+
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        threshold = settings.db_repeated_statement_threshold
+        record_request(route, queries, threshold)
+        response.headers["X-DB-Query-Count"] = str(queries.count)
+        response.headers["X-DB-Time-Ms"] = f"{queries.duration * 1000:.2f}"
+
+        budget = settings.db_route_query_budgets.get(route, settings.db_query_budget)
+        repeated = queries.repeated(threshold)
+        if (budget is not None and queries.count > budget) or repeated:
+            error = QueryBudgetExceededError(route, queries.count, budget, repeated)
+            if settings.db_query_strict:
+                raise error
+            logger.warning(str(error))
+        return response
@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence
+
+from sqlalchemy import Column, tuple_
+from sqlalchemy.orm import Query
+
+from crafty.exceptions import InvalidCursorError
+
+# Types a cursor value may be decoded as, by the Python type of its column
+_CURSOR_TYPES = {int: (int,), float: (int, float)}
+
+
+def cursor_types(columns: Sequence[Column]) -> list[tuple[type, ...]]:
+    """Return the types the cursor values of each sort column may have."""
+    types = []
+    for column in columns:
+        python_type = column.type.python_type
+        types.append(_CURSOR_TYPES.get(python_type, (python_type,)))
+    return types
+
+
+def encode_cursor(values: dict) -> str:
+    """Encode the sort key values of the last row of a page into an opaque cursor."""
+    payload = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, keys: Sequence[str], types: Sequence[tuple[type, ...]]
+) -> list:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Args:
+        cursor (str): The opaque cursor.
+        keys (Sequence[str]): The sort keys the cursor must contain, in order.
+        types (Sequence[tuple[type, ...]]): The types each value may have, in
+            the order of keys, e.g. from cursor_types. Booleans are never
+            accepted as numbers.
+
+    Returns:
+        list: The values of the sort keys, in the order of keys.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed, was created for other
+            sort keys or holds a value of the wrong type.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError(cursor)
+    if not isinstance(values, dict) or sorted(values) != sorted(keys):
+        raise InvalidCursorError(cursor)
+    values = [values[key] for key in keys]
+    for value, accepted in zip(values, types):
+        if isinstance(value, bool) or not isinstance(value, accepted):
+            raise InvalidCursorError(cursor)
+    return values
+
+
+def paginate(
+    query: Query,
+    columns: Sequence[Column],
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 10,
+    descending: bool = False,
+) -> Query:
+    """
+    Order a query by the given columns and apply cursor or offset pagination.
+
+    With a cursor only rows after the cursor's sort key are selected, which
+    uses the index on the sort columns no matter how deep the page is. Without
+    one, skip is applied as an OFFSET, kept for compatibility with existing
+    clients.
+
+    Args:
+        query (Query): The query to paginate.
+        columns (Sequence[Column]): Indexed columns uniquely ordering the rows,
+            ending with the primary key.
+        cursor (str, optional): Cursor returned with the previous page.
+        skip (int, optional): Number of records to skip when no cursor is given.
+        limit (int, optional): Maximum number of records to return.
+        descending (bool, optional): Whether to sort in descending order.
+
+    Returns:
+        Query: The paginated query.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was created for other sort keys.
+    """
+    query = query.order_by(
+        *(column.desc() if descending else column.asc() for column in columns)
+    )
+    if cursor is not None:
+        values = decode_cursor(
+            cursor, [column.key for column in columns], cursor_types(columns)
+        )
+        if len(columns) == 1:
+            key, value = columns[0], values[0]
+        else:
+            key, value = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < value if descending else key > value)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(
+    items: Sequence, limit: int, columns: Sequence[Column]
+) -> Optional[str]:
+    """
+    Return the cursor of the page following items, or None on the last page.
+
+    Args:
+        items (Sequence): The rows of the current page.
+        limit (int): The page size that was requested.
+        columns (Sequence[Column]): The columns the page was sorted by.
+
+    Returns:
+        Optional[str]: The cursor, or None when the page was not full.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor({column.key: getattr(last, column.key) for column in columns})
@@ -0,0 +1,131 @@
+from typing import Dict
+
+from fastapi import APIRouter, Query
+
+from crafty.cache.hotkeys import get_hot_keys
+from crafty.cache.store import get_cache
+from crafty.db.coalesce import crud_flights
+from crafty.db.executor import pool_admission
+from crafty.db.query_stats import reset_route_stats, route_stats
+from crafty.db.telemetry import pool_status
+from crafty.schemas.admin import (CacheStats, CoalescingStats,
+                                  DatabasePoolReport, HotKeysReport,
+                                  RouteQueryStats)
+
+router = APIRouter(tags=["admin"], prefix="/admin")
+
+
+@router.get("/db/pool", response_model=DatabasePoolReport)
+async def read_pool_status() -> DatabasePoolReport:
+    """
+    Retrieve the live state of the connection pools of this process.
+
+    Reports the checked-out and overflow connections, checkout and pre-ping
+    latency histograms per engine, and the admission state of the "executor"
+    database mode.
+
+    Returns:
+        DatabasePoolReport: The state of every pool.
+    """
+    return DatabasePoolReport(
+        pools=pool_status(),
+        executor={
+            "capacity": pool_admission.capacity,
+            "in_use": pool_admission.in_use,
+            "waiting": pool_admission.waiting,
+            "rejected": pool_admission.rejected,
+        },
+    )
+
+
+@router.get("/db/queries", response_model=Dict[str, RouteQueryStats])
+async def read_query_stats() -> Dict[str, RouteQueryStats]:
+    """
+    Retrieve the SQL statements executed per route since the last reset.
+
+    Statements repeated within a single request at least
+    DB_REPEATED_STATEMENT_THRESHOLD times are listed under "repeated" with the
+    number of times they were repeated, which points at N+1 query patterns.
+
+    Returns:
+        Dict[str, RouteQueryStats]: Statement statistics keyed by route template.
+    """
+    return {route: stats.as_dict() for route, stats in list(route_stats.items())}
+
+
+@router.delete("/db/queries", status_code=204)
+async def delete_query_stats() -> None:
+    """
+    Reset the SQL statement statistics.
+    """
+    reset_route_stats()
+
+
+@router.get("/db/coalescing", response_model=CoalescingStats)
+async def read_coalescing_stats() -> CoalescingStats:
+    """
+    Retrieve the counters of the coalesced crud reads since the last reset.
+
+    "collapsed" counts the calls that joined a fetch already in flight instead
+    of running their own, out of "calls" calls of the coalesced getters.
+
+    Returns:
+        CoalescingStats: The coalescing counters.
+    """
+    return crud_flights.stats()
+
+
+@router.delete("/db/coalescing", status_code=204)
+async def delete_coalescing_stats() -> None:
+    """
+    Reset the counters of the coalesced crud reads.
+    """
+    crud_flights.reset()
+
+
+@router.get("/cache", response_model=CacheStats)
+async def read_cache_stats() -> CacheStats:
+    """
+    Retrieve the hit, miss and eviction counters and the size of the cache.
+
+    Returns:
+        CacheStats: The counters of the cache backend.
+    """
+    return get_cache().stats()
+
+
+@router.delete("/cache", status_code=204)
+async def clear_cache() -> None:
+    """
+    Remove every entry from the cache.
+    """
+    get_cache().clear()
+
+
+@router.get("/hot-keys", response_model=HotKeysReport)
+async def read_hot_keys(limit: int = Query(20, ge=1)) -> HotKeysReport:
+    """
+    Retrieve the product, user and tag keys read most by this process.
+
+    Keys read at least HOT_KEY_THRESHOLD times are pinned in the cache and
+    refreshed before they expire, which the "pinned" flag of each key shows.
+
+    Args:
+        limit (int, optional): Number of keys to return. Defaults to 20.
+
+    Returns:
+        HotKeysReport: The hottest keys, highest count first.
+    """
+    hot_keys = get_hot_keys()
+    pinned = hot_keys.pinned()
+    return {
+        "reads": hot_keys.tracker.reads,
+        "threshold": hot_keys.threshold,
+        "pinned": len(pinned),
+        "refreshes": hot_keys.refreshes,
+        "refresh_errors": hot_keys.refresh_errors,
+        "keys": [
+            {"key": key, "count": count, "pinned": key in pinned}
+            for key, count in hot_keys.tracker.top(limit)
+        ],
+    }
@@ -1,16 +1,21 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from crafty.crud.favorite import (create_favorite, delete_favorite,
-                                  get_favorite, get_favorites,
+from crafty.constants import OnConflict
+from crafty.crud.favorite import (FAVORITE_PAGE_KEY, create_favorite,
+                                  delete_favorite, get_favorite, get_favorites,
                                   get_favorites_by_buyer_id,
                                   get_favorites_by_username)
+from crafty.db.dispatch import run_crud
 from crafty.db.session import get_db
 from crafty.decorators import handle_http_exceptions
-from crafty.exceptions import FavoriteAlreadyExistsError, FavoriteNotFoundError
+from crafty.exceptions import (FavoriteAlreadyExistsError,
+                               FavoriteNotFoundError, InvalidCursorError)
+from crafty.pagination import next_cursor
 from crafty.schemas.favorite import Favorite, FavoriteCreate
+from crafty.schemas.pagination import Page
 
 router = APIRouter(tags=["favorites"], prefix="/favorites")
 
@@ -18,24 +23,31 @@ router = APIRouter(tags=["favorites"], prefix="/favorites")
 exception_mapping = {
     FavoriteNotFoundError: 404,
     FavoriteAlreadyExistsError: 400,
+    InvalidCursorError: 400,
 }
 
 
 @router.post("/", response_model=Favorite)
 @handle_http_exceptions(exception_mapping)
 async def create_new_favorite(
-    favorite: FavoriteCreate, db: Session = Depends(get_db)
+    favorite: FavoriteCreate,
+    on_conflict: OnConflict = Query(OnConflict.error),
+    db: Session = Depends(get_db),
 ) -> Favorite:
     """
     Create a new favorite for a user.
 
     Args:
         favorite (FavoriteCreate): The favorite data to create.
+        on_conflict (OnConflict, optional): error rejects a favorite that already
+            exists, ignore and update return it. Defaults to error.
 
     Returns:
         Favorite: The created favorite object.
     """
-    return create_favorite(db=db, favorite=favorite)
+    return await run_crud(
+        create_favorite, db, favorite=favorite, on_conflict=on_conflict
+    )
 
 
 @router.get("/{favorite_id}", response_model=Favorite)
@@ -50,7 +62,7 @@ async def read_favorite(favorite_id: int, db: Session = Depends(get_db)) -> Favo
     Returns:
         Favorite: The retrieved favorite object.
     """
-    return get_favorite(db, favorite_id=favorite_id)
+    return await run_crud(get_favorite, db, favorite_id=favorite_id)
 
 
 @router.delete("/{favorite_id}", status_code=204)
@@ -67,24 +79,39 @@ async def delete_favorite_by_id(
     Returns:
         None: No content on successful deletion.
     """
-    delete_favorite(db, favorite_id=favorite_id)
+    await run_crud(delete_favorite, db, favorite_id=favorite_id)
 
 
-@router.get("/", response_model=List[Favorite])
+@router.get("/", response_model=Page[Favorite])
+@handle_http_exceptions(exception_mapping)
 async def read_favorites(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[Favorite]:
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Page[Favorite]:
     """
-    Retrieve a list of favorites with optional pagination.
+    Retrieve a page of favorites.
+
+    Pass the next_cursor of a page as cursor to fetch the following page. skip
+    is only used without a cursor and is kept for compatibility.
 
     Args:
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
 
     Returns:
-        List[Favorite]: List of favorite objects.
+        Page[Favorite]: The favorites and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid (400 Bad Request).
     """
-    return get_favorites(db, skip=skip, limit=limit)
+    favorites = await run_crud(get_favorites, db, skip=skip, limit=limit, cursor=cursor)
+    return {
+        "items": favorites,
+        "next_cursor": next_cursor(favorites, limit, FAVORITE_PAGE_KEY),
+    }
 
 
 @router.get("/buyer/{buyer_id}", response_model=List[Favorite])
@@ -100,7 +127,7 @@ async def read_favorites_by_buyer_id(
     Returns:
         List[Favorite]: List of favorite objects for the specified buyer.
     """
-    favorites = get_favorites_by_buyer_id(db, buyer_id)
+    favorites = await run_crud(get_favorites_by_buyer_id, db, buyer_id)
     if not favorites:
         raise HTTPException(
             status_code=404, detail="No favorites found for this buyer."
@@ -121,7 +148,7 @@ async def read_favorites_by_username(
     Returns:
         List[Favorite]: List of favorite objects for the specified buyer.
     """
-    favorites = get_favorites_by_username(db, username)
+    favorites = await run_crud(get_favorites_by_username, db, username)
     if not favorites:
         raise HTTPException(
             status_code=404, detail="No favorites found for this username."
@@ -1,20 +1,38 @@
 # crafty/routers/product.py
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-
-from crafty.crud.product import (create_product, create_product_image,
-                                 delete_product, get_product,
-                                 get_product_image, get_products,
-                                 get_products_by_seller, update_product)
-from crafty.db.session import get_db
-from crafty.decorators import handle_http_exceptions
-from crafty.exceptions import (NoProductsFoundError, ProductAlreadyExistsError,
+from sqlalchemy.orm.exc import StaleDataError
+
+from crafty.conditional import (has_conditions, make_etag,
+                                not_modified_response, set_validators)
+from crafty.config import get_settings
+from crafty.constants import ProductSort
+from crafty.crud.product import (EXPORT_FIELDS, PRODUCT_PAGE_KEY,
+                                 SEARCH_PAGE_KEY, create_product,
+                                 create_product_image, create_products,
+                                 delete_product, export_products, get_product,
+                                 get_product_facets, get_product_image,
+                                 get_product_version, get_products,
+                                 get_products_by_seller, product_page_key,
+                                 search_products, update_product)
+from crafty.db.dispatch import run_crud
+from crafty.db.session import db_session, get_db
+from crafty.decorators import cached_response, handle_http_exceptions
+from crafty.exceptions import (InvalidCursorError, NoProductsFoundError,
+                               ProductAlreadyExistsError,
                                ProductImageNotFoundError, ProductNotFoundError)
-from crafty.schemas.product import (Product, ProductCreate, ProductImage,
-                                    ProductUpdate)
+from crafty.exporting import (MEDIA_TYPES, ExportFormat, csv_chunks,
+                              gzip_chunks, ndjson_chunks)
+from crafty.pagination import encode_cursor, next_cursor
+from crafty.schemas.pagination import Page
+from crafty.schemas.product import (Product, ProductBulkCreate,
+                                    ProductBulkResponse, ProductCreate,
+                                    ProductImage, ProductPage, ProductUpdate)
 
 router = APIRouter(tags=["products"], prefix="/products")
 
@@ -23,8 +41,22 @@ exception_mapping = {
     ProductNotFoundError: 404,
     ProductImageNotFoundError: 404,
     NoProductsFoundError: 404,
+    InvalidCursorError: 400,
+    # A concurrent write changed the row's version between load and flush
+    StaleDataError: 409,
 }
 
+# Largest page of search results, each page ranks every matching product
+MAX_SEARCH_LIMIT = 100
+
+# Tables the list responses are built from, cached until one of them is written
+PRODUCT_LIST_TABLES = ("products", "product_images", "products_tags", "tags")
+
+
+def _relationships(include_tags: bool) -> tuple:
+    """Relationships to load for a product response; images are always returned."""
+    return ("images", "tags") if include_tags else ("images",)
+
 
 @router.post("/", response_model=Product)
 @handle_http_exceptions(exception_mapping)
@@ -44,17 +76,154 @@ async def create_new_product(
     Raises:
         HTTPException: If a product with the same name already exists (400 Bad Request).
     """
-    return create_product(db=db, product=product)
+    return await run_crud(create_product, db, product=product)
+
+
+@router.post("/bulk", response_model=ProductBulkResponse)
+@handle_http_exceptions(exception_mapping)
+async def create_new_products(
+    products: List[ProductBulkCreate],
+    batch_size: Optional[int] = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_db),
+) -> ProductBulkResponse:
+    """
+    Create many products at once, with their images and tags.
+
+    Products that cannot be created, e.g. because their name is taken, are
+    reported in their result and do not keep the others from being created.
+
+    Args:
+        products (List[ProductBulkCreate]): The products to create.
+        batch_size (int, optional): Products written per INSERT statement.
+            Defaults to PRODUCT_BULK_BATCH_SIZE.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        ProductBulkResponse: The number of created and failed products and the
+            result of every product, in request order.
+    """
+    results = await run_crud(
+        create_products, db, products=products, batch_size=batch_size
+    )
+    created = sum(result["error"] is None for result in results)
+    return ProductBulkResponse(
+        created=created, failed=len(results) - created, results=results
+    )
+
+
+@router.get("/search", response_model=Page[Product])
+@handle_http_exceptions(exception_mapping)
+async def search_for_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    seller_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = None,
+    include_tags: bool = False,
+    db: Session = Depends(get_db),
+) -> Page[Product]:
+    """
+    Search products by name and description, most relevant first.
+
+    Args:
+        q (str): The search query; products matching any of its words are returned.
+        seller_id (int, optional): Only return products of this seller. Defaults to None.
+        tag (str, optional): Only return products with the tag of this name. Defaults to None.
+        limit (int, optional): Maximum number of records to return, at most
+            MAX_SEARCH_LIMIT. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
+        include_tags (bool, optional): Whether to return the product tags. Defaults to False.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        Page[Product]: The matching products and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid (400 Bad Request).
+    """
+    results = await run_crud(
+        search_products,
+        db,
+        q,
+        seller_id=seller_id,
+        tag=tag,
+        limit=limit,
+        cursor=cursor,
+        include=_relationships(include_tags),
+    )
+    next_page = None
+    if results and len(results) == limit:
+        product, relevance = results[-1]
+        next_page = encode_cursor(dict(zip(SEARCH_PAGE_KEY, (relevance, product.id))))
+    return {"items": [product for product, _ in results], "next_cursor": next_page}
+
+
+@router.get("/export")
+@handle_http_exceptions(exception_mapping)
+async def export_catalog(
+    request: Request,
+    format: ExportFormat = Query("ndjson"),
+    since: Optional[datetime] = Query(None),
+) -> StreamingResponse:
+    """
+    Stream the whole product catalog, with the images and tags of every product.
+
+    The response is written while the products are read, a batch at a time, and
+    gzip-compressed on the fly when the client accepts it.
+
+    Args:
+        request (Request): The request, whose Accept-Encoding is honored.
+        format (ExportFormat, optional): "ndjson", one product per line, or
+            "csv", with images and tags separated by "|". Defaults to "ndjson".
+        since (datetime, optional): Only export the products updated at or after
+            this time, e.g. the start of the previous export. Defaults to None.
+
+    Returns:
+        StreamingResponse: The products by ID.
+    """
+
+    def batches():
+        # The stream outlives the request, it reads with sessions of its own
+        with db_session() as db, db_session() as side_db:
+            yield from export_products(
+                db, side_db, since, get_settings().product_export_batch_size
+            )
+
+    if format == "csv":
+        chunks = csv_chunks(batches(), EXPORT_FIELDS)
+    else:
+        chunks = ndjson_chunks(batches())
+    headers = {
+        "Content-Disposition": f'attachment; filename="products.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers=headers)
 
 
 @router.get("/{product_id}", response_model=Product)
 @handle_http_exceptions(exception_mapping)
-async def read_product(product_id: int, db: Session = Depends(get_db)) -> Product:
+async def read_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    include_tags: bool = False,
+    db: Session = Depends(get_db),
+) -> Product:
     """
     Retrieve a product by its ID.
 
+    The response carries an ETag and Last-Modified. A conditional request
+    first looks up only the version of the product and is answered with 304
+    Not Modified when the client's copy is current.
+
     Args:
         product_id (int): The ID of the product to retrieve.
+        request (Request): The request, checked for conditional headers.
+        response (Response): The response the ETag and Last-Modified are set on.
+        include_tags (bool, optional): Whether to return the product tags. Defaults to False.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
@@ -63,25 +232,88 @@ async def read_product(product_id: int, db: Session = Depends(get_db)) -> Produc
     Raises:
         HTTPException: If the product is not found (404 Not Found).
     """
-    return get_product(db, product_id=product_id)
-
-
-@router.get("/", response_model=List[Product])
+    variant = "tags" if include_tags else ""
+    if has_conditions(request):
+        version = await run_crud(get_product_version, db, product_id)
+        etag = make_etag("product", product_id, version.version, variant)
+        not_modified = not_modified_response(request, etag, version.updated_at)
+        if not_modified is not None:
+            return not_modified
+
+    product = await run_crud(
+        get_product, db, product_id=product_id, include=_relationships(include_tags)
+    )
+    etag = make_etag("product", product.id, product.version, variant)
+    set_validators(response, etag, product.updated_at)
+    return product
+
+
+@router.get("/", response_model=ProductPage)
+@handle_http_exceptions(exception_mapping)
+@cached_response(PRODUCT_LIST_TABLES, ProductPage)
 async def read_products(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[Product]:
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    tag: Optional[str] = None,
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    sort: ProductSort = ProductSort.id,
+    include_tags: bool = False,
+    facets: bool = True,
+    db: Session = Depends(get_db),
+) -> ProductPage:
     """
-    Retrieve a list of products with optional pagination.
+    Retrieve a filtered and sorted page of products.
+
+    Pass the next_cursor of a page as cursor to fetch the following page. skip
+    is only used without a cursor and is kept for compatibility. A cursor only
+    continues the sort order it was returned for.
 
     Args:
+        request (Request): The request, its query parameters key the cached response.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
+        seller_id (int, optional): Only return products of this seller. Defaults to None.
+        tag (str, optional): Only return products with the tag of this name. Defaults to None.
+        min_price (int, optional): Lowest price to return, inclusive. Defaults to None.
+        max_price (int, optional): Highest price to return, inclusive. Defaults to None.
+        sort (ProductSort, optional): The sort order. Defaults to ProductSort.id.
+        include_tags (bool, optional): Whether to return the product tags. Defaults to False.
+        facets (bool, optional): Whether to return the facet counts of all matching
+            products per tag and price range. Defaults to True.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        List[Product]: A list of product objects.
+        ProductPage: The products, the cursor of the next page and the facet counts.
+
+    Raises:
+        HTTPException: If the cursor is invalid (400 Bad Request).
     """
-    return get_products(db, skip=skip, limit=limit)
+    filters = {
+        "seller_id": seller_id,
+        "tag": tag,
+        "min_price": min_price,
+        "max_price": max_price,
+    }
+    products = await run_crud(
+        get_products,
+        db,
+        skip=skip,
+        limit=limit,
+        include=_relationships(include_tags),
+        cursor=cursor,
+        sort=sort,
+        **filters,
+    )
+    columns, _ = product_page_key(sort)
+    page = {"items": products, "next_cursor": next_cursor(products, limit, columns)}
+    if facets:
+        page["facets"] = await run_crud(get_product_facets, db, **filters)
+    return page
 
 
 @router.put("/{product_id}", response_model=Product)
@@ -103,7 +335,9 @@ async def update_existing_product(
     Raises:
         HTTPException: If the product is not found (404 Not Found).
     """
-    return update_product(db, product_id=product_id, product_update=product_update)
+    return await run_crud(
+        update_product, db, product_id=product_id, product_update=product_update
+    )
 
 
 @router.delete("/{product_id}", status_code=204)
@@ -119,7 +353,7 @@ async def delete_existing_product(product_id: int, db: Session = Depends(get_db)
     Raises:
         HTTPException: If the product is not found (404 Not Found).
     """
-    await delete_product(db, product_id=product_id)
+    await run_crud(delete_product, db, product_id=product_id)
 
 
 @router.post("/{product_id}/images/", response_model=ProductImage)
@@ -141,7 +375,9 @@ async def create_new_product_image(
     Raises:
         HTTPException: If the product is not found (404 Not Found).
     """
-    return create_product_image(db, image_url=image_url, product_id=product_id)
+    return await run_crud(
+        create_product_image, db, image_url=image_url, product_id=product_id
+    )
 
 
 @router.get("/images/{image_id}", response_model=ProductImage)
@@ -162,31 +398,52 @@ async def read_product_image(
     Raises:
         HTTPException: If the image is not found (404 Not Found).
     """
-    return get_product_image(db, image_id=image_id)
+    return await run_crud(get_product_image, db, image_id=image_id)
 
 
-@router.get("/sellers/{seller_id}/products/", response_model=List[Product])
+@router.get("/sellers/{seller_id}/products/", response_model=Page[Product])
 @handle_http_exceptions(exception_mapping)
 async def read_products_by_seller(
-    seller_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[Product]:
+    seller_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_tags: bool = False,
+    db: Session = Depends(get_db),
+) -> Page[Product]:
     """
     Retrieve all products associated with a specific seller.
 
     This endpoint fetches a list of products that belong to a seller specified by their ID.
-    It supports pagination through the 'skip' and 'limit' parameters.
+    It supports pagination through the 'cursor' and 'limit' parameters, with 'skip'
+    kept for compatibility.
 
     Args:
         seller_id (int): The ID of the seller whose products are to be retrieved.
         skip (int, optional): The number of records to skip (for pagination). Defaults to 0.
         limit (int, optional): The maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
+        include_tags (bool, optional): Whether to return the product tags. Defaults to False.
         db (Session, optional): The database session, automatically provided by FastAPI's dependency injection.
 
     Returns:
-        List[Product]: A list of product objects associated with the specified seller.
+        Page[Product]: The seller's products and the cursor of the next page.
 
     Raises:
         NoProductsFoundError: If no products are found for the specified seller.
+        InvalidCursorError: If the cursor is invalid.
         HTTPException: If there is an internal server error while processing the request.
     """
-    return get_products_by_seller(db, seller_id, skip=skip, limit=limit)
+    products = await run_crud(
+        get_products_by_seller,
+        db,
+        seller_id,
+        skip=skip,
+        limit=limit,
+        include=_relationships(include_tags),
+        cursor=cursor,
+    )
+    return {
+        "items": products,
+        "next_cursor": next_cursor(products, limit, PRODUCT_PAGE_KEY),
+    }
@@ -1,14 +1,19 @@
-from typing import List
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.orm import Session
 
-from crafty.crud.review import (create_review, delete_review, get_review,
-                                get_reviews)
+from crafty.constants import OnConflict
+from crafty.crud.review import (REVIEW_PAGE_KEY, create_review, delete_review,
+                                get_review, get_reviews)
+from crafty.db.dispatch import run_crud
 from crafty.db.session import get_db
-from crafty.decorators import handle_http_exceptions
-from crafty.exceptions import ReviewAlreadyExistsError, ReviewNotFoundError
+from crafty.decorators import cached_response, handle_http_exceptions
+from crafty.exceptions import (InvalidCursorError, ReviewAlreadyExistsError,
+                               ReviewNotFoundError)
+from crafty.pagination import next_cursor
+from crafty.schemas.pagination import Page
 from crafty.schemas.review import Review, ReviewCreate
 
 router = APIRouter(tags=["reviews"], prefix="/reviews")
@@ -16,19 +21,28 @@ router = APIRouter(tags=["reviews"], prefix="/reviews")
 exception_mapping = {
     ReviewNotFoundError: 404,
     ReviewAlreadyExistsError: 400,
+    InvalidCursorError: 400,
 }
 
+# Tables the list responses are built from, cached until one of them is written
+REVIEW_LIST_TABLES = ("reviews",)
+
 
 @router.post("/", response_model=Review)
 @handle_http_exceptions(exception_mapping)
 async def create_new_review(
-    review: ReviewCreate, db: Session = Depends(get_db)
+    review: ReviewCreate,
+    on_conflict: OnConflict = Query(OnConflict.error),
+    db: Session = Depends(get_db),
 ) -> Review:
     """
     Create a new review.
 
     Args:
         review (ReviewCreate): The review data to create.
+        on_conflict (OnConflict, optional): error rejects a review that already
+            exists, ignore returns it unchanged and update overwrites its rating
+            and comment. Defaults to error.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
@@ -37,7 +51,7 @@ async def create_new_review(
     Raises:
         ReviewAlreadyExistsError: If a review already exists for the given reviewer, reviewed user, and product.
     """
-    return create_review(db=db, review=review)
+    return await run_crud(create_review, db, review=review, on_conflict=on_conflict)
 
 
 @router.get("/{review_id}", response_model=Review)
@@ -56,7 +70,7 @@ async def read_review(review_id: int, db: Session = Depends(get_db)) -> Review:
     Raises:
         ReviewNotFoundError: If the review with the given ID does not exist.
     """
-    return get_review(db, review_id=review_id)
+    return await run_crud(get_review, db, review_id=review_id)
 
 
 @router.delete("/{review_id}", status_code=204)
@@ -72,22 +86,40 @@ async def delete_review_by_id(review_id: int, db: Session = Depends(get_db)) ->
     Raises:
         ReviewNotFoundError: If the review with the given ID does not exist.
     """
-    delete_review(db, review_id=review_id)
+    await run_crud(delete_review, db, review_id=review_id)
 
 
-@router.get("/", response_model=List[Review])
+@router.get("/", response_model=Page[Review])
+@handle_http_exceptions(exception_mapping)
+@cached_response(REVIEW_LIST_TABLES, Page[Review])
 async def read_reviews(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[Review]:
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Page[Review]:
     """
-    Retrieve a list of reviews with optional pagination.
+    Retrieve a page of reviews.
+
+    Pass the next_cursor of a page as cursor to fetch the following page. skip
+    is only used without a cursor and is kept for compatibility.
 
     Args:
+        request (Request): The request, its query parameters key the cached response.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        List[Review]: A list of review objects.
+        Page[Review]: The reviews and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid (400 Bad Request).
     """
-    return get_reviews(db, skip=skip, limit=limit)
+    reviews = await run_crud(get_reviews, db, skip=skip, limit=limit, cursor=cursor)
+    return {
+        "items": reviews,
+        "next_cursor": next_cursor(reviews, limit, REVIEW_PAGE_KEY),
+    }
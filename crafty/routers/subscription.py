@@ -1,14 +1,19 @@
-from typing import List
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from crafty.crud.subscription import (create_subscription, get_subscription,
+from crafty.crud.subscription import (SUBSCRIPTION_PAGE_KEY,
+                                      create_subscription, get_subscription,
                                       get_subscriptions)
+from crafty.db.dispatch import run_crud
 from crafty.db.session import get_db
 from crafty.decorators import handle_http_exceptions
-from crafty.exceptions import (SubscriptionAlreadyExistsError,
+from crafty.exceptions import (InvalidCursorError,
+                               SubscriptionAlreadyExistsError,
                                SubscriptionNotFoundError)
+from crafty.pagination import next_cursor
+from crafty.schemas.pagination import Page
 from crafty.schemas.subscription import Subscription, SubscriptionCreate
 
 router = APIRouter(tags=["subscriptions"], prefix="/subscriptions")
@@ -17,6 +22,7 @@ router = APIRouter(tags=["subscriptions"], prefix="/subscriptions")
 exception_mapping = {
     SubscriptionNotFoundError: 404,
     SubscriptionAlreadyExistsError: 400,
+    InvalidCursorError: 400,
 }
 
 
@@ -38,7 +44,7 @@ async def create_new_subscription(
     Raises:
         SubscriptionAlreadyExistsError: If a subscription with the same name already exists.
     """
-    return await create_subscription(db=db, subscription=subscription)
+    return await run_crud(create_subscription, db, subscription=subscription)
 
 
 @router.get("/{subscription_id}", response_model=Subscription)
@@ -59,26 +65,40 @@ async def read_subscription(
     Raises:
         SubscriptionNotFoundError: If no subscription with the given ID exists.
     """
-    return await get_subscription(db, subscription_id=subscription_id)
+    return await run_crud(get_subscription, db, subscription_id=subscription_id)
 
 
-@router.get("/", response_model=List[Subscription])
+@router.get("/", response_model=Page[Subscription])
 @handle_http_exceptions(exception_mapping)
 async def read_subscriptions(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[Subscription]:
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Page[Subscription]:
     """
-    Retrieve a list of subscriptions with optional pagination.
+    Retrieve a page of subscriptions.
+
+    Pass the next_cursor of a page as cursor to fetch the following page. skip
+    is only used without a cursor and is kept for compatibility.
 
     Args:
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
         db (Session): The database session. Automatically injected by FastAPI's dependency injection.
 
     Returns:
-        List[Subscription]: List of subscription objects.
+        Page[Subscription]: The subscriptions and the cursor of the next page.
 
     Raises:
-        HTTPException: If any unexpected errors occur (handled by the decorator).
+        HTTPException: If the cursor is invalid (400 Bad Request) or any unexpected
+            errors occur (handled by the decorator).
     """
-    return await get_subscriptions(db, skip=skip, limit=limit)
+    subscriptions = await run_crud(
+        get_subscriptions, db, skip=skip, limit=limit, cursor=cursor
+    )
+    return {
+        "items": subscriptions,
+        "next_cursor": next_cursor(subscriptions, limit, SUBSCRIPTION_PAGE_KEY),
+    }
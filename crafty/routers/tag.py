@@ -1,31 +1,76 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from crafty.crud.tag import (create_tag, delete_tag, get_tag, get_tag_by_name,
-                             get_tags)
+from crafty.conditional import (has_conditions, make_etag,
+                                not_modified_response, set_validators)
+from crafty.constants import OnConflict
+from crafty.crud.product import PRODUCT_PAGE_KEY
+from crafty.crud.tag import (TAG_PAGE_KEY, attach_tags, create_tag, delete_tag,
+                             detach_tags, get_tag, get_tag_by_name,
+                             get_tag_products, get_tags)
+from crafty.db.dispatch import run_crud
 from crafty.db.session import get_db
-from crafty.decorators import handle_http_exceptions
-from crafty.exceptions import TagAlreadyExistsError, TagNotFoundError
-from crafty.schemas.tag import Tag, TagCreate
+from crafty.decorators import cached_response, handle_http_exceptions
+from crafty.exceptions import (InvalidCursorError, ProductNotFoundError,
+                               TagAlreadyExistsError, TagNotFoundError)
+from crafty.pagination import next_cursor
+from crafty.schemas.pagination import Page
+from crafty.schemas.product import Product
+from crafty.schemas.tag import ProductTags, ProductTagsUpdate, Tag, TagCreate
 
 router = APIRouter(tags=["tags"], prefix="/tags")
 
 exception_mapping = {
     TagNotFoundError: 404,
     TagAlreadyExistsError: 400,
+    InvalidCursorError: 400,
+    ProductNotFoundError: 404,
+    StaleDataError: 409,
 }
 
+# Tables the list responses are built from, cached until one of them is written
+TAG_LIST_TABLES = ("tags",)
+
+
+async def _read_tag(
+    request: Request, response: Response, db: Session, identifier, identifier_type: str
+):
+    """
+    Load a tag for a GET route, answering conditional requests with 304.
+
+    Tags are served from the tag dictionary, so checking the client's copy
+    needs no separate version lookup.
+    """
+    if identifier_type == "id":
+        tag = await run_crud(get_tag, db, tag_id=identifier)
+    else:
+        tag = await run_crud(get_tag_by_name, db, tag_name=identifier)
+    etag = make_etag("tag", tag.id, tag.version)
+    if has_conditions(request):
+        not_modified = not_modified_response(request, etag, tag.updated_at)
+        if not_modified is not None:
+            return not_modified
+    set_validators(response, etag, tag.updated_at)
+    return tag
+
 
 @router.post("/", response_model=Tag)
 @handle_http_exceptions(exception_mapping)
-async def create_new_tag(tag: TagCreate, db: Session = Depends(get_db)) -> Tag:
+async def create_new_tag(
+    tag: TagCreate,
+    on_conflict: OnConflict = Query(OnConflict.error),
+    db: Session = Depends(get_db),
+) -> Tag:
     """
     Create a new tag.
 
     Args:
         tag (TagCreate): The tag data to create.
+        on_conflict (OnConflict, optional): error rejects a tag that already
+            exists, ignore and update return it. Defaults to error.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
@@ -34,47 +79,57 @@ async def create_new_tag(tag: TagCreate, db: Session = Depends(get_db)) -> Tag:
     Raises:
         HTTPException: If a tag with the same name already exists or other internal errors occur.
     """
-    return create_tag(db=db, tag=tag)
+    return await run_crud(create_tag, db, tag=tag, on_conflict=on_conflict)
 
 
 @router.get("/{tag_id}", response_model=Tag)
 @handle_http_exceptions(exception_mapping)
-async def read_tag(tag_id: int, db: Session = Depends(get_db)) -> Tag:
+async def read_tag(
+    tag_id: int, request: Request, response: Response, db: Session = Depends(get_db)
+) -> Tag:
     """
     Retrieve a tag by ID.
 
     Args:
         tag_id (int): The ID of the tag to retrieve.
+        request (Request): The request, checked for conditional headers.
+        response (Response): The response the ETag and Last-Modified are set on.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        Tag: The retrieved tag object.
+        Tag: The retrieved tag object, or 304 Not Modified when the client's copy
+            is current.
 
     Raises:
         TagNotFoundError: If no tag with the specified ID exists.
         HTTPException: If other internal errors occur.
     """
-    return get_tag(db, tag_id=tag_id)
+    return await _read_tag(request, response, db, tag_id, "id")
 
 
 @router.get("/name/{tag_name}", response_model=Tag)
 @handle_http_exceptions(exception_mapping)
-async def read_tag_by_name(tag_name: str, db: Session = Depends(get_db)) -> Tag:
+async def read_tag_by_name(
+    tag_name: str, request: Request, response: Response, db: Session = Depends(get_db)
+) -> Tag:
     """
     Retrieve a tag by name.
 
     Args:
         tag_name (str): The name of the tag to retrieve.
+        request (Request): The request, checked for conditional headers.
+        response (Response): The response the ETag and Last-Modified are set on.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        Tag: The retrieved tag object.
+        Tag: The retrieved tag object, or 304 Not Modified when the client's copy
+            is current.
 
     Raises:
         TagNotFoundError: If no tag with the specified name exists.
         HTTPException: If other internal errors occur.
     """
-    return get_tag_by_name(db, tag_name=tag_name)
+    return await _read_tag(request, response, db, tag_name, "name")
 
 
 @router.delete("/{tag_id}", response_model=dict)
@@ -94,27 +149,127 @@ async def delete_existing_tag(tag_id: int, db: Session = Depends(get_db)) -> dic
         TagNotFoundError: If no tag with the specified ID exists.
         HTTPException: If other internal errors occur.
     """
-    delete_tag(db, tag_id=tag_id)
+    await run_crud(delete_tag, db, tag_id=tag_id)
     return {"detail": "Tag deleted successfully."}
 
 
-@router.get("/", response_model=List[Tag])
+@router.get("/", response_model=Page[Tag])
 @handle_http_exceptions(exception_mapping)
+@cached_response(TAG_LIST_TABLES, Page[Tag])
 async def read_tags(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[Tag]:
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    prefix: Optional[str] = Query(None, min_length=1, max_length=50),
+    db: Session = Depends(get_db),
+) -> Page[Tag]:
     """
-    Retrieve a list of tags with optional pagination.
+    Retrieve a page of tags, optionally only those whose name starts with prefix.
+
+    Pass the next_cursor of a page as cursor to fetch the following page. skip
+    is only used without a cursor and is kept for compatibility.
 
     Args:
+        request (Request): The request, its query parameters key the cached response.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
+        prefix (str, optional): Case-insensitive prefix of the tag names. Defaults to None.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        List[Tag]: A list of tag objects.
+        Page[Tag]: The tags and the cursor of the next page.
 
     Raises:
-        HTTPException: If other internal errors occur.
+        HTTPException: If the cursor is invalid (400 Bad Request) or other internal errors occur.
+    """
+    tags = await run_crud(
+        get_tags, db, skip=skip, limit=limit, cursor=cursor, prefix=prefix
+    )
+    return {"items": tags, "next_cursor": next_cursor(tags, limit, TAG_PAGE_KEY)}
+
+
+@router.post("/attach", response_model=List[ProductTags])
+@handle_http_exceptions(exception_mapping)
+async def attach_tags_to_products(
+    updates: List[ProductTagsUpdate], db: Session = Depends(get_db)
+) -> List[ProductTags]:
+    """
+    Attach tags to many products in one request.
+
+    Tags that are already attached to a product are left as they are.
+
+    Args:
+        updates (List[ProductTagsUpdate]): The tags to attach to each product.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        List[ProductTags]: The resulting tags of every updated product.
+
+    Raises:
+        HTTPException: If a product or tag does not exist (404 Not Found).
+    """
+    if not updates:
+        return []
+    return await run_crud(attach_tags, db, updates)
+
+
+@router.post("/detach", response_model=List[ProductTags])
+@handle_http_exceptions(exception_mapping)
+async def detach_tags_from_products(
+    updates: List[ProductTagsUpdate], db: Session = Depends(get_db)
+) -> List[ProductTags]:
+    """
+    Detach tags from many products in one request.
+
+    Tags that are not attached to a product are ignored.
+
+    Args:
+        updates (List[ProductTagsUpdate]): The tags to detach from each product.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        List[ProductTags]: The resulting tags of every updated product.
+
+    Raises:
+        HTTPException: If a product or tag does not exist (404 Not Found).
+    """
+    if not updates:
+        return []
+    return await run_crud(detach_tags, db, updates)
+
+
+@router.get("/{tag_id}/products", response_model=Page[Product])
+@handle_http_exceptions(exception_mapping)
+async def read_tag_products(
+    tag_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Page[Product]:
+    """
+    Retrieve a page of the products with a tag.
+
+    Args:
+        tag_id (int): The ID of the tag.
+        skip (int, optional): Number of records to skip. Defaults to 0.
+        limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        Page[Product]: The products and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the tag is not found (404 Not Found) or the cursor is
+            invalid (400 Bad Request).
     """
-    return get_tags(db, skip=skip, limit=limit)
+    products = await run_crud(
+        get_tag_products, db, tag_id, skip=skip, limit=limit, cursor=cursor
+    )
+    return {
+        "items": products,
+        "next_cursor": next_cursor(products, limit, PRODUCT_PAGE_KEY),
+    }
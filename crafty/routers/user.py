@@ -1,14 +1,28 @@
-from typing import List
+import logging
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-
-from crafty.crud.user import create_user, delete_user, get_user, get_users
+from sqlalchemy.orm.exc import StaleDataError
+
+from crafty.conditional import (has_conditions, make_etag,
+                                not_modified_response, set_validators)
+from crafty.config import get_settings
+from crafty.crud.user import (USER_PAGE_KEY, create_user, delete_user,
+                              get_availability, get_user, get_user_version,
+                              get_users, import_users)
+from crafty.db.dispatch import run_crud
 from crafty.db.session import get_db
 from crafty.decorators import handle_http_exceptions
-from crafty.exceptions import (InvalidUserTypeError, UserAlreadyExistsError,
-                               UserNotFoundError)
-from crafty.schemas.user import UserCreate, UserResponse
+from crafty.exceptions import (InvalidCursorError, InvalidUserTypeError,
+                               UserAlreadyExistsError, UserNotFoundError)
+from crafty.importing import ImportFormat, ImportReport, read_stream_batches
+from crafty.pagination import next_cursor
+from crafty.schemas.pagination import Page
+from crafty.schemas.user import (UserAvailability, UserCreate,
+                                 UserImportReport, UserResponse)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["users"], prefix="/users")
 
@@ -16,9 +30,37 @@ exception_mapping = {
     UserAlreadyExistsError: 400,
     InvalidUserTypeError: 400,
     UserNotFoundError: 404,
+    InvalidCursorError: 400,
+    StaleDataError: 409,
 }
 
 
+async def _read_user(
+    request: Request,
+    response: Response,
+    db: Session,
+    identifier: str,
+    identifier_type: str,
+):
+    """
+    Load a user for a GET route, answering conditional requests with 304.
+
+    A conditional request first looks up only the version of the user, so a
+    client holding the current version gets its 304 without the user being
+    loaded.
+    """
+    if has_conditions(request):
+        version = await run_crud(get_user_version, db, identifier, identifier_type)
+        etag = make_etag("user", version.id, version.version)
+        not_modified = not_modified_response(request, etag, version.updated_at)
+        if not_modified is not None:
+            return not_modified
+
+    user = await run_crud(get_user, db, identifier, identifier_type)
+    set_validators(response, make_etag("user", user.id, user.version), user.updated_at)
+    return user
+
+
 @router.post("/", response_model=UserResponse)
 @handle_http_exceptions(exception_mapping)
 async def create_new_user(
@@ -38,84 +80,171 @@ async def create_new_user(
         HTTPException: If a user with the same email or username already exists,
                        or other internal errors occur.
     """
-    return create_user(db=db, user=user)
+    return await run_crud(create_user, db, user=user)
 
 
-@router.get("/", response_model=List[UserResponse])
+@router.post("/import", response_model=UserImportReport)
+@handle_http_exceptions(exception_mapping)
+async def import_new_users(
+    request: Request,
+    format: ImportFormat = Query("ndjson"),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    db: Session = Depends(get_db),
+) -> UserImportReport:
+    """
+    Import users from an NDJSON or CSV request body.
+
+    The body is read as it arrives and imported batch_size rows at a time, each
+    batch committed on its own, so memory use does not grow with the body.
+    Rows that are invalid or whose username or email is taken are skipped and
+    reported.
+
+    Args:
+        request (Request): The request streaming the rows, one user per line.
+            CSV starts with a header naming the UserCreate fields.
+        format (ImportFormat, optional): "ndjson" or "csv". Defaults to "ndjson".
+        batch_size (int, optional): Rows per batch. Defaults to USER_IMPORT_BATCH_SIZE.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        UserImportReport: The number of rows, imported users and failed rows,
+            with the first errors.
+    """
+    report = ImportReport()
+    batch_size = batch_size or get_settings().user_import_batch_size
+    async for batch in read_stream_batches(request.stream(), format, batch_size):
+        report.add(**await run_crud(import_users, db, rows=batch))
+        logger.info(
+            f"User import: {report.rows} rows, {report.imported} imported, "
+            f"{report.failed} failed"
+        )
+    return report.as_dict()
+
+
+@router.get("/", response_model=Page[UserResponse])
+@handle_http_exceptions(exception_mapping)
 async def read_users(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
-) -> List[UserResponse]:
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Page[UserResponse]:
     """
-    Retrieve a list of users with optional pagination.
+    Retrieve a page of users.
+
+    Pass the next_cursor of a page as cursor to fetch the following page. skip
+    is only used without a cursor and is kept for compatibility.
 
     Args:
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        cursor (str, optional): The next_cursor of the previous page. Defaults to None.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        List[UserResponse]: A list of user objects.
+        Page[UserResponse]: The users and the cursor of the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid (400 Bad Request).
     """
-    return get_users(db, skip=skip, limit=limit)
+    users = await run_crud(get_users, db, skip=skip, limit=limit, cursor=cursor)
+    return {"items": users, "next_cursor": next_cursor(users, limit, USER_PAGE_KEY)}
+
+
+@router.get("/availability", response_model=UserAvailability)
+@handle_http_exceptions(exception_mapping)
+async def read_availability(
+    username: Optional[str] = Query(None, min_length=1, max_length=50),
+    email: Optional[str] = Query(None, min_length=1, max_length=100),
+    db: Session = Depends(get_db),
+) -> UserAvailability:
+    """
+    Check whether a username and an email are still free, e.g. while signing up.
+
+    Identifiers no user has are usually answered from memory, without a
+    database query.
+
+    Args:
+        username (str, optional): The username to check. Defaults to None.
+        email (str, optional): The email to check. Defaults to None.
+        db (Session, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        UserAvailability: Whether each given identifier is available.
+    """
+    return await run_crud(get_availability, db, username=username, email=email)
 
 
 @router.get("/email/{email}", response_model=UserResponse)
 @handle_http_exceptions(exception_mapping)
-async def read_user_by_email(email: str, db: Session = Depends(get_db)) -> UserResponse:
+async def read_user_by_email(
+    email: str, request: Request, response: Response, db: Session = Depends(get_db)
+) -> UserResponse:
     """
     Get a user by their email.
 
     Args:
         email (str): The email of the user to retrieve.
+        request (Request): The request, checked for conditional headers.
+        response (Response): The response the ETag and Last-Modified are set on.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        UserResponse: The retrieved user object.
+        UserResponse: The retrieved user object, or 304 Not Modified when the
+            client's copy is current.
 
     Raises:
         HTTPException: If the user is not found or other internal errors occur.
     """
-    return get_user(db, email, "email")
+    return await _read_user(request, response, db, email, "email")
 
 
 @router.get("/username/{username}", response_model=UserResponse)
 @handle_http_exceptions(exception_mapping)
 async def read_user_by_username(
-    username: str, db: Session = Depends(get_db)
+    username: str, request: Request, response: Response, db: Session = Depends(get_db)
 ) -> UserResponse:
     """
     Get a user by their username.
 
     Args:
         username (str): The username of the user to retrieve.
+        request (Request): The request, checked for conditional headers.
+        response (Response): The response the ETag and Last-Modified are set on.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        UserResponse: The retrieved user object.
+        UserResponse: The retrieved user object, or 304 Not Modified when the
+            client's copy is current.
 
     Raises:
         HTTPException: If the user is not found or other internal errors occur.
     """
-    return get_user(db, username, "username")
+    return await _read_user(request, response, db, username, "username")
 
 
 @router.get("/id/{user_id}", response_model=UserResponse)
 @handle_http_exceptions(exception_mapping)
-async def read_user_by_id(user_id: int, db: Session = Depends(get_db)) -> UserResponse:
+async def read_user_by_id(
+    user_id: int, request: Request, response: Response, db: Session = Depends(get_db)
+) -> UserResponse:
     """
     Get a user by their ID.
 
     Args:
         user_id (int): The ID of the user to retrieve.
+        request (Request): The request, checked for conditional headers.
+        response (Response): The response the ETag and Last-Modified are set on.
         db (Session, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        UserResponse: The retrieved user object.
+        UserResponse: The retrieved user object, or 304 Not Modified when the
+            client's copy is current.
 
     Raises:
         HTTPException: If the user is not found or other internal errors occur.
     """
-    return get_user(db, user_id, "id")
+    return await _read_user(request, response, db, user_id, "id")
 
 
 @router.delete("/{user_id}", status_code=204)
@@ -131,4 +260,4 @@ async def delete_existing_user(user_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the user is not found or other internal errors occur.
     """
-    delete_user(db, user_id, "id")
+    await run_crud(delete_user, db, user_id, "id")
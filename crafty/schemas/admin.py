@@ -0,0 +1,127 @@
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class HistogramSnapshot(BaseModel):
+    """
+    Schema representing a latency histogram in seconds with cumulative buckets.
+    """
+
+    count: int
+    sum: float
+    buckets: Dict[str, int]
+
+
+class PoolStatus(BaseModel):
+    """
+    Schema representing the live state and telemetry of a connection pool.
+    """
+
+    name: str
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    timeout: float
+    peak_checked_out: int
+    checkouts: int
+    connects: int
+    invalidations: int
+    checkout_latency: HistogramSnapshot
+    pre_ping_latency: HistogramSnapshot
+
+
+class ExecutorStatus(BaseModel):
+    """
+    Schema representing the admission state of the "executor" database mode.
+    """
+
+    capacity: int
+    in_use: int
+    waiting: int
+    rejected: int
+
+
+class DatabasePoolReport(BaseModel):
+    """
+    Schema representing the state of every connection pool of the process.
+    """
+
+    pools: List[PoolStatus]
+    executor: ExecutorStatus
+
+
+class RouteQueryStats(BaseModel):
+    """
+    Schema representing the SQL statements executed by the requests of one route.
+    """
+
+    requests: int
+    statements: int
+    avg_statements: float
+    max_statements: int
+    db_time: float
+    repeated: Dict[str, int]
+
+
+class CacheStats(BaseModel):
+    """
+    Schema representing the counters of the cache backend of the process.
+
+    Counters a backend does not keep are reported as 0. For the "redis" backend
+    the entries, bytes and evictions are those of the near cache of the process.
+    """
+
+    backend: str
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+    pinned: int = 0
+    hits: int = 0
+    local_hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    remote_invalidations: int = 0
+    errors: int = 0
+
+
+class CoalescingStats(BaseModel):
+    """
+    Schema representing the counters of the coalesced crud reads of the process.
+    """
+
+    calls: int
+    executions: int
+    collapsed: int
+    in_flight: int
+    in_flight_peak: int
+
+
+class HotKey(BaseModel):
+    """
+    Schema representing a frequently read key and its estimated read count.
+    """
+
+    key: str
+    count: int
+    pinned: bool
+
+
+class HotKeysReport(BaseModel):
+    """
+    Schema representing the keys read most in this process.
+
+    Counts are estimates, halved every HOT_KEY_WINDOW seconds.
+    """
+
+    reads: int
+    threshold: int
+    pinned: int
+    refreshes: int
+    refresh_errors: int
+    keys: List[HotKey]
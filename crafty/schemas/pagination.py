@@ -0,0 +1,17 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    Schema representing one page of a list endpoint.
+
+    next_cursor is passed as the cursor parameter to fetch the following page
+    and is null on the last page.
+    """
+
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,11 @@
+from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, conint
+from pydantic import BaseModel, Field, conint, model_validator
+from sqlalchemy import inspect
+
+from crafty.schemas.pagination import Page
+from crafty.schemas.tag import Tag
 
 
 class ProductCreate(BaseModel):
@@ -20,6 +25,15 @@ class ProductCreate(BaseModel):
     )
 
 
+class ProductBulkCreate(ProductCreate):
+    """
+    Schema for one product of a bulk creation, with its images and tags.
+    """
+
+    images: List[str] = Field([], description="The URLs of the product images.")
+    tags: List[str] = Field([], description="The names of existing tags to attach.")
+
+
 class ProductUpdate(BaseModel):
     """
     Schema for updating an existing product.
@@ -57,6 +71,20 @@ class Product(BaseModel):
     price: int
     seller_id: int
     images: List[ProductImageCreate] = []
+    tags: Optional[List[Tag]] = None
+    version: int
+    updated_at: datetime
+
+    @model_validator(mode="before")
+    @classmethod
+    def skip_unloaded_tags(cls, data):
+        """Report tags as null unless they were loaded, instead of lazy-loading them."""
+        state = inspect(data, raiseerr=False)
+        if state is None or "tags" not in state.unloaded:
+            return data
+        return {
+            name: getattr(data, name) for name in cls.model_fields if name != "tags"
+        }
 
     class Config:
         from_attributes = True  # Ensure Pydantic can work with SQLAlchemy models.
@@ -73,3 +101,63 @@ class ProductImage(BaseModel):
 
     class Config:
         from_attributes = True  # Ensure Pydantic can work with SQLAlchemy models.
+
+
+class TagFacet(BaseModel):
+    """
+    Schema representing the number of matching products with a tag.
+    """
+
+    name: str
+    count: int
+
+
+class PriceFacet(BaseModel):
+    """
+    Schema representing the number of matching products in a price range.
+    """
+
+    min_price: int = Field(..., description="Lowest price of the range, inclusive.")
+    max_price: Optional[int] = Field(
+        None, description="Highest price of the range, exclusive. Null if unbounded."
+    )
+    count: int
+
+
+class ProductFacets(BaseModel):
+    """
+    Schema representing the facet counts of a product list.
+    """
+
+    tags: List[TagFacet] = []
+    prices: List[PriceFacet] = []
+
+
+class ProductBulkResult(BaseModel):
+    """
+    Schema representing the outcome of one product of a bulk creation.
+    """
+
+    index: int = Field(..., description="The position of the product in the request.")
+    product: Optional[Product] = Field(None, description="The created product.")
+    error: Optional[str] = Field(
+        None, description="Why the product was not created, if it was not."
+    )
+
+
+class ProductBulkResponse(BaseModel):
+    """
+    Schema for the response of a bulk creation of products.
+    """
+
+    created: int
+    failed: int
+    results: List[ProductBulkResult]
+
+
+class ProductPage(Page[Product]):
+    """
+    Schema representing a page of products with the facet counts of all matches.
+    """
+
+    facets: Optional[ProductFacets] = None
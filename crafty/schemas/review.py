@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 from crafty.constants import Rating
 
@@ -29,5 +29,11 @@ class Review(BaseModel):
     reviewed_user_id: Optional[int]
     product_id: Optional[int]
 
+    @field_validator("rating", mode="before")
+    @classmethod
+    def rating_value(cls, rating):
+        """Report the rating stored as a Rating member by its number."""
+        return int(rating.value) if isinstance(rating, Rating) else rating
+
     class Config:
         from_attributes = True
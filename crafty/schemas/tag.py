@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
 
 
 class TagCreate(BaseModel):
@@ -16,6 +19,26 @@ class Tag(BaseModel):
 
     id: int
     name: str
+    version: int
+    updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ProductTagsUpdate(BaseModel):
+    """
+    Schema for attaching tags to or detaching tags from a product.
+    """
+
+    product_id: int
+    tag_ids: List[int] = Field(..., min_length=1)
+
+
+class ProductTags(BaseModel):
+    """
+    Schema representing the tags of a product.
+    """
+
+    product_id: int
+    tags: List[Tag]
@@ -1,5 +1,6 @@
 import re
-from typing import Annotated, Optional
+from datetime import datetime
+from typing import Annotated, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
@@ -55,6 +56,8 @@ class UserBase(BaseModel):
         username (str): The username of the user.
         email (EmailStr): The email of the user.
         user_type (UserType): The type of the user (either 'buyer' or 'seller').
+        version (int): The version of the user row, bumped on every update.
+        updated_at (datetime): When the user was last updated, in UTC.
 
     Config:
         use_enum_values (bool): Ensures that enum values are used when parsing and serializing.
@@ -64,6 +67,8 @@ class UserBase(BaseModel):
     username: str
     email: EmailStr
     user_type: UserType
+    version: int
+    updated_at: datetime
 
     class Config:
         use_enum_values = True
@@ -106,3 +111,38 @@ class UserResponse(UserBase):
     """
 
     pass
+
+
+class UserImportError(BaseModel):
+    """
+    Schema representing a row of a user import that was not imported.
+    """
+
+    line: int = Field(..., description="The line of the row in the import.")
+    error: str = Field(..., description="Why the row was not imported.")
+
+
+class UserImportReport(BaseModel):
+    """
+    Schema for the outcome of a user import.
+
+    Only the first errors are listed, failed counts all of them.
+    """
+
+    rows: int
+    imported: int
+    failed: int
+    errors: List[UserImportError]
+
+
+class UserAvailability(BaseModel):
+    """
+    Schema for the response of a username and email availability check.
+
+    Attributes:
+        username_available (Optional[bool]): Whether the username is free, None if not checked.
+        email_available (Optional[bool]): Whether the email is free, None if not checked.
+    """
+
+    username_available: Optional[bool] = None
+    email_available: Optional[bool] = None
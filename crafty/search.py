@@ -0,0 +1,132 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+_TOKEN = re.compile(r"\w+")
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+# Matches in the product name count as much as this many matches in the description
+NAME_WEIGHT = 2
+
+# Decimal places scores are rounded to, so equal scores compare equal in cursors
+SCORE_DIGITS = 9
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """Split a text into lowercase word tokens."""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """
+    In-process inverted index ranking documents with BM25.
+
+    Used for product search where the database has no full-text index, e.g.
+    SQLite in local runs. The index is built from the database on first use
+    and kept up to date by the crud functions writing products, so it only
+    sees the writes made by this process.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._terms = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._built = False
+        self._lock = threading.RLock()
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def build(self, documents: Callable[[], Iterable[tuple[int, str, str]]]) -> None:
+        """
+        Fill the index once from (id, name, description) tuples.
+
+        Args:
+            documents (Callable): Returns the documents to index. Only called when
+                the index has not been built yet.
+        """
+        with self._lock:
+            if self._built:
+                return
+            for document_id, name, description in documents():
+                self._add(document_id, name, description)
+            self._built = True
+
+    def add(self, document_id: int, name: str, description: Optional[str]) -> None:
+        """Index a document, replacing its previous version. Ignored before build."""
+        with self._lock:
+            if self._built:
+                self._remove(document_id)
+                self._add(document_id, name, description)
+
+    def remove(self, document_id: int) -> None:
+        """Remove a document from the index. Ignored before build."""
+        with self._lock:
+            if self._built:
+                self._remove(document_id)
+
+    def search(self, query: str) -> list[tuple[int, float]]:
+        """
+        Rank the documents matching any term of the query.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            list[tuple[int, float]]: (id, relevance) pairs sorted by relevance
+                and then id, both descending. Scores are summed in a fixed term
+                order and rounded to SCORE_DIGITS, so the same index gives the
+                same scores in every process.
+        """
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores = Counter()
+            for term in sorted(set(tokenize(query))):
+                postings = self._postings.get(term, {})
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for document_id, frequency in postings.items():
+                    norm = 1 - _B + _B * self._lengths[document_id] / average_length
+                    scores[document_id] += (
+                        idf * frequency * (_K1 + 1) / (frequency + _K1 * norm)
+                    )
+        ranked = [
+            (document_id, round(score, SCORE_DIGITS))
+            for document_id, score in scores.items()
+        ]
+        return sorted(ranked, key=lambda item: (item[1], item[0]), reverse=True)
+
+    def _add(self, document_id, name, description):
+        terms = Counter(tokenize(name) * NAME_WEIGHT + tokenize(description))
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[document_id] = frequency
+        self._terms[document_id] = tuple(terms)
+        self._lengths[document_id] = sum(terms.values())
+        self._total_length += self._lengths[document_id]
+
+    def _remove(self, document_id):
+        if document_id not in self._lengths:
+            return
+        self._total_length -= self._lengths.pop(document_id)
+        for term in self._terms.pop(document_id):
+            postings = self._postings[term]
+            del postings[document_id]
+            if not postings:
+                del self._postings[term]
+
+
+# Fallback full-text index of the products
+product_index = InvertedIndex()
@@ -0,0 +1,211 @@
+import enum
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Literal, Optional
+
+from sqlalchemy import Connection, Date, DateTime, Integer, Select, select
+
+from crafty.db.models.favorite import Favorite
+from crafty.db.models.product import Product
+from crafty.db.models.review import Review
+from crafty.db.models.subscription import Subscription
+from crafty.db.models.user import Seller, User
+
+SnapshotFormat = Literal["parquet", "arrow"]
+
+MANIFEST = "manifest.json"
+
+
+def _snapshot_statements() -> dict[str, tuple[Select, object]]:
+    """Return the statement reading every snapshot table and its key column."""
+    users = User.__table__
+    sellers = Seller.__table__
+    return {
+        "products": (select(Product.__table__), Product.__table__.c.id),
+        "reviews": (select(Review.__table__), Review.__table__.c.id),
+        "favorites": (select(Favorite.__table__), Favorite.__table__.c.id),
+        "subscriptions": (
+            select(Subscription.__table__),
+            Subscription.__table__.c.id,
+        ),
+        # Without password hashes, with the subscription level of sellers
+        "users": (
+            select(
+                *(column for column in users.c if column.name != "password_hash"),
+                sellers.c.subscription_level,
+            ).outerjoin(sellers, sellers.c.user_id == users.c.id),
+            users.c.id,
+        ),
+    }
+
+
+SNAPSHOT_TABLES = tuple(_snapshot_statements())
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(
+            "Snapshots require the pyarrow package, "
+            "install it with poetry install --extras analytics"
+        )
+    return pyarrow
+
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    # Strings, texts and enums, stored by value
+    return pa.string()
+
+
+def _plain(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+class _Writer:
+    """Writes record batches to a Parquet or Arrow IPC file, created on first write."""
+
+    def __init__(self, pa, path: Path, schema, format: SnapshotFormat):
+        self.pa = pa
+        self.path = path
+        self.schema = schema
+        self.format = format
+        self._writer = None
+
+    def write(self, batch) -> None:
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.format == "parquet":
+                self._writer = self.pa.parquet.ParquetWriter(self.path, self.schema)
+            else:
+                self._writer = self.pa.ipc.new_file(str(self.path), self.schema)
+        self._writer.write_batch(batch)
+
+    def close(self) -> bool:
+        """Close the file and return whether anything was written."""
+        if self._writer is None:
+            return False
+        self._writer.close()
+        return True
+
+
+def load_manifest(directory: Path) -> dict:
+    """Return the high-water marks and files of the snapshots in a directory."""
+    path = directory / MANIFEST
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def snapshot_table(
+    connection: Connection,
+    directory: Path,
+    table: str,
+    format: SnapshotFormat = "parquet",
+    batch_size: int = 10000,
+    full: bool = False,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> int:
+    """
+    Write the rows of a table added since the previous snapshot to a new file.
+
+    Rows are read through a server-side cursor batch_size at a time, as plain
+    rows, and every batch is written as one columnar record batch, so memory
+    use does not depend on the size of the table. Rows are found by a high-water
+    mark on their primary key, kept in the manifest of the directory: each
+    snapshot appends the rows inserted since the last one. Rows updated or
+    deleted in place are only picked up by a full snapshot, which replaces
+    every previous file of the table.
+
+    Args:
+        connection (Connection): The connection to read with, preferably to a
+            replica.
+        directory (Path): The directory holding the snapshot files and manifest.
+        table (str): One of SNAPSHOT_TABLES.
+        format (SnapshotFormat): "parquet" or "arrow", for Arrow IPC files.
+        batch_size (int): Rows per fetch and per record batch.
+        full (bool): Ignore the high-water mark and replace previous files.
+        progress (Callable, optional): Called with the table and the rows
+            written so far after every batch.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        RuntimeError: If pyarrow is not installed.
+    """
+    pa = _import_pyarrow()
+    statement, key = _snapshot_statements()[table]
+    manifest = load_manifest(directory)
+    state = {"high_water_mark": None, "files": []}
+    if not full:
+        state = manifest.get(table, state)
+
+    if state["high_water_mark"] is not None:
+        statement = statement.where(key > state["high_water_mark"])
+    statement = statement.order_by(key)
+    columns = list(statement.selected_columns)
+    schema = pa.schema(
+        [pa.field(column.name, _arrow_type(pa, column)) for column in columns]
+    )
+    key_index = [column.name for column in columns].index(key.name)
+
+    started = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    name = f"{table}-{started}.{format}"
+    writer = _Writer(pa, directory / table / name, schema, format)
+    written = 0
+    high_water_mark = state["high_water_mark"]
+    try:
+        result = connection.execution_options(yield_per=batch_size).execute(statement)
+        # Plain rows, at most one batch of them in memory
+        for rows in result.partitions():
+            arrays = [
+                pa.array([_plain(row[index]) for row in rows], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            written += len(rows)
+            high_water_mark = rows[-1][key_index]
+            if progress is not None:
+                progress(table, written)
+        wrote_file = writer.close()
+    except BaseException:
+        # The manifest is left as it was, the next snapshot reads the rows again
+        writer.close()
+        writer.path.unlink(missing_ok=True)
+        raise
+
+    # The new file holds every row of a full snapshot, the older ones are
+    # superseded
+    superseded = manifest.get(table, {}).get("files", []) if full else []
+    files = [] if full else list(state["files"])
+    if wrote_file:
+        files.append(f"{table}/{name}")
+    if wrote_file or full:
+        manifest[table] = {"high_water_mark": high_water_mark, "files": files}
+        (directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    for path in superseded:
+        (directory / path).unlink(missing_ok=True)
+    return written
+
+
+def snapshot(
+    connection: Connection,
+    directory: Path,
+    tables: Iterable[str] = SNAPSHOT_TABLES,
+    **options,
+) -> dict[str, int]:
+    """Snapshot several tables, see snapshot_table, and return the rows written per table."""
+    directory.mkdir(parents=True, exist_ok=True)
+    return {
+        table: snapshot_table(connection, directory, table, **options)
+        for table in tables
+    }
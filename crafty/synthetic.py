@@ -0,0 +1,405 @@
+import bisect
+import itertools
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import Engine, func, insert, select
+
+from crafty.constants import Rating, SubscriptionLevel, UserType
+from crafty.db.database import Base
+from crafty.db.models.favorite import Favorite
+from crafty.db.models.join_tables import products_tags
+from crafty.db.models.product import Product, ProductImage
+from crafty.db.models.review import Review
+from crafty.db.models.subscription import Subscription
+from crafty.db.models.tag import Tag
+from crafty.db.models.user import Buyer, Seller, User
+
+# Rows generated and inserted at a time, roughly
+CHUNK_SIZE = 10000
+
+# Rows are dated within the year before, not relative to the day of the run
+EPOCH = datetime(2024, 1, 1)
+YEAR = 365 * 24 * 3600
+
+# fmt: off
+TAG_WORDS = (
+    "handmade", "vintage", "ceramic", "wooden", "knitted", "leather", "silver",
+    "gold", "linen", "cotton", "wool", "glass", "paper", "printed", "painted",
+    "embroidered", "upcycled", "organic", "minimalist", "rustic", "boho",
+    "personalized", "gift", "wedding", "kids", "home", "kitchen", "garden",
+    "jewelry", "art", "toys", "stationery", "candles", "soap", "bags", "decor",
+)
+ADJECTIVES = (
+    "Handmade", "Vintage", "Rustic", "Hand-painted", "Carved", "Woven", "Knitted",
+    "Embroidered", "Glazed", "Recycled", "Personalized", "Miniature",
+)
+NOUNS = (
+    "Mug", "Bowl", "Vase", "Necklace", "Ring", "Scarf", "Blanket", "Tote Bag",
+    "Candle", "Notebook", "Print", "Cutting Board", "Planter", "Lamp", "Toy",
+)
+COMMENTS = (
+    "Great product!", "Very useful!", "Exactly as described.", "Lovely work.",
+    "Took a while to arrive.", "Not what I expected.", "Would buy again.", None,
+)
+# fmt: on
+
+# Most reviews are good, cumulative weights of one to five stars
+RATING_WEIGHTS = tuple(itertools.accumulate((4, 4, 10, 30, 52)))
+# Cumulative weights of the basic, premium and pro subscription levels
+LEVEL_WEIGHTS = tuple(itertools.accumulate((70, 20, 10)))
+# Cumulative weights of 1 to 4 tags and of 1 to 3 images per product
+TAG_COUNT_WEIGHTS = tuple(itertools.accumulate((30, 35, 25, 10)))
+IMAGE_COUNT_WEIGHTS = tuple(itertools.accumulate((50, 35, 15)))
+
+_MASK = 2**64 - 1
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """Return the cumulative weights of ranks 1 to count under Zipf's law."""
+    return list(
+        itertools.accumulate(1 / rank**exponent for rank in range(1, count + 1))
+    )
+
+
+def _uniform(seed: int, value: int) -> float:
+    """Return a float in [0, 1) fixed by the seed and value, in every process."""
+    # splitmix64 finalizer
+    x = (seed * 0x9E3779B97F4A7C15 + value) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return (x ^ (x >> 31)) / 2**64
+
+
+class SyntheticData:
+    """
+    A synthetic data set of a given size, generated chunk by chunk from a seed.
+
+    Every chunk is generated by its own random generator, seeded from the seed
+    and the position of the chunk, so the rows do not depend on the process
+    generating them or on the order chunks are generated in. IDs of users,
+    products and tags are assigned here, after the highest ones already stored,
+    so the same seed and sizes give the same rows on the same database.
+
+    Popularity follows Zipf's law: a few sellers own most products, a few
+    products get most favorites and reviews and a few tags are on most
+    products. Every seller has a subscription of its level.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        sellers: int,
+        buyers: int,
+        products: int,
+        tags: int,
+        favorites: int,
+        reviews: int,
+        first_ids: Optional[dict[str, int]] = None,
+        exponent: float = 1.0,
+    ):
+        if products and not sellers:
+            raise ValueError("Products need at least one seller")
+        if (favorites or reviews) and not (buyers and products):
+            raise ValueError("Favorites and reviews need buyers and products")
+        # Every pair is unique, leave room to draw them at random
+        if max(favorites, reviews) > buyers * products // 2:
+            raise ValueError("At most half of the buyer-product pairs can be used")
+        self.seed = seed
+        self.sellers = sellers
+        self.buyers = buyers
+        self.products = products
+        self.tags = tags
+        self.favorites = favorites
+        self.reviews = reviews
+        self.first_ids = {"users": 1, "products": 1, "tags": 1, **(first_ids or {})}
+        self.exponent = exponent
+        self._weights = {}
+
+    def _zipf(self, name: str, count: int) -> list[float]:
+        # Computed once per process, on first use
+        if name not in self._weights:
+            self._weights[name] = zipf_weights(count, self.exponent)
+        return self._weights[name]
+
+    def __getstate__(self):
+        return {**self.__dict__, "_weights": {}}
+
+    def _random(self, kind: str, start: int) -> random.Random:
+        return random.Random(f"{self.seed}:{kind}:{start}")
+
+    def _date(self, rng: random.Random) -> datetime:
+        return EPOCH - timedelta(seconds=rng.randrange(YEAR))
+
+    def seller_id(self, index: int) -> int:
+        return self.first_ids["users"] + index
+
+    def buyer_id(self, index: int) -> int:
+        return self.first_ids["users"] + self.sellers + index
+
+    def product_id(self, index: int) -> int:
+        return self.first_ids["products"] + index
+
+    def seller_of(self, product_id: int) -> int:
+        """Return the seller of a product, without generating the product."""
+        weights = self._zipf("sellers", self.sellers)
+        target = _uniform(self.seed, product_id) * weights[-1]
+        # First rank whose cumulative weight exceeds the target
+        rank = min(bisect.bisect_right(weights, target), len(weights) - 1)
+        return self.seller_id(rank)
+
+    def chunks(self) -> list[tuple[str, int, int]]:
+        """
+        Return the chunks of the data set, in the order they must be inserted.
+
+        A chunk is a kind of rows and the range of users, tags, products or
+        buyers it covers; favorites and reviews are partitioned by buyer, so
+        their pairs are unique across chunks.
+        """
+        chunks = []
+        sizes = (
+            ("users", self.sellers + self.buyers, CHUNK_SIZE),
+            ("tags", self.tags, CHUNK_SIZE),
+            # About 5 rows per product with its images and tags
+            ("products", self.products, CHUNK_SIZE // 5),
+            ("favorites", self.buyers, self._per_chunk(self.favorites)),
+            ("reviews", self.buyers, self._per_chunk(self.reviews)),
+        )
+        for kind, count, step in sizes:
+            if kind in ("favorites", "reviews") and not getattr(self, kind):
+                continue
+            chunks += [
+                (kind, start, min(start + step, count))
+                for start in range(0, count, step)
+            ]
+        return chunks
+
+    def _per_chunk(self, rows: int) -> int:
+        # Buyers per chunk of about CHUNK_SIZE rows
+        return max(1, CHUNK_SIZE * self.buyers // max(rows, 1))
+
+    def generate(self, chunk: tuple[str, int, int]) -> list[tuple[str, list[dict]]]:
+        """Return the rows of a chunk by table name, in the order they must be inserted."""
+        kind, start, stop = chunk
+        rng = self._random(kind, start)
+        return getattr(self, f"_{kind}")(rng, start, stop)
+
+    def _users(self, rng, start, stop):
+        users, sellers, buyers, subscriptions = [], [], [], []
+        for index in range(start, stop):
+            seller = index < self.sellers
+            user_id = self.first_ids["users"] + index
+            users.append(
+                {
+                    "id": user_id,
+                    "username": f"user_{user_id}",
+                    "email": f"user_{user_id}@example.com",
+                    "password_hash": "hashed_password",
+                    "user_type": UserType.seller if seller else UserType.buyer,
+                    "updated_at": self._date(rng),
+                }
+            )
+            if not seller:
+                buyers.append({"user_id": user_id})
+                continue
+            level = rng.choices(list(SubscriptionLevel), cum_weights=LEVEL_WEIGHTS)[0]
+            sellers.append({"user_id": user_id, "subscription_level": level.value})
+            start_date = self._date(rng).date()
+            subscriptions.append(
+                {
+                    "seller_id": user_id,
+                    "subscription_level": level,
+                    "start_date": start_date,
+                    "end_date": start_date + timedelta(days=365),
+                }
+            )
+        return [
+            (User.__tablename__, users),
+            (Seller.__tablename__, sellers),
+            (Buyer.__tablename__, buyers),
+            (Subscription.__tablename__, subscriptions),
+        ]
+
+    def _tags(self, rng, start, stop):
+        tags = []
+        for index in range(start, stop):
+            tag_id = self.first_ids["tags"] + index
+            tags.append(
+                {
+                    "id": tag_id,
+                    "name": f"{TAG_WORDS[index % len(TAG_WORDS)]}-{tag_id}",
+                    "updated_at": self._date(rng),
+                }
+            )
+        return [(Tag.__tablename__, tags)]
+
+    def _products(self, rng, start, stop):
+        products, images, tags = [], [], []
+        tag_ids = range(self.first_ids["tags"], self.first_ids["tags"] + self.tags)
+        tag_weights = self._zipf("tags", self.tags) if self.tags else None
+        for index in range(start, stop):
+            product_id = self.product_id(index)
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+            products.append(
+                {
+                    "id": product_id,
+                    "name": f"{name} {product_id}",
+                    "description": f"A {name.lower()} made by hand",
+                    # Mostly cheap, a long tail of expensive products
+                    "price": int(rng.lognormvariate(3.5, 1.0)) + 1,
+                    "seller_id": self.seller_of(product_id),
+                    "updated_at": self._date(rng),
+                }
+            )
+            image_count = rng.choices((1, 2, 3), cum_weights=IMAGE_COUNT_WEIGHTS)[0]
+            images += [
+                {
+                    "image_url": f"https://images.example.com/{product_id}/{n}.jpg",
+                    "product_id": product_id,
+                }
+                for n in range(image_count)
+            ]
+            if tag_weights:
+                tag_count = rng.choices((1, 2, 3, 4), cum_weights=TAG_COUNT_WEIGHTS)[0]
+                chosen = rng.choices(tag_ids, cum_weights=tag_weights, k=tag_count)
+                tags += [
+                    {"product_id": product_id, "tag_id": tag_id}
+                    for tag_id in sorted(set(chosen))
+                ]
+        return [
+            (Product.__tablename__, products),
+            (ProductImage.__tablename__, images),
+            (products_tags.name, tags),
+        ]
+
+    def _pairs(self, rng, start, stop, total):
+        """Draw the unique buyer-product pairs of a chunk of buyers."""
+        # The share of the total of the buyers of the chunk
+        count = total * stop // self.buyers - total * start // self.buyers
+        product_ids = range(self.product_id(0), self.product_id(self.products))
+        weights = self._zipf("products", self.products)
+        pairs = {}
+        while len(pairs) < count:
+            missing = count - len(pairs)
+            buyers = [self.buyer_id(rng.randrange(start, stop)) for _ in range(missing)]
+            chosen = rng.choices(product_ids, cum_weights=weights, k=missing)
+            # A dict keeps the pairs in the order they were drawn
+            pairs.update(dict.fromkeys(zip(buyers, chosen)))
+        return list(pairs)[:count]
+
+    def _favorites(self, rng, start, stop):
+        pairs = self._pairs(rng, start, stop, self.favorites)
+        return [
+            (
+                Favorite.__tablename__,
+                [
+                    {"buyer_id": buyer_id, "product_id": product_id}
+                    for buyer_id, product_id in pairs
+                ],
+            )
+        ]
+
+    def _reviews(self, rng, start, stop):
+        pairs = self._pairs(rng, start, stop, self.reviews)
+        ratings = rng.choices(list(Rating), cum_weights=RATING_WEIGHTS, k=len(pairs))
+        return [
+            (
+                Review.__tablename__,
+                [
+                    {
+                        "rating": rating,
+                        "comment": rng.choice(COMMENTS),
+                        "reviewer_id": buyer_id,
+                        "reviewed_user_id": self.seller_of(product_id),
+                        "product_id": product_id,
+                    }
+                    for (buyer_id, product_id), rating in zip(pairs, ratings)
+                ],
+            )
+        ]
+
+
+def next_ids(engine: Engine) -> dict[str, int]:
+    """Return the first free IDs of users, products and tags in a database."""
+    with engine.connect() as connection:
+        return {
+            name: (connection.scalar(select(func.max(model.id))) or 0) + 1
+            for name, model in (("users", User), ("products", Product), ("tags", Tag))
+        }
+
+
+# The data set of a worker process, set once when the process starts
+_worker_data = None
+
+
+def _set_worker_data(data: SyntheticData) -> None:
+    global _worker_data
+    _worker_data = data
+
+
+def _generate_in_worker(chunk):
+    return _worker_data.generate(chunk)
+
+
+def _generate_ahead(
+    data: SyntheticData, chunks: Iterable, processes: int
+) -> Iterator[list[tuple[str, list[dict]]]]:
+    """Generate chunks in worker processes, yielding them in order."""
+    if processes <= 1:
+        yield from map(data.generate, chunks)
+        return
+    with ProcessPoolExecutor(
+        processes, initializer=_set_worker_data, initargs=(data,)
+    ) as pool:
+        # A few chunks per process ahead of the inserts, no more, so memory
+        # stays bounded when inserting is the slower side
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_generate_in_worker, chunk))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def populate(
+    engine: Engine,
+    data: SyntheticData,
+    processes: int = 1,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> dict[str, int]:
+    """
+    Insert a synthetic data set, committing every chunk on its own.
+
+    Chunks are generated by a pool of processes while the rows of earlier
+    chunks are inserted with one executemany INSERT per table, bypassing the
+    ORM. Caches and in-process indexes of running servers are not updated, so
+    servers should be restarted afterwards.
+
+    Args:
+        engine (Engine): The engine of the database to fill.
+        data (SyntheticData): The data set.
+        processes (int): Processes generating chunks, 1 to generate them in
+            this process.
+        progress (Callable, optional): Called with the kind of the chunk and
+            the rows inserted so far after every chunk.
+
+    Returns:
+        dict[str, int]: The number of rows inserted per table.
+    """
+    chunks = data.chunks()
+    inserted = {}
+    total = 0
+    for (kind, _, _), tables in zip(chunks, _generate_ahead(data, chunks, processes)):
+        with engine.begin() as connection:
+            for name, rows in tables:
+                if rows:
+                    connection.execute(insert(Base.metadata.tables[name]), rows)
+                inserted[name] = inserted.get(name, 0) + len(rows)
+                total += len(rows)
+        if progress is not None:
+            progress(kind, total)
+    return inserted
@@ -1,17 +1,26 @@
 import datetime
+import os
 import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
 
 from alembic import command
 from alembic.config import Config
 from invoke import task
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
 from crafty.config import get_settings
 from crafty.constants import Rating, SubscriptionLevel, UserType
-from crafty.db.database import Base, engine
+from crafty.crud.favorite import create_favorite
+from crafty.crud.product import PRODUCT_PAGE_KEY, get_products
+from crafty.crud.tag import attach_tags
+from crafty.crud.user import import_users as import_user_rows
+from crafty.db.database import Base, engine, replica_engines
 from crafty.db.models.favorite import Favorite
 from crafty.db.models.product import Product, ProductImage
 from crafty.db.models.review import Review
@@ -19,6 +28,12 @@ from crafty.db.models.subscription import Subscription
 from crafty.db.models.tag import Tag
 from crafty.db.models.user import Buyer, Seller
 from crafty.db.session import db_session
+from crafty.importing import ImportReport, read_batches
+from crafty.pagination import next_cursor
+from crafty.schemas.favorite import FavoriteCreate
+from crafty.schemas.tag import ProductTagsUpdate
+from crafty.snapshots import SNAPSHOT_TABLES, snapshot
+from crafty.synthetic import SyntheticData, next_ids, populate
 
 
 @task
@@ -96,16 +111,13 @@ def populate_db(ctx):
         session.commit()
 
         # Associate tags with products
-        products_tags = [
-            (products[0].id, tags[0].id),
-            (products[1].id, tags[1].id),
-        ]
-        for product_id, tag_id in products_tags:
-            stmt = text(
-                f"INSERT INTO products_tags (product_id, tag_id) VALUES ({product_id}, {tag_id})"
-            )
-            session.execute(stmt)
-        session.commit()
+        attach_tags(
+            session,
+            [
+                ProductTagsUpdate(product_id=products[0].id, tag_ids=[tags[0].id]),
+                ProductTagsUpdate(product_id=products[1].id, tag_ids=[tags[1].id]),
+            ],
+        )
 
         # Create sample reviews
         reviews_data = [
@@ -152,9 +164,292 @@ def populate_db(ctx):
         print("Database populated with sample data.")
 
 
+@task
+def import_users(ctx, path, format=None, batch_size=None):
+    """Import users from an NDJSON or CSV file, reporting progress per batch.
+
+    The file is read line by line and every batch is committed on its own, so
+    memory use does not grow with the file. The format follows the extension
+    of the file unless given with --format.
+    """
+    format = format or ("csv" if path.endswith(".csv") else "ndjson")
+    batch_size = int(batch_size or get_settings().user_import_batch_size)
+    report = ImportReport()
+    size = max(os.path.getsize(path), 1)
+    start = time.perf_counter()
+    with open(path, encoding="utf-8", newline="") as lines, db_session() as session:
+        for batch in read_batches(lines, format, batch_size):
+            report.add(**import_user_rows(session, batch))
+            rate = report.rows / (time.perf_counter() - start)
+            print(
+                f"{lines.buffer.tell() / size:6.1%} {report.rows} rows, "
+                f"{report.imported} imported, {report.failed} failed, "
+                f"{rate:.0f} rows/s"
+            )
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['error']}")
+    if report.failed > len(report.errors):
+        print(f"  ... and {report.failed - len(report.errors)} more errors")
+
+
+@task(iterable=["table"])
+def snapshot_tables(
+    ctx,
+    directory="snapshots",
+    table=None,
+    format="parquet",
+    batch_size=10000,
+    full=False,
+    url=None,
+):
+    """Write the rows added since the last snapshot to Parquet or Arrow files.
+
+    Reads products, reviews, favorites, subscriptions and users, or the tables
+    given with --table, from the database given with --url, else from the first
+    read replica, else from the primary. Each run appends the rows above the
+    primary key high-water marks recorded in the manifest of --directory;
+    --full snapshots every row again and replaces the previous files.
+    """
+    tables = table or SNAPSHOT_TABLES
+    unknown = set(tables) - set(SNAPSHOT_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables {', '.join(sorted(unknown))}")
+
+    def report(table, rows):
+        print(f"{table}: {rows} rows read")
+
+    source = create_engine(url) if url else (replica_engines or [engine])[0]
+    start = time.perf_counter()
+    with source.connect() as connection:
+        written = snapshot(
+            connection,
+            Path(directory),
+            tables,
+            format=format,
+            batch_size=int(batch_size),
+            full=full,
+            progress=report,
+        )
+    if url:
+        source.dispose()
+    print(
+        f"Snapshot of {sum(written.values())} rows written to {directory} "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+    for table, rows in written.items():
+        print(f"  {table}: {rows} new rows")
+
+
+@task
+def generate_data(
+    ctx,
+    sellers=1000,
+    buyers=100000,
+    products=200000,
+    tags=500,
+    favorites=500000,
+    reviews=200000,
+    seed=0,
+    exponent=1.0,
+    processes=None,
+    url=None,
+):
+    """Fill the database with a synthetic data set for load tests and benchmarks.
+
+    The same --seed and sizes give the same rows on the same database.
+    Popularity of sellers, products and tags follows Zipf's law with --exponent,
+    higher is more skewed. Rows are generated by --processes worker processes,
+    one per CPU by default, and inserted into the database given with --url,
+    else the primary, after the rows already stored.
+    """
+    target = create_engine(url) if url else engine
+    data = SyntheticData(
+        int(seed),
+        sellers=int(sellers),
+        buyers=int(buyers),
+        products=int(products),
+        tags=int(tags),
+        favorites=int(favorites),
+        reviews=int(reviews),
+        first_ids=next_ids(target),
+        exponent=float(exponent),
+    )
+    start = time.perf_counter()
+
+    def report(kind, rows):
+        rate = rows / (time.perf_counter() - start)
+        print(f"{kind}: {rows} rows inserted, {rate:.0f} rows/s")
+
+    inserted = populate(
+        target, data, processes=int(processes or os.cpu_count()), progress=report
+    )
+    if url:
+        target.dispose()
+    elapsed = time.perf_counter() - start
+    total = sum(inserted.values())
+    print(
+        f"{total} rows inserted in {elapsed:.1f} s, "
+        f"{total / elapsed * 60:.0f} rows/min"
+    )
+    for table, rows in inserted.items():
+        print(f"  {table}: {rows}")
+
+
 @task
 def reset_db(ctx):
     """Drop and recreate the database schema, then populate with sample data."""
     drop_db(ctx)
     create_db(ctx)
     populate_db(ctx)
+
+
+def _median_ms(func, repeat: int) -> float:
+    """Run func repeat times and return the median duration in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+@task
+def benchmark_pagination(ctx, rows=50000, page=1000, limit=10, repeat=20, url=None):
+    """Compare fetching a deep page of products with OFFSET and with a cursor.
+
+    The products are inserted into a throwaway SQLite database, or into the
+    empty database given with --url.
+    """
+    if page < 2:
+        raise ValueError("page must be at least 2")
+    if rows < page * limit:
+        raise ValueError("rows must be at least page * limit")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench_engine = create_engine(url or f"sqlite:///{tmp_dir}/pagination.db")
+        Base.metadata.create_all(bench_engine)
+
+        with sessionmaker(bind=bench_engine)() as session:
+            seller = Seller(
+                username="bench_seller",
+                email="bench_seller@example.com",
+                password_hash="hashed_password",
+                subscription_level="basic",
+            )
+            session.add(seller)
+            session.commit()
+
+            session.execute(
+                insert(Product),
+                [
+                    {
+                        "name": f"Product {i}",
+                        "description": "A benchmark product",
+                        "price": random.randint(1, 1000),
+                        "seller_id": seller.id,
+                    }
+                    for i in range(rows)
+                ],
+            )
+            session.commit()
+
+            skip = (page - 1) * limit
+            # The cursor of a page comes with the page before it
+            previous = get_products(session, skip=skip - limit, limit=limit)
+            cursor = next_cursor(previous, limit, PRODUCT_PAGE_KEY)
+
+            by_offset = get_products(session, skip=skip, limit=limit)
+            by_cursor = get_products(session, limit=limit, cursor=cursor)
+            assert [p.id for p in by_offset] == [p.id for p in by_cursor]
+
+            offset_ms = _median_ms(
+                lambda: get_products(session, skip=skip, limit=limit), repeat
+            )
+            cursor_ms = _median_ms(
+                lambda: get_products(session, limit=limit, cursor=cursor), repeat
+            )
+
+        bench_engine.dispose()
+
+    print(f"Page {page} of {limit} products out of {rows}, median of {repeat} runs:")
+    print(f"  offset: {offset_ms:.2f} ms")
+    print(f"  cursor: {cursor_ms:.2f} ms ({offset_ms / cursor_ms:.1f}x faster)")
+
+
+def _check_then_insert_favorite(session, favorite: FavoriteCreate) -> Favorite:
+    """Create a favorite the way create_favorite did before single-INSERT writes."""
+    existing = (
+        session.query(Favorite)
+        .filter(
+            Favorite.buyer_id == favorite.buyer_id,
+            Favorite.product_id == favorite.product_id,
+        )
+        .one_or_none()
+    )
+    if existing:
+        raise ValueError("Favorite already exists")
+    db_favorite = Favorite(**favorite.model_dump())
+    session.add(db_favorite)
+    session.commit()
+    session.refresh(db_favorite)
+    return db_favorite
+
+
+@task
+def benchmark_writes(ctx, writes=2000, url=None):
+    """Compare creating favorites with check-then-insert and with a single INSERT.
+
+    Both create the same number of new favorites and report writes per second
+    and statements per write. The favorites are inserted into a throwaway
+    SQLite database, or into the empty database given with --url, where every
+    statement is a network round trip.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench_engine = create_engine(url or f"sqlite:///{tmp_dir}/writes.db")
+        Base.metadata.create_all(bench_engine)
+        statements = 0
+
+        @event.listens_for(bench_engine, "before_cursor_execute")
+        def count_statement(*args):
+            nonlocal statements
+            statements += 1
+
+        with sessionmaker(bind=bench_engine)() as session:
+            buyer = Buyer(
+                username="bench_buyer",
+                email="bench_buyer@example.com",
+                password_hash="hashed_password",
+            )
+            session.add(buyer)
+            session.commit()
+            session.execute(
+                insert(Product),
+                [
+                    {"name": f"Product {i}", "price": 1, "seller_id": None}
+                    for i in range(2 * writes)
+                ],
+            )
+            session.commit()
+            buyer_id = buyer.id
+
+            results = {}
+            strategies = (
+                ("check-then-insert", _check_then_insert_favorite, 1),
+                ("single INSERT", create_favorite, writes + 1),
+            )
+            for name, create, first_product in strategies:
+                statements = 0
+                start = time.perf_counter()
+                for product_id in range(first_product, first_product + writes):
+                    create(
+                        session,
+                        FavoriteCreate(buyer_id=buyer_id, product_id=product_id),
+                    )
+                elapsed = time.perf_counter() - start
+                results[name] = (writes / elapsed, statements / writes)
+
+        bench_engine.dispose()
+
+    print(f"Creating {writes} favorites:")
+    for name, (per_second, per_write) in results.items():
+        print(f"  {name}: {per_second:.0f} writes/s, {per_write:.1f} statements/write")
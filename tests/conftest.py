@@ -0,0 +1,100 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The engines are created from the settings when crafty.db is imported, so
+# the test database has to be configured before anything from crafty is loaded
+_database_dir = tempfile.mkdtemp(prefix="crafty-tests-")
+os.environ["APP_ENV"] = "test"
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_database_dir) / 'crafty.db'}"
+os.environ["DB_MODE"] = "sync"
+os.environ["CACHE_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from crafty.cache.hotkeys import get_hot_keys  # noqa: E402
+from crafty.cache.store import get_cache  # noqa: E402
+from crafty.config import get_settings  # noqa: E402
+from crafty.crud.tag import tag_dictionary  # noqa: E402
+from crafty.db.database import Base, engine  # noqa: E402
+from crafty.db.session import db_session  # noqa: E402
+from crafty.main import app  # noqa: E402
+from crafty.search import product_index  # noqa: E402
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """The application settings, changed per test with settings.set(name, value)."""
+    settings = get_settings()
+
+    def set(name, value):
+        monkeypatch.setattr(settings, name, value)
+
+    settings.set = set
+    yield settings
+    del settings.set
+
+
+@pytest.fixture
+def client():
+    """A test client of the app running on an empty database and cache."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    get_cache().clear()
+    tag_dictionary.invalidate()
+    product_index.__init__()
+    get_hot_keys.cache_clear()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    """A session on the database of the test client."""
+    with db_session() as db:
+        yield db
+
+
+@pytest.fixture
+def seller(client):
+    """A seller owning the products created by the tests."""
+    response = client.post(
+        "/users/",
+        json={
+            "username": "seller",
+            "email": "seller@example.com",
+            "password_hash": "hash",
+            "user_type": "seller",
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def create_product(client, seller):
+    """Create products of the seller through the API."""
+
+    def create(name, price=10, **fields):
+        response = client.post(
+            "/products/",
+            json={"name": name, "price": price, "seller_id": seller["id"], **fields},
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
+
+
+@pytest.fixture
+def create_tag(client):
+    """Create tags through the API."""
+
+    def create(name):
+        response = client.post("/tags/", json={"name": name})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crafty.db.database import get_async_database_url
+from crafty.db.session import get_async_db, get_db
+from crafty.main import app
+
+
+@pytest.fixture
+def async_mode(client, settings):
+    pytest.importorskip("aiosqlite")
+    settings.set("db_mode", "async")
+    app.dependency_overrides[get_db] = get_async_db
+    yield
+    del app.dependency_overrides[get_db]
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("mysql+pymysql://user:pw@localhost/crafty", "mysql+aiomysql"),
+        ("mysql://user:pw@localhost/crafty", "mysql+aiomysql"),
+        ("sqlite:///crafty.db", "sqlite+aiosqlite"),
+    ],
+)
+def test_async_database_url_swaps_the_driver(settings, url, expected):
+    settings.set("database_url", url)
+
+    assert get_async_database_url().drivername == expected
+
+
+def test_async_database_url_rejects_backends_without_async_driver(settings):
+    settings.set("database_url", "postgresql://localhost/crafty")
+
+    with pytest.raises(ValueError):
+        get_async_database_url()
+
+
+def test_async_database_url_can_be_set(settings):
+    settings.set("async_database_url", "sqlite+aiosqlite:///other.db")
+
+    assert get_async_database_url().database == "other.db"
+
+
+def test_routes_run_crud_functions_on_an_async_session(
+    client, async_mode, create_product
+):
+    sessions = []
+
+    async def recording_async_db():
+        async for db in get_async_db():
+            sessions.append(db)
+            yield db
+
+    app.dependency_overrides[get_db] = recording_async_db
+    product = create_product("Vase", 25)
+    client.post(
+        f"/products/{product['id']}/images/",
+        params={"image_url": "https://example.com/vase.png"},
+    )
+
+    response = client.get(f"/products/{product['id']}")
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Vase"
+    assert [image["image_url"] for image in response.json()["images"]] == [
+        "https://example.com/vase.png"
+    ]
+    assert sessions and all(isinstance(db, AsyncSession) for db in sessions)
+
+
+def test_async_mode_reports_missing_rows_like_sync_mode(client, async_mode):
+    response = client.get("/products/999")
+
+    assert response.status_code == 404
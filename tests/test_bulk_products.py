@@ -0,0 +1,106 @@
+import pytest
+
+from crafty.crud import product as product_crud
+from crafty.db.models.product import Product
+from crafty.db.session import db_session
+
+
+def bulk(client, products, **params):
+    response = client.post("/products/bulk", params=params, json=products)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 500])
+def test_products_are_created_with_images_and_tags(
+    client, seller, create_tag, batch_size
+):
+    create_tag("blue")
+    products = [
+        {
+            "name": name,
+            "price": 10,
+            "seller_id": seller["id"],
+            "images": [f"https://example.com/{name}.png"],
+            "tags": ["blue", "blue"],
+        }
+        for name in ("Cup", "Plate", "Jug")
+    ]
+
+    report = bulk(client, products, batch_size=batch_size)
+
+    assert (report["created"], report["failed"]) == (3, 0)
+    for result in report["results"]:
+        stored = client.get(
+            f"/products/{result['product']['id']}", params={"include_tags": True}
+        ).json()
+        assert stored["images"][0]["image_url"].endswith(f"{stored['name']}.png")
+        assert [tag["name"] for tag in stored["tags"]] == ["blue"]
+    assert len(client.get("/products/search", params={"q": "jug"}).json()["items"]) == 1
+
+
+def test_invalid_products_fail_without_the_others(client, seller, create_product):
+    create_product("Cup")
+    products = [
+        {"name": "Cup", "price": 10, "seller_id": seller["id"]},
+        {"name": "Plate", "price": 10, "seller_id": seller["id"]},
+        {"name": "Plate", "price": 20, "seller_id": seller["id"]},
+        {"name": "Jug", "price": 10, "seller_id": 999},
+        {"name": "Vase", "price": 10, "seller_id": seller["id"], "tags": ["red"]},
+        {"name": "Bowl", "price": 10, "seller_id": seller["id"]},
+    ]
+
+    report = bulk(client, products)
+
+    assert (report["created"], report["failed"]) == (2, 4)
+    assert [result["index"] for result in report["results"]] == list(range(6))
+    assert [result["product"] is not None for result in report["results"]] == [
+        False,
+        True,
+        False,
+        False,
+        False,
+        True,
+    ]
+    errors = [result["error"] or "" for result in report["results"]]
+    assert "Cup" in errors[0] and "Plate" in errors[2]
+    assert "999" in errors[3]
+    assert "red" in errors[4]
+
+
+def test_batches_failing_on_concurrent_writes_are_retried_one_by_one(
+    client, seller, monkeypatch
+):
+    check = product_crud._check_bulk_products
+
+    def check_then_write_concurrently(db, products, results):
+        tags = check(db, products, results)
+        with db_session() as other:
+            other.add(Product(name="Plate", price=10, seller_id=seller["id"]))
+            other.commit()
+        return tags
+
+    monkeypatch.setattr(
+        product_crud, "_check_bulk_products", check_then_write_concurrently
+    )
+    products = [
+        {"name": name, "price": 10, "seller_id": seller["id"]}
+        for name in ("Cup", "Plate", "Jug")
+    ]
+
+    report = bulk(client, products)
+
+    assert (report["created"], report["failed"]) == (2, 1)
+    assert "Plate" in report["results"][1]["error"]
+    names = [product["name"] for product in client.get("/products/").json()["items"]]
+    assert sorted(names) == ["Cup", "Jug", "Plate"]
+
+
+def test_empty_requests_create_nothing(client):
+    assert bulk(client, []) == {"created": 0, "failed": 0, "results": []}
+
+
+def test_batch_sizes_are_bounded(client):
+    response = client.post("/products/bulk", params={"batch_size": 0}, json=[])
+
+    assert response.status_code == 422
@@ -0,0 +1,204 @@
+import asyncio
+import threading
+
+import pytest
+from pydantic import BaseModel
+
+from crafty.crud.product import get_product, get_products
+from crafty.crud.user import get_user
+from crafty.db.coalesce import (SingleFlight, coalesce_key, coalesced,
+                                flight_key)
+from crafty.db.dispatch import run_crud
+
+
+@coalesced
+def get_answer(db, question):
+    return 42
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flights.do("key", fetch)))
+        for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    while flights.stats()["calls"] < 4:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 4
+    assert flights.stats()["collapsed"] == 3
+
+
+def test_concurrent_coroutines_share_one_call_and_its_error():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    async def run():
+        return await asyncio.gather(
+            *(flights.do_async("key", fetch) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert calls == [1]
+    assert all(isinstance(result, LookupError) for result in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_followers_retry_when_the_leader_is_cancelled():
+    flights = SingleFlight()
+    sessions = []
+
+    def fetch(session):
+        async def call():
+            sessions.append(session)
+            await asyncio.sleep(0.01)
+            return session
+
+        return call
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do_async("key", fetch("leader")))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.ensure_future(flights.do_async("key", fetch(name)))
+            for name in ("first", "second")
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        return leader, results
+
+    leader, results = asyncio.run(run())
+
+    # The followers do not use the session of the cancelled leader, one of them
+    # leads the next call with its own
+    assert leader.cancelled()
+    assert sessions == ["leader", "first"]
+    assert results == ["first", "first"]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_followers_do_not_cancel_the_call():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        leader = asyncio.ensure_future(flights.do_async("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do_async("key", fetch))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader, follower
+
+    value, follower = asyncio.run(run())
+
+    assert value == "value"
+    assert follower.cancelled()
+
+
+def test_calls_are_not_shared_after_they_finish():
+    flights = SingleFlight()
+
+    flights.do("key", lambda: 1)
+
+    assert flights.do("key", lambda: 2) == 2
+
+
+def test_flight_keys_ignore_argument_containers_but_not_values():
+    first = flight_key(get_products, (), {"include": ["images"], "skip": 0})
+    second = flight_key(get_products, (), {"skip": 0, "include": ("images",)})
+
+    assert first == second
+    assert flight_key(get_products, (), {"skip": 1}) != flight_key(
+        get_products, (), {"skip": 0}
+    )
+    assert flight_key(get_products, (bytearray(b"why"),), {}) is None
+
+
+def test_sessions_that_wrote_are_not_coalesced(db):
+    assert coalesce_key(get_answer, db, ("why",), {}) is not None
+
+    db.info["wrote"] = True
+
+    assert coalesce_key(get_answer, db, ("why",), {}) is None
+
+
+def test_coalescing_can_be_disabled(db, settings):
+    settings.set("db_coalesce_reads", False)
+
+    assert coalesce_key(get_answer, db, ("why",), {}) is None
+
+
+def test_only_marked_functions_are_coalesced(db):
+    assert coalesce_key(lambda db: None, db, (), {}) is None
+
+
+def test_sync_mode_calls_getters_directly(db, monkeypatch):
+    flights = SingleFlight()
+    monkeypatch.setattr("crafty.db.dispatch.crud_flights", flights)
+
+    assert asyncio.run(run_crud(get_answer, db, "why")) == 42
+    assert flights.stats()["calls"] == 0
+
+
+def test_executor_mode_coalesces_through_run_crud(db, settings, monkeypatch):
+    settings.set("db_mode", "executor")
+    flights = SingleFlight()
+    monkeypatch.setattr("crafty.db.dispatch.crud_flights", flights)
+
+    async def run():
+        return await asyncio.gather(
+            *(run_crud(get_answer, db, "why") for _ in range(3))
+        )
+
+    assert asyncio.run(run()) == [42, 42, 42]
+    assert flights.stats()["calls"] == 3
+    assert flights.stats()["executions"] == 1
+
+
+@pytest.mark.parametrize(
+    "load",
+    [
+        lambda db, ids: get_product.__wrapped__(db, ids["product"]),
+        lambda db, ids: get_products.__wrapped__(db)[0],
+        lambda db, ids: get_user.__wrapped__(db, "seller", "username"),
+    ],
+    ids=["get_product", "get_products", "get_user"],
+)
+def test_coalesced_getters_return_detached_values(db, create_product, load):
+    product = create_product("Cup")
+
+    value = load(db, {"product": product["id"]})
+
+    # Schema objects, not ORM instances bound to the leader's session
+    assert isinstance(value, BaseModel)
@@ -0,0 +1,135 @@
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from crafty.conditional import make_etag
+
+
+def test_etags_are_strong_and_name_the_row_version():
+    assert make_etag("product", 3, 7) == '"product-3-7"'
+    assert make_etag("product", 3, 7, "tags") == '"product-3-7-tags"'
+
+
+def test_matching_if_none_match_is_answered_with_304(client, create_product):
+    product = create_product("Cup")
+    etag = client.get(f"/products/{product['id']}").headers["etag"]
+
+    response = client.get(f"/products/{product['id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["x-db-query-count"] == "1"
+
+
+def test_if_none_match_uses_the_weak_comparison(client, create_product):
+    product = create_product("Cup")
+    etag = client.get(f"/products/{product['id']}").headers["etag"]
+
+    for header in (f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(
+            f"/products/{product['id']}", headers={"If-None-Match": header}
+        )
+        assert response.status_code == 304, header
+
+
+def test_updates_change_the_etag(client, create_product):
+    product = create_product("Cup")
+    etag = client.get(f"/products/{product['id']}").headers["etag"]
+
+    client.put(f"/products/{product['id']}", json={"price": 42})
+    response = client.get(f"/products/{product['id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["price"] == 42
+    assert response.headers["etag"] != etag
+
+
+def test_tag_changes_bump_the_product_version(client, create_product, create_tag):
+    product = create_product("Cup")
+    tag = create_tag("blue")
+    etag = client.get(f"/products/{product['id']}").headers["etag"]
+
+    client.post(
+        "/tags/attach", json=[{"product_id": product["id"], "tag_ids": [tag["id"]]}]
+    )
+    response = client.get(f"/products/{product['id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+
+
+def test_representations_with_tags_have_their_own_etag(client, create_product):
+    product = create_product("Cup")
+    etag = client.get(f"/products/{product['id']}").headers["etag"]
+
+    response = client.get(
+        f"/products/{product['id']}",
+        params={"include_tags": True},
+        headers={"If-None-Match": etag},
+    )
+
+    assert response.status_code == 200
+
+
+def test_if_modified_since_is_answered_by_last_modified(client, create_product):
+    product = create_product("Cup")
+    last_modified = client.get(f"/products/{product['id']}").headers["last-modified"]
+
+    current = client.get(
+        f"/products/{product['id']}", headers={"If-Modified-Since": last_modified}
+    )
+    old = client.get(
+        f"/products/{product['id']}",
+        headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+    )
+
+    assert current.status_code == 304
+    assert old.status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(client, create_product):
+    product = create_product("Cup")
+    last_modified = client.get(f"/products/{product['id']}").headers["last-modified"]
+
+    response = client.get(
+        f"/products/{product['id']}",
+        headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+    )
+
+    assert response.status_code == 200
+
+
+def test_tags_and_users_answer_conditional_requests(client, seller, create_tag):
+    tag = create_tag("blue")
+    urls = [
+        f"/tags/{tag['id']}",
+        "/tags/name/blue",
+        f"/users/id/{seller['id']}",
+        "/users/username/seller",
+        "/users/email/seller@example.com",
+    ]
+
+    for url in urls:
+        etag = client.get(url).headers["etag"]
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304, url
+
+
+def test_conditional_requests_for_missing_rows_are_not_found(client):
+    response = client.get("/products/999", headers={"If-None-Match": "*"})
+
+    assert response.status_code == 404
+
+
+def test_concurrent_updates_are_answered_with_409(client, create_product):
+    product = create_product("Cup")
+
+    def concurrent_update(session, flush_context, instances):
+        session.connection().execute(text("UPDATE products SET version = version + 1"))
+
+    event.listen(Session, "before_flush", concurrent_update)
+    try:
+        response = client.put(f"/products/{product['id']}", json={"price": 42})
+    finally:
+        event.remove(Session, "before_flush", concurrent_update)
+
+    assert response.status_code == 409
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from crafty.db import executor as executor_module
+from crafty.db import session as session_module
+from crafty.db.database import engine
+from crafty.db.executor import PoolAdmission
+from crafty.db.session import get_db, get_executor_db
+from crafty.main import app
+
+
+@pytest.fixture
+def executor_mode(client, settings):
+    settings.set("db_mode", "executor")
+    app.dependency_overrides[get_db] = get_executor_db
+    yield
+    del app.dependency_overrides[get_db]
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    """Replace the pool admission with one holding a single permit."""
+    admission = PoolAdmission(1)
+    monkeypatch.setattr(executor_module, "pool_admission", admission)
+    monkeypatch.setattr(session_module, "pool_admission", admission)
+    return admission
+
+
+def test_admission_hands_out_capacity_permits():
+    async def run():
+        admission = PoolAdmission(2)
+        await admission.acquire(max_wait=0.1, retry_after=1)
+        await admission.acquire(max_wait=0.1, retry_after=1)
+        assert admission.in_use == 2
+        admission.release()
+        assert admission.in_use == 1
+
+    asyncio.run(run())
+
+
+def test_admission_rejects_with_retry_after_when_no_permit_frees():
+    async def run():
+        admission = PoolAdmission(1)
+        await admission.acquire(max_wait=0.1, retry_after=1)
+        with pytest.raises(HTTPException) as rejected:
+            await admission.acquire(max_wait=0.01, retry_after=3)
+        return admission, rejected.value
+
+    admission, error = asyncio.run(run())
+
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "3"}
+    assert admission.rejected == 1
+    assert admission.waiting == 0
+
+
+def test_executor_mode_runs_crud_functions_on_the_database_pool(
+    client, executor_mode, admission, create_product
+):
+    product = create_product("Bowl")
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.current_thread().name)
+
+    event.listen(engine, "before_cursor_execute", record_thread)
+    try:
+        response = client.get(f"/products/{product['id']}")
+    finally:
+        event.remove(engine, "before_cursor_execute", record_thread)
+
+    assert response.status_code == 200
+    assert threads and all(name.startswith("crafty-db") for name in threads)
+    assert admission.in_use == 0
+
+
+def test_executor_mode_rejects_requests_while_the_pool_is_exhausted(
+    client, executor_mode, admission, settings
+):
+    settings.set("db_executor_max_wait", 0.01)
+    settings.set("db_executor_retry_after", 2)
+    asyncio.run(admission.acquire(max_wait=0.1, retry_after=1))
+
+    response = client.get("/products/1")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from crafty.crud.product import EXPORT_FIELDS, export_products
+from crafty.db.models.product import Product
+from crafty.db.session import db_session
+from crafty.exporting import csv_chunks, gzip_chunks, ndjson_chunks
+
+
+@pytest.fixture
+def catalog(client, create_product, create_tag):
+    """Three products, the first with two images and tags."""
+    products = [create_product(name) for name in ("Cup", "Plate", "Jug")]
+    tags = [create_tag(name) for name in ("glazed", "blue")]
+    for url in ("https://example.com/1.png", "https://example.com/2.png"):
+        client.post(f"/products/{products[0]['id']}/images/", params={"image_url": url})
+    client.post(
+        "/tags/attach",
+        json=[
+            {"product_id": products[0]["id"], "tag_ids": [tag["id"] for tag in tags]}
+        ],
+    )
+    return products
+
+
+def export(client, **params):
+    response = client.get("/products/export", params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_products_are_exported_as_ndjson(client, catalog):
+    response = export(client)
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [row["name"] for row in rows] == ["Cup", "Plate", "Jug"]
+    assert rows[0]["images"] == [
+        "https://example.com/1.png",
+        "https://example.com/2.png",
+    ]
+    assert rows[0]["tags"] == ["blue", "glazed"]
+    assert (rows[1]["images"], rows[1]["tags"]) == ([], [])
+    assert set(rows[0]) == set(EXPORT_FIELDS)
+
+
+def test_products_are_exported_as_csv(client, catalog):
+    response = export(client, format="csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert response.headers["content-disposition"].endswith('"products.csv"')
+    assert [row["name"] for row in rows] == ["Cup", "Plate", "Jug"]
+    assert rows[0]["images"] == "https://example.com/1.png|https://example.com/2.png"
+    assert rows[0]["tags"] == "blue|glazed"
+
+
+def test_exports_are_compressed_when_accepted(client, catalog):
+    plain = client.get("/products/export", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/products/export", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.content == plain.content
+
+
+def test_exports_since_a_time_only_hold_products_changed_since(client, db, catalog):
+    db.execute(update(Product).values(updated_at=datetime(2020, 1, 1)))
+    db.commit()
+    client.put(f"/products/{catalog[1]['id']}", json={"price": 42})
+
+    for since in ("2024-01-01T00:00:00", "2024-01-01T02:00:00+02:00"):
+        response = export(client, since=since)
+        assert [json.loads(line)["name"] for line in response.text.splitlines()] == [
+            "Plate"
+        ]
+
+
+def test_products_are_read_in_batches(client, catalog):
+    with db_session() as db, db_session() as side_db:
+        batches = list(export_products(db, side_db, batch_size=2))
+
+    assert [[row["name"] for row in batch] for batch in batches] == [
+        ["Cup", "Plate"],
+        ["Jug"],
+    ]
+
+
+def test_chunks_are_written_per_batch():
+    batches = [[{"id": 1, "tags": ["a", "b"]}], [{"id": 2, "tags": []}]]
+
+    assert list(ndjson_chunks(batches)) == [
+        b'{"id": 1, "tags": ["a", "b"]}\n',
+        b'{"id": 2, "tags": []}\n',
+    ]
+    assert list(csv_chunks(batches, ["id", "tags"])) == [
+        b"id,tags\r\n1,a|b\r\n",
+        b"2,\r\n",
+    ]
+    assert list(csv_chunks([], ["id", "tags"])) == [b"id,tags\r\n"]
+
+
+def test_chunks_are_compressed_into_one_gzip_stream():
+    chunks = [b"first\n", b"", b"second\n"]
+
+    assert zlib.decompress(b"".join(gzip_chunks(chunks)), 31) == b"first\nsecond\n"
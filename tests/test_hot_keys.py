@@ -0,0 +1,133 @@
+import pytest
+
+from crafty.cache.hotkeys import HotKeys, HotKeyTracker, get_hot_keys
+from crafty.cache.memory import ENTRY_OVERHEAD, MemoryCache
+
+
+@pytest.fixture
+def hot_keys(client, settings):
+    """Hot key tracking pinning keys read three times."""
+    settings.set("hot_key_threshold", 3)
+    settings.set("hot_key_refresh_interval", 3600)
+    get_hot_keys.cache_clear()
+    yield get_hot_keys()
+    get_hot_keys.cache_clear()
+
+
+def test_tracker_estimates_never_undercount():
+    tracker = HotKeyTracker(width=8, depth=2)
+    for number in range(50):
+        for _ in range(number % 5):
+            tracker.record(f"key:{number}")
+
+    assert all(tracker.estimate(f"key:{number}") >= number % 5 for number in range(50))
+    assert tracker.reads == sum(number % 5 for number in range(50))
+
+
+def test_tracker_keeps_the_keys_read_most():
+    tracker = HotKeyTracker(top_size=2)
+    for key, reads in [("a", 3), ("b", 1), ("c", 5), ("d", 2)]:
+        for _ in range(reads):
+            tracker.record(key)
+
+    assert tracker.top() == [("c", 5), ("a", 3)]
+    assert tracker.top(1) == [("c", 5)]
+
+
+def test_tracker_counts_are_halved_every_window():
+    tracker = HotKeyTracker(window=60)
+    for _ in range(8):
+        tracker.record("key")
+
+    tracker._decayed_at -= 120
+
+    assert tracker.estimate("key") == 2
+    assert tracker.top() == [("key", 2)]
+
+
+def test_keys_are_pinned_once_hot():
+    hot_keys = HotKeys(
+        HotKeyTracker(), threshold=2, max_pinned=1, refresh_interval=3600
+    )
+
+    hot_keys.record("counted")
+    hot_keys.record("counted")
+    hot_keys.record("first", lambda: None)
+    hot_keys.record("first", lambda: None)
+    hot_keys.record("second", lambda: None)
+    hot_keys.record("second", lambda: None)
+
+    assert hot_keys.pinned() == {"first"}
+
+
+def test_cold_and_failing_keys_are_unpinned():
+    tracker = HotKeyTracker()
+    hot_keys = HotKeys(tracker, threshold=2, max_pinned=10, refresh_interval=3600)
+    refreshed = []
+
+    def fail():
+        raise LookupError("deleted")
+
+    for key, refresh in [
+        ("hot", lambda: refreshed.append(1)),
+        ("cold", lambda: None),
+        ("failing", fail),
+    ]:
+        hot_keys.record(key, refresh)
+        hot_keys.record(key, refresh)
+    # Only "hot" and "failing" are read again in the next window
+    tracker._rows = [[0] * tracker.width for _ in range(tracker.depth)]
+    for _ in range(2):
+        tracker.record("hot")
+        tracker.record("failing")
+
+    hot_keys.refresh_pinned()
+
+    assert hot_keys.pinned() == {"hot"}
+    assert refreshed == [1]
+    assert (hot_keys.refreshes, hot_keys.refresh_errors) == (1, 1)
+
+
+def test_pinned_entries_are_not_evicted():
+    cache = MemoryCache(max_bytes=2 * (1 + 1 + ENTRY_OVERHEAD), default_ttl=60)
+    cache.set("a", b"x")
+    cache.set("b", b"x")
+    cache.pin("a")
+
+    cache.set("c", b"x")
+
+    assert cache.get("a") == b"x"
+    assert cache.get("b") is None
+
+
+def test_hot_products_are_reported_and_pinned(client, hot_keys, create_product):
+    product = create_product("Cup")
+    for _ in range(3):
+        client.get(f"/products/{product['id']}")
+    client.get("/users/username/seller")
+
+    report = client.get("/admin/hot-keys").json()
+
+    assert report["threshold"] == 3
+    assert report["pinned"] == 1
+    assert report["keys"][0] == {
+        "key": f"product:{product['id']}:images",
+        "count": 3,
+        "pinned": True,
+    }
+    assert {"key": "user:username:seller", "count": 1, "pinned": False} in report[
+        "keys"
+    ]
+
+
+def test_hot_products_are_refreshed_until_deleted(client, hot_keys, create_product):
+    product = create_product("Cup")
+    for _ in range(3):
+        client.get(f"/products/{product['id']}")
+
+    hot_keys.refresh_pinned()
+    client.delete(f"/products/{product['id']}")
+    hot_keys.refresh_pinned()
+
+    assert hot_keys.pinned() == set()
+    assert (hot_keys.refreshes, hot_keys.refresh_errors) == (1, 1)
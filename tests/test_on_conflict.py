@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from crafty.db.writes import (MYSQL_DUPLICATE_ENTRY,
+                              POSTGRESQL_UNIQUE_VIOLATION, is_duplicate_key)
+
+
+@pytest.fixture
+def buyer(client):
+    response = client.post(
+        "/users/",
+        json={
+            "username": "buyer",
+            "email": "buyer@example.com",
+            "password_hash": "hash",
+            "user_type": "buyer",
+        },
+    )
+    return response.json()
+
+
+def integrity_error(orig):
+    return IntegrityError("INSERT", {}, orig)
+
+
+@pytest.mark.parametrize(
+    "orig, duplicate",
+    [
+        (SimpleNamespace(pgcode=POSTGRESQL_UNIQUE_VIOLATION, args=()), True),
+        (SimpleNamespace(pgcode="23503", args=()), False),
+        (Exception(MYSQL_DUPLICATE_ENTRY, "Duplicate entry"), True),
+        (Exception(1452, "Cannot add or update a child row"), False),
+        (Exception("UNIQUE constraint failed: tags.name"), True),
+        (Exception("FOREIGN KEY constraint failed"), False),
+    ],
+)
+def test_only_unique_violations_are_duplicate_keys(orig, duplicate):
+    assert is_duplicate_key(integrity_error(orig)) is duplicate
+
+
+def test_existing_tags_are_rejected_by_default(client, create_tag):
+    create_tag("blue")
+
+    response = client.post("/tags/", json={"name": "blue"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("on_conflict", ["ignore", "update"])
+def test_existing_tags_can_be_returned(client, create_tag, on_conflict):
+    tag = create_tag("blue")
+
+    response = client.post(
+        "/tags/", params={"on_conflict": on_conflict}, json={"name": "blue"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == tag
+
+
+def test_unknown_conflict_modes_are_rejected(client):
+    response = client.post(
+        "/tags/", params={"on_conflict": "merge"}, json={"name": "x"}
+    )
+
+    assert response.status_code == 422
+
+
+def test_existing_favorites_are_rejected_or_returned(client, buyer, create_product):
+    product = create_product("Cup")
+    favorite = {"buyer_id": buyer["id"], "product_id": product["id"]}
+    created = client.post("/favorites/", json=favorite).json()
+
+    duplicate = client.post("/favorites/", json=favorite)
+    ignored = client.post(
+        "/favorites/", params={"on_conflict": "ignore"}, json=favorite
+    )
+
+    assert duplicate.status_code == 400
+    assert ignored.status_code == 200
+    assert ignored.json() == created
+
+
+@pytest.mark.parametrize(
+    "on_conflict, expected",
+    [("ignore", (5, "great")), ("update", (2, "broke"))],
+)
+def test_existing_reviews_are_kept_or_overwritten(
+    client, seller, buyer, create_product, on_conflict, expected
+):
+    product = create_product("Cup")
+    review = {
+        "reviewer_id": buyer["id"],
+        "reviewed_user_id": seller["id"],
+        "product_id": product["id"],
+    }
+    created = client.post(
+        "/reviews/", json={**review, "rating": "5", "comment": "great"}
+    ).json()
+
+    duplicate = client.post(
+        "/reviews/", json={**review, "rating": "2", "comment": "broke"}
+    )
+    stored = client.post(
+        "/reviews/",
+        params={"on_conflict": on_conflict},
+        json={**review, "rating": "2", "comment": "broke"},
+    )
+
+    assert duplicate.status_code == 400
+    assert stored.status_code == 200
+    assert stored.json()["id"] == created["id"]
+    assert (stored.json()["rating"], stored.json()["comment"]) == expected
+
+
+def test_taken_product_names_are_rejected(client, create_product):
+    create_product("Cup")
+    plate = create_product("Plate")
+
+    created = client.post(
+        "/products/", json={"name": "Cup", "price": 10, "seller_id": plate["seller_id"]}
+    )
+    renamed = client.put(f"/products/{plate['id']}", json={"name": "Cup"})
+
+    assert created.status_code == 400
+    assert renamed.status_code == 400
+    assert client.get(f"/products/{plate['id']}").json()["name"] == "Plate"
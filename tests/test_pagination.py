@@ -0,0 +1,96 @@
+import pytest
+
+from crafty.db.models.product import Product
+from crafty.exceptions import InvalidCursorError
+from crafty.pagination import cursor_types, decode_cursor, encode_cursor
+
+LIST_ENDPOINTS = [
+    "/products/",
+    "/products/sellers/1/products/",
+    "/tags/",
+    "/tags/1/products",
+    "/users/",
+    "/reviews/",
+    "/favorites/",
+    "/subscriptions/",
+]
+
+
+NUMBERS = [(int, float), (int,)]
+
+# Well-formed cursors of the id key holding a value of the wrong type
+WRONGLY_TYPED_CURSORS = [
+    encode_cursor({"id": {"a": 1}}),
+    encode_cursor({"id": [1, 2]}),
+    encode_cursor({"id": "x"}),
+    encode_cursor({"id": 1.5}),
+    encode_cursor({"id": True}),
+    encode_cursor({"id": None}),
+]
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"price": 25.5, "id": 7})
+
+    assert decode_cursor(cursor, ["price", "id"], NUMBERS) == [25.5, 7]
+
+
+def test_cursor_types_follow_the_columns():
+    assert cursor_types([Product.price, Product.id]) == [(int,), (int,)]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor({"price": 25}),
+        encode_cursor({"id": 1, "price": 25, "extra": 0}),
+        encode_cursor({"price": "25", "id": 1}),
+        encode_cursor({"price": False, "id": 1}),
+        encode_cursor({"price": 25, "id": 1.0}),
+    ],
+)
+def test_decode_cursor_rejects_malformed_or_foreign_cursors(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, ["price", "id"], NUMBERS)
+
+
+@pytest.mark.parametrize("cursor", ["%%%", *WRONGLY_TYPED_CURSORS])
+@pytest.mark.parametrize("url", LIST_ENDPOINTS)
+def test_list_endpoints_reject_invalid_cursors(client, create_tag, url, cursor):
+    create_tag("glass")
+
+    response = client.get(url, params={"cursor": cursor})
+
+    assert response.status_code == 400
+
+
+def test_cursor_pages_list_every_product_once(client, create_product):
+    created = [create_product(f"Product {index}")["id"] for index in range(7)]
+
+    seen = []
+    params = {"limit": 3, "facets": False}
+    while True:
+        page = client.get("/products/", params=params).json()
+        seen += [product["id"] for product in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert seen == created
+
+
+def test_next_cursor_is_null_on_a_partial_page(client, create_product):
+    create_product("Only")
+
+    page = client.get("/products/", params={"limit": 3, "facets": False}).json()
+
+    assert page["next_cursor"] is None
+
+
+def test_skip_is_still_accepted_without_a_cursor(client, create_product):
+    created = [create_product(f"Product {index}")["id"] for index in range(3)]
+
+    page = client.get("/products/", params={"skip": 1, "facets": False}).json()
+
+    assert [product["id"] for product in page["items"]] == created[1:]
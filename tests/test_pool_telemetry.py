@@ -0,0 +1,50 @@
+import pytest
+
+from crafty.db.database import ENGINE_OPTIONS, engine
+from crafty.metrics import Histogram
+
+
+def primary_pool(client):
+    response = client.get("/admin/db/pool")
+    assert response.status_code == 200
+    return next(pool for pool in response.json()["pools"] if pool["name"] == "primary")
+
+
+def test_histogram_counts_observations_cumulatively():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == pytest.approx(3.65)
+    assert snapshot["buckets"] == {"0.1": 2, "1.0": 3, "+Inf": 4}
+
+
+def test_engine_uses_the_configured_pool(settings):
+    assert engine.pool.size() == ENGINE_OPTIONS["pool_size"]
+    assert engine.pool.timeout() == ENGINE_OPTIONS["pool_timeout"]
+    assert ENGINE_OPTIONS["pool_size"] == settings.db_pool_size
+    assert ENGINE_OPTIONS["max_overflow"] == settings.db_max_overflow
+
+
+def test_pool_report_counts_checkouts_of_requests(client):
+    before = primary_pool(client)
+
+    client.get("/products/1")
+    after = primary_pool(client)
+
+    assert after["checkouts"] > before["checkouts"]
+    assert after["checkout_latency"]["count"] > before["checkout_latency"]["count"]
+    assert after["checked_out"] == 0
+    assert after["size"] == ENGINE_OPTIONS["pool_size"]
+
+
+def test_pool_report_includes_the_executor_admission(client):
+    executor = client.get("/admin/db/pool").json()["executor"]
+
+    assert executor["in_use"] == 0
+    assert executor["capacity"] == (
+        ENGINE_OPTIONS["pool_size"] + ENGINE_OPTIONS["max_overflow"]
+    )
@@ -0,0 +1,135 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from crafty.cache import memory
+from crafty.cache.memory import ENTRY_OVERHEAD, MemoryCache
+from crafty.cache.store import get_cache, invalidate, read_through, refresh
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+def query_count(response):
+    assert response.status_code == 200, response.text
+    return int(response.headers["x-db-query-count"])
+
+
+def test_memory_cache_evicts_the_least_recently_used_entries():
+    cache = MemoryCache(max_bytes=3 * (1 + 1 + ENTRY_OVERHEAD), default_ttl=60)
+    for key in "abc":
+        cache.set(key, b"x")
+    cache.get("a")
+
+    cache.set("d", b"x")
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [b"x", b"x", b"x"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(max_bytes=10_000, default_ttl=60)
+    cache.set("short", b"x", ttl=0.01)
+    cache.set("long", b"x")
+
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == b"x"
+
+
+def test_fills_loaded_before_a_delete_are_skipped():
+    cache = MemoryCache(max_bytes=10_000, default_ttl=60)
+    token = cache.fill_token("key")
+    cache.delete(["key"])
+
+    assert not cache.fill("key", b"stale", token)
+    assert cache.get("key") is None
+    assert cache.fill("key", b"fresh", cache.fill_token("key"))
+    assert cache.get("key") == b"fresh"
+
+
+def test_fills_are_skipped_when_the_delete_was_forgotten(monkeypatch):
+    monkeypatch.setattr(memory, "MAX_REMEMBERED_DELETES", 2)
+    cache = MemoryCache(max_bytes=10_000, default_ttl=60)
+    token = cache.fill_token("key")
+    cache.delete(["key", "other", "third"])
+
+    assert not cache.fill("key", b"stale", token)
+
+
+def test_read_through_loads_once_until_invalidated(client):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return SimpleNamespace(id=1, name="Cup")
+
+    first = read_through("item:1", Item, load)
+    second = read_through("item:1", Item, load)
+    invalidate(["item:1"])
+    third = read_through("item:1", Item, load)
+
+    assert first == second == third == Item(id=1, name="Cup")
+    assert len(loads) == 2
+
+
+def test_read_through_skips_values_invalidated_while_loading(client):
+    def load():
+        # A write committed while the value is loaded
+        invalidate(["item:1"])
+        return SimpleNamespace(id=1, name="stale")
+
+    assert read_through("item:1", Item, load).name == "stale"
+    assert get_cache().get("item:1") is None
+
+
+def test_refresh_skips_values_invalidated_while_loading(client):
+    def load():
+        invalidate(["item:1"])
+        return SimpleNamespace(id=1, name="stale")
+
+    refresh("item:1", Item, load)
+
+    assert get_cache().get("item:1") is None
+
+
+def test_refresh_of_a_missing_value_fails(client):
+    with pytest.raises(LookupError):
+        refresh("item:1", Item, lambda: None)
+
+
+def test_repeated_product_reads_are_served_from_the_cache(client, create_product):
+    product = create_product("Cup")
+
+    assert query_count(client.get(f"/products/{product['id']}")) > 0
+    assert query_count(client.get(f"/products/{product['id']}")) == 0
+
+
+def test_product_writes_invalidate_the_cached_product(client, create_product):
+    product = create_product("Cup")
+    client.get(f"/products/{product['id']}")
+    client.post(
+        f"/products/{product['id']}/images/",
+        params={"image_url": "https://example.com/cup.png"},
+    )
+    client.put(f"/products/{product['id']}", json={"price": 42})
+
+    response = client.get(f"/products/{product['id']}")
+
+    assert response.json()["price"] == 42
+    assert len(response.json()["images"]) == 1
+
+
+def test_deleted_products_are_not_served_from_the_cache(client, create_product):
+    product = create_product("Cup")
+    client.get(f"/products/{product['id']}")
+
+    client.delete(f"/products/{product['id']}")
+
+    assert client.get(f"/products/{product['id']}").status_code == 404
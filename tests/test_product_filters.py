@@ -0,0 +1,97 @@
+import pytest
+
+
+@pytest.fixture
+def catalog(client, seller, create_product, create_tag):
+    """Products of two sellers, the cheap ones tagged "small"."""
+    other = client.post(
+        "/users/",
+        json={
+            "username": "other",
+            "email": "other@example.com",
+            "password_hash": "hash",
+            "user_type": "seller",
+        },
+    ).json()
+    small = create_tag("small")
+    for name, price in [("Cup", 20), ("Plate", 30), ("Jug", 60), ("Vase", 300)]:
+        product = create_product(name, price)
+        if price < 50:
+            client.post(
+                "/tags/attach",
+                json=[{"product_id": product["id"], "tag_ids": [small["id"]]}],
+            )
+    client.post(
+        "/products/",
+        json={"name": "Lamp", "price": 40, "seller_id": other["id"]},
+    )
+    return {"seller": seller, "other": other}
+
+
+def names(client, **params):
+    response = client.get("/products/", params=params)
+    assert response.status_code == 200, response.text
+    return [product["name"] for product in response.json()["items"]]
+
+
+def test_products_filter_by_seller_tag_and_price(client, catalog):
+    assert names(client, seller_id=catalog["other"]["id"]) == ["Lamp"]
+    assert names(client, tag="small") == ["Cup", "Plate"]
+    assert names(client, min_price=30, max_price=60) == ["Plate", "Jug", "Lamp"]
+    assert names(client, seller_id=catalog["seller"]["id"], max_price=30) == [
+        "Cup",
+        "Plate",
+    ]
+
+
+@pytest.mark.parametrize(
+    "sort, expected",
+    [
+        ("price_asc", ["Cup", "Plate", "Lamp", "Jug", "Vase"]),
+        ("price_desc", ["Vase", "Jug", "Lamp", "Plate", "Cup"]),
+    ],
+)
+def test_price_sorted_pages_follow_the_cursor(client, catalog, sort, expected):
+    seen = []
+    params = {"sort": sort, "limit": 2, "facets": False}
+    while True:
+        page = client.get("/products/", params=params).json()
+        seen += [product["name"] for product in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert seen == expected
+
+
+def test_cursors_only_continue_their_own_sort_order(client, catalog):
+    page = client.get(
+        "/products/", params={"sort": "price_asc", "limit": 2, "facets": False}
+    ).json()
+
+    response = client.get("/products/", params={"cursor": page["next_cursor"]})
+
+    assert response.status_code == 400
+
+
+def test_facets_count_all_matching_products(client, catalog):
+    facets = client.get("/products/", params={"limit": 1}).json()["facets"]
+
+    assert facets["tags"] == [{"name": "small", "count": 2}]
+    assert facets["prices"] == [
+        {"min_price": 0, "max_price": 25, "count": 1},
+        {"min_price": 25, "max_price": 50, "count": 2},
+        {"min_price": 50, "max_price": 100, "count": 1},
+        {"min_price": 250, "max_price": 500, "count": 1},
+    ]
+
+
+def test_facets_follow_the_filters(client, catalog):
+    facets = client.get("/products/", params={"min_price": 50}).json()["facets"]
+
+    assert facets["tags"] == []
+    assert sum(bucket["count"] for bucket in facets["prices"]) == 2
+
+
+def test_negative_prices_are_rejected(client):
+    assert client.get("/products/", params={"min_price": -1}).status_code == 422
@@ -0,0 +1,73 @@
+import itertools
+
+import pytest
+
+from crafty.crud.product import product_loader_options
+
+
+@pytest.fixture
+def catalog(client, create_product, create_tag):
+    """Create products with an image and a tag each, returning a creator."""
+    tag = create_tag("ceramics")
+    indexes = itertools.count()
+
+    def create(count):
+        for index in itertools.islice(indexes, count):
+            product = create_product(f"Product {index}")
+            client.post(
+                f"/products/{product['id']}/images/",
+                params={"image_url": f"https://example.com/{index}.png"},
+            )
+            client.post(
+                "/tags/attach",
+                json=[{"product_id": product["id"], "tag_ids": [tag["id"]]}],
+            )
+
+    return create
+
+
+def query_count(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return int(response.headers["x-db-query-count"]), response.json()
+
+
+def test_loader_options_reject_unknown_relationships():
+    with pytest.raises(ValueError):
+        product_loader_options(["images", "reviews"])
+
+
+def test_product_pages_cost_the_same_queries_whatever_their_size(client, catalog):
+    url = "/products/?include_tags=true&facets=false&limit=50"
+    catalog(1)
+    single, _ = query_count(client, url)
+
+    catalog(5)
+    several, page = query_count(client, url)
+
+    assert several == single
+    assert len(page["items"]) == 6
+    assert all(len(product["images"]) == 1 for product in page["items"])
+    assert all(
+        [tag["name"] for tag in product["tags"]] == ["ceramics"]
+        for product in page["items"]
+    )
+
+
+def test_tags_are_null_unless_requested(client, catalog):
+    catalog(1)
+
+    _, page = query_count(client, "/products/?facets=false")
+    _, product = query_count(client, "/products/1")
+
+    assert page["items"][0]["tags"] is None
+    assert product["tags"] is None
+    assert len(product["images"]) == 1
+
+
+def test_product_detail_loads_tags_on_request(client, catalog):
+    catalog(1)
+
+    _, product = query_count(client, "/products/1?include_tags=true")
+
+    assert [tag["name"] for tag in product["tags"]] == ["ceramics"]
@@ -0,0 +1,119 @@
+import pytest
+
+
+@pytest.fixture
+def tagged(client, create_product, create_tag):
+    products = [create_product(name) for name in ("Cup", "Plate", "Jug")]
+    tags = [create_tag(name) for name in ("blue", "glazed")]
+    return products, tags
+
+
+def tag_names(result):
+    return {
+        item["product_id"]: [tag["name"] for tag in item["tags"]] for item in result
+    }
+
+
+def test_attach_tags_to_many_products(client, tagged):
+    (cup, plate, _), (blue, glazed) = tagged
+
+    response = client.post(
+        "/tags/attach",
+        json=[
+            {"product_id": plate["id"], "tag_ids": [blue["id"], glazed["id"]]},
+            {"product_id": cup["id"], "tag_ids": [blue["id"]]},
+        ],
+    )
+
+    assert response.status_code == 200
+    assert tag_names(response.json()) == {
+        cup["id"]: ["blue"],
+        plate["id"]: ["blue", "glazed"],
+    }
+
+
+def test_attaching_attached_tags_keeps_them_once(client, tagged):
+    (cup, _, _), (blue, _) = tagged
+    update = [{"product_id": cup["id"], "tag_ids": [blue["id"], blue["id"]]}]
+    client.post("/tags/attach", json=update)
+
+    response = client.post("/tags/attach", json=update)
+
+    assert response.status_code == 200
+    assert tag_names(response.json()) == {cup["id"]: ["blue"]}
+
+
+def test_detach_ignores_tags_that_are_not_attached(client, tagged):
+    (cup, _, _), (blue, glazed) = tagged
+    client.post(
+        "/tags/attach", json=[{"product_id": cup["id"], "tag_ids": [blue["id"]]}]
+    )
+
+    response = client.post(
+        "/tags/detach",
+        json=[{"product_id": cup["id"], "tag_ids": [blue["id"], glazed["id"]]}],
+    )
+
+    assert response.status_code == 200
+    assert tag_names(response.json()) == {cup["id"]: []}
+
+
+@pytest.mark.parametrize("path", ["/tags/attach", "/tags/detach"])
+def test_unknown_products_and_tags_are_rejected_without_writing(client, tagged, path):
+    (cup, _, _), (blue, _) = tagged
+
+    unknown_product = client.post(
+        path, json=[{"product_id": 999, "tag_ids": [blue["id"]]}]
+    )
+    unknown_tag = client.post(
+        path,
+        json=[
+            {"product_id": cup["id"], "tag_ids": [blue["id"]]},
+            {"product_id": cup["id"], "tag_ids": [999]},
+        ],
+    )
+
+    assert unknown_product.status_code == 404
+    assert unknown_tag.status_code == 404
+    product = client.get(f"/products/{cup['id']}", params={"include_tags": True})
+    assert product.json()["tags"] == []
+
+
+def test_tag_updates_are_visible_in_cached_products(client, tagged):
+    (cup, _, _), (blue, _) = tagged
+    client.get(f"/products/{cup['id']}", params={"include_tags": True})
+
+    client.post(
+        "/tags/attach", json=[{"product_id": cup["id"], "tag_ids": [blue["id"]]}]
+    )
+    product = client.get(f"/products/{cup['id']}", params={"include_tags": True})
+
+    assert [tag["name"] for tag in product.json()["tags"]] == ["blue"]
+
+
+def test_tag_products_are_listed_in_pages(client, tagged):
+    products, (blue, _) = tagged
+    client.post(
+        "/tags/attach",
+        json=[
+            {"product_id": product["id"], "tag_ids": [blue["id"]]}
+            for product in products
+        ],
+    )
+
+    first = client.get(f"/tags/{blue['id']}/products", params={"limit": 2}).json()
+    second = client.get(
+        f"/tags/{blue['id']}/products",
+        params={"limit": 2, "cursor": first["next_cursor"]},
+    ).json()
+
+    assert [product["name"] for product in first["items"] + second["items"]] == [
+        "Cup",
+        "Plate",
+        "Jug",
+    ]
+    assert second["next_cursor"] is None
+
+
+def test_products_of_an_unknown_tag_are_not_found(client):
+    assert client.get("/tags/999/products").status_code == 404
@@ -0,0 +1,60 @@
+import pytest
+
+from crafty.db.query_stats import RequestQueries, fingerprint
+from crafty.exceptions import QueryBudgetExceededError
+
+
+def test_fingerprint_ignores_values_and_in_list_lengths():
+    first = fingerprint("SELECT * FROM tags\n WHERE id IN (?, ?, ?) AND version = 3")
+    second = fingerprint("SELECT * FROM tags WHERE id IN (?) AND version = 12")
+
+    assert first == second == "SELECT * FROM tags WHERE id IN (?) AND version = N"
+
+
+def test_request_queries_report_statements_repeated_at_the_threshold():
+    queries = RequestQueries()
+    for product_id in range(3):
+        queries.record(f"SELECT * FROM images WHERE product_id = {product_id}", 0.001)
+    queries.record("SELECT * FROM products", 0.001)
+
+    assert queries.count == 4
+    assert queries.repeated(3) == {"SELECT * FROM images WHERE product_id = N": 3}
+    assert queries.repeated(4) == {}
+
+
+def test_responses_report_the_statement_count(client):
+    response = client.get("/products/")
+
+    assert int(response.headers["x-db-query-count"]) >= 1
+    assert float(response.headers["x-db-time-ms"]) >= 0
+
+
+def test_statistics_are_aggregated_per_route_template(client):
+    client.delete("/admin/db/queries")
+    client.get("/products/1")
+    client.get("/products/2")
+
+    stats = client.get("/admin/db/queries").json()
+
+    assert stats["/products/{product_id}"]["requests"] == 2
+    assert stats["/products/{product_id}"]["statements"] >= 2
+
+
+def test_budget_violations_are_only_logged_by_default(client, settings, caplog):
+    settings.set("db_route_query_budgets", {"/products/": 0})
+
+    response = client.get("/products/")
+
+    assert response.status_code == 200
+    assert "Route /products/ executed" in caplog.text
+
+
+def test_budget_violations_fail_in_strict_mode(client, settings):
+    settings.set("db_route_query_budgets", {"/products/": 0})
+    settings.set("db_query_strict", True)
+
+    with pytest.raises(QueryBudgetExceededError) as error:
+        client.get("/products/")
+
+    assert error.value.route == "/products/"
+    assert error.value.budget == 0
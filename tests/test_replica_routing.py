@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from crafty.db import session as session_module
+from crafty.db.database import Base, engine
+from crafty.db.models.tag import Tag
+from crafty.db.session import RoutingSession, replica_reads
+
+
+@replica_reads
+def tag_names(db):
+    return sorted(tag.name for tag in db.query(Tag))
+
+
+def plain_tag_names(db):
+    return sorted(tag.name for tag in db.query(Tag))
+
+
+@pytest.fixture
+def replica(client, tmp_path, monkeypatch):
+    """A replica database holding one tag the primary does not have."""
+    monkeypatch.setattr(session_module, "_last_write", {})
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(replica)
+    with Session(replica) as db:
+        db.add(Tag(name="replica"))
+        db.commit()
+    yield replica
+    replica.dispose()
+
+
+@pytest.fixture
+def routing_session(replica):
+    with RoutingSession(bind=engine, replicas=[replica]) as db:
+        yield db
+
+
+def test_marked_getters_read_from_a_replica(routing_session):
+    assert tag_names(routing_session) == ["replica"]
+
+
+def test_unmarked_reads_use_the_primary(routing_session):
+    assert plain_tag_names(routing_session) == []
+
+
+def test_reads_after_a_write_in_the_session_use_the_primary(routing_session):
+    routing_session.add(Tag(name="primary"))
+    routing_session.commit()
+
+    assert tag_names(routing_session) == ["primary"]
+
+
+def test_reads_of_recently_written_tables_use_the_primary(replica, settings):
+    settings.set("replica_write_window", 60.0)
+    with RoutingSession(bind=engine, replicas=[replica]) as db:
+        db.add(Tag(name="primary"))
+        db.commit()
+
+    with RoutingSession(bind=engine, replicas=[replica]) as db:
+        assert tag_names(db) == ["primary"]
+
+
+def test_reads_go_back_to_replicas_after_the_write_window(replica, settings):
+    settings.set("replica_write_window", 0.0)
+    with RoutingSession(bind=engine, replicas=[replica]) as db:
+        db.add(Tag(name="primary"))
+        db.commit()
+
+    with RoutingSession(bind=engine, replicas=[replica]) as db:
+        assert tag_names(db) == ["replica"]
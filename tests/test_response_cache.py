@@ -0,0 +1,113 @@
+import pytest
+
+from crafty.cache.responses import (_generations, bump_generations,
+                                    response_cache_enabled)
+from crafty.db import session as session_module
+from crafty.db.database import engine
+
+
+def query_count(response):
+    assert response.status_code == 200, response.text
+    return int(response.headers["x-db-query-count"])
+
+
+@pytest.fixture
+def response_cache(client, settings):
+    settings.set("response_cache", True)
+
+
+def test_responses_are_only_cached_by_shared_backends_by_default(client, settings):
+    assert not response_cache_enabled()
+
+    settings.set("response_cache", True)
+
+    assert response_cache_enabled()
+
+
+def test_responses_are_not_cached_unless_enabled(client, create_product):
+    create_product("Cup")
+    client.get("/products/")
+
+    assert query_count(client.get("/products/")) > 0
+
+
+def test_cached_responses_are_served_without_the_database(
+    client, response_cache, create_product
+):
+    create_product("Cup")
+    first = client.get("/products/", params={"limit": 5, "skip": 0})
+
+    second = client.get("/products/", params={"skip": 0, "limit": 5})
+
+    assert query_count(second) == 0
+    assert second.json() == first.json()
+
+
+def test_responses_are_cached_per_query(client, response_cache, create_product):
+    create_product("Cup")
+    create_product("Plate")
+    client.get("/products/", params={"limit": 1})
+
+    response = client.get("/products/", params={"limit": 2})
+
+    assert query_count(response) > 0
+    assert len(response.json()["items"]) == 2
+
+
+def test_writes_start_a_new_generation(client, response_cache, create_product):
+    create_product("Cup")
+    client.get("/products/")
+    client.get("/tags/")
+
+    create_product("Plate")
+    tags = client.post("/tags/", json={"name": "blue"})
+    products = client.get("/products/")
+
+    assert [product["name"] for product in products.json()["items"]] == [
+        "Cup",
+        "Plate",
+    ]
+    assert client.get("/tags/").json()["items"] == [tags.json()]
+
+
+def test_tag_attachments_start_a_new_product_generation(
+    client, response_cache, create_product, create_tag
+):
+    product = create_product("Cup")
+    tag = create_tag("blue")
+    client.get("/products/", params={"tag": "blue"})
+
+    client.post(
+        "/tags/attach", json=[{"product_id": product["id"], "tag_ids": [tag["id"]]}]
+    )
+    response = client.get("/products/", params={"tag": "blue"})
+
+    assert [product["name"] for product in response.json()["items"]] == ["Cup"]
+
+
+@pytest.mark.parametrize("window, cached", [(60.0, False), (0.0, True)])
+def test_responses_are_not_cached_while_replicas_may_lag(
+    client, response_cache, settings, monkeypatch, create_product, window, cached
+):
+    monkeypatch.setattr(session_module, "replica_engines", [engine])
+    monkeypatch.setattr(session_module, "_last_write", {})
+    settings.set("replica_write_window", window)
+    create_product("Cup")
+    first = client.get("/products/")
+
+    second = client.get("/products/")
+
+    assert second.json() == first.json()
+    assert (query_count(second) == 0) is cached
+
+
+def test_generations_are_kept_until_bumped(client):
+    first = _generations(["products", "tags"])
+
+    assert _generations(["products", "tags"]) == first
+
+    bump_generations(["products"])
+    second = _generations(["products", "tags"])
+
+    assert second[0] != first[0]
+    assert second[1] == first[1]
@@ -0,0 +1,129 @@
+import pytest
+
+from crafty.pagination import encode_cursor
+from crafty.search import InvertedIndex, tokenize
+
+
+def search_names(client, q, **params):
+    response = client.get("/products/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [product["name"] for product in response.json()["items"]]
+
+
+def test_tokenize_splits_lowercase_words():
+    assert tokenize("Hand-made Oak BOWL, 2x") == ["hand", "made", "oak", "bowl", "2x"]
+    assert tokenize(None) == []
+
+
+def test_index_ranks_name_matches_above_description_matches():
+    index = InvertedIndex()
+    index.build(
+        lambda: [
+            (1, "Serving tray", "Carved from oak"),
+            (2, "Oak bowl", "A bowl for fruit"),
+            (3, "Linen cloth", None),
+        ]
+    )
+
+    assert [document for document, _ in index.search("oak")] == [2, 1]
+
+
+def test_equal_scores_are_ranked_by_id():
+    index = InvertedIndex()
+    index.build(lambda: [(1, "Oak bowl", "Round"), (2, "Oak bowl", "Round")])
+
+    ranked = index.search("round oak bowl")
+
+    assert [document for document, _ in ranked] == [2, 1]
+    assert ranked[0][1] == ranked[1][1]
+
+
+def test_index_follows_updates_and_removals_after_build():
+    index = InvertedIndex()
+    index.add(1, "Ignored before build", None)
+    index.build(lambda: [(1, "Oak bowl", None)])
+
+    index.add(1, "Walnut bowl", None)
+    index.add(2, "Oak spoon", None)
+    index.remove(2)
+
+    assert index.search("oak") == []
+    assert [document for document, _ in index.search("walnut")] == [1]
+
+
+def test_search_endpoint_ranks_products(client, create_product):
+    create_product("Serving tray", description="Carved from oak")
+    create_product("Oak bowl")
+    create_product("Linen cloth")
+
+    assert search_names(client, "oak") == ["Oak bowl", "Serving tray"]
+
+
+def test_search_reflects_product_writes(client, create_product):
+    product = create_product("Oak bowl")
+    create_product("Oak spoon")
+    search_names(client, "oak")
+
+    client.put(f"/products/{product['id']}", json={"name": "Walnut bowl"})
+    client.delete("/products/2")
+
+    assert search_names(client, "oak") == []
+    assert search_names(client, "walnut") == ["Walnut bowl"]
+
+
+def test_search_pages_follow_the_cursor(client, create_product):
+    for index in range(5):
+        create_product(f"Oak piece {index}")
+
+    names = []
+    params = {"limit": 2}
+    while True:
+        page = client.get("/products/search", params={"q": "oak", **params}).json()
+        names += [product["name"] for product in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert sorted(names) == [f"Oak piece {index}" for index in range(5)]
+    assert len(names) == 5
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"relevance": "1.0", "id": 1},
+        {"relevance": 1.0, "id": 1.5},
+        {"relevance": True, "id": 1},
+        {"relevance": [1.0], "id": 1},
+    ],
+)
+def test_search_cursors_must_hold_a_score_and_an_id(client, create_product, values):
+    create_product("Oak bowl")
+
+    response = client.get(
+        "/products/search", params={"q": "oak", "cursor": encode_cursor(values)}
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_search_page_sizes_are_bounded(client, limit):
+    response = client.get("/products/search", params={"q": "oak", "limit": limit})
+
+    assert response.status_code == 422
+
+
+def test_search_filters_by_tag(client, create_product, create_tag):
+    tag = create_tag("kitchen")
+    tagged = create_product("Oak spoon")
+    create_product("Oak chair")
+    client.post(
+        "/tags/attach", json=[{"product_id": tagged["id"], "tag_ids": [tag["id"]]}]
+    )
+
+    assert search_names(client, "oak", tag="kitchen") == ["Oak spoon"]
+
+
+def test_search_requires_a_query(client):
+    assert client.get("/products/search").status_code == 422
@@ -0,0 +1,120 @@
+import itertools
+import time
+
+import pytest
+
+from crafty.cache.memory import MemoryCache
+from crafty.cache.shared import SharedCache, connect
+from crafty.cache.store import _notify_remote
+from crafty.crud.tag import TAG_DICTIONARY_KEY, tag_dictionary
+
+pytest.importorskip("fakeredis")
+
+_servers = itertools.count()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def processes():
+    """Create caches of separate processes sharing one fakeredis server."""
+    url = f"fakeredis://tests-{next(_servers)}"
+
+    def create(on_invalidate=None, local_ttl=60):
+        cache = SharedCache(
+            connect(url),
+            default_ttl=60,
+            local=MemoryCache(10_000, local_ttl),
+            local_ttl=local_ttl,
+            on_invalidate=on_invalidate,
+        )
+        assert cache.wait_subscribed(5)
+        return cache
+
+    return create
+
+
+def test_values_are_shared_between_processes(processes):
+    first, second = processes(), processes()
+
+    first.set("key", b"value")
+
+    assert second.get("key") == b"value"
+    assert second.get("key") == b"value"
+    assert second.stats()["hits"] == 1
+    assert second.stats()["local_hits"] == 1
+
+
+def test_invalidations_reach_the_near_caches_of_other_processes(processes):
+    received = []
+    first, second = processes(), processes(on_invalidate=received.append)
+    first.set("key", b"old")
+    second.get("key")
+
+    first.delete(["key"])
+    wait_for(lambda: received)
+    first.set("key", b"new")
+
+    assert received == [["key"]]
+    assert second.get("key") == b"new"
+    assert second.stats()["remote_invalidations"] == 1
+
+
+def test_processes_ignore_their_own_invalidations(processes):
+    received = []
+    first = processes(on_invalidate=received.append)
+    second = processes()
+
+    first.delete(["key"])
+    second.delete(["other"])
+    wait_for(lambda: received)
+
+    assert received == [["other"]]
+
+
+def test_fills_loaded_before_another_process_deleted_are_skipped(processes):
+    first, second = processes(), processes()
+    token = first.fill_token("key")
+
+    second.delete(["key"])
+
+    assert not first.fill("key", b"stale", token)
+    assert second.get("key") is None
+    assert first.fill("key", b"fresh", first.fill_token("key"))
+    assert second.get("key") == b"fresh"
+
+
+def test_clearing_empties_the_near_caches_of_other_processes(processes):
+    first, second = processes(), processes()
+    first.set("key", b"value")
+    second.get("key")
+
+    first.clear()
+    wait_for(lambda: second.local.get("key") is None)
+
+    assert second.get("key") is None
+
+
+def test_unreachable_servers_are_cache_misses(processes):
+    cache = processes(local_ttl=0)
+    cache.client.connection_pool.connection_kwargs["server"].connected = False
+
+    cache.set("key", b"value")
+
+    assert cache.get("key") is None
+    assert not cache.fill("key", b"value", None)
+    assert cache.stats()["errors"] >= 3
+
+
+def test_tag_writes_of_other_processes_reload_the_tag_dictionary(client, processes):
+    client.get("/tags/")
+    first, _ = processes(), processes(on_invalidate=_notify_remote)
+
+    first.delete([TAG_DICTIONARY_KEY])
+
+    wait_for(lambda: not tag_dictionary.fresh())
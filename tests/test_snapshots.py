@@ -0,0 +1,108 @@
+import pytest
+
+from crafty.db.database import engine
+from crafty.snapshots import (MANIFEST, SNAPSHOT_TABLES, load_manifest,
+                              snapshot, snapshot_table)
+
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("pyarrow.parquet")
+
+
+def take(directory, table="products", **options):
+    with engine.connect() as connection:
+        return snapshot_table(connection, directory, table, **options)
+
+
+def read(directory, path, format="parquet"):
+    if format == "parquet":
+        return pa.parquet.read_table(directory / path).to_pylist()
+    with pa.ipc.open_file(str(directory / path)) as reader:
+        return reader.read_all().to_pylist()
+
+
+def test_snapshots_only_append_rows_added_since_the_last_one(
+    client, tmp_path, create_product
+):
+    cup = create_product("Cup")
+    plate = create_product("Plate")
+
+    assert take(tmp_path) == 2
+    assert take(tmp_path) == 0
+    jug = create_product("Jug")
+    assert take(tmp_path) == 1
+
+    state = load_manifest(tmp_path)["products"]
+    assert state["high_water_mark"] == jug["id"]
+    assert len(state["files"]) == 2
+    assert [row["id"] for row in read(tmp_path, state["files"][0])] == [
+        cup["id"],
+        plate["id"],
+    ]
+    assert [row["name"] for row in read(tmp_path, state["files"][1])] == ["Jug"]
+
+
+def test_full_snapshots_replace_the_previous_files(client, tmp_path, create_product):
+    create_product("Cup")
+    take(tmp_path)
+    create_product("Plate")
+    take(tmp_path)
+    old_files = load_manifest(tmp_path)["products"]["files"]
+
+    assert take(tmp_path, full=True) == 2
+
+    (new_file,) = load_manifest(tmp_path)["products"]["files"]
+    assert [row["name"] for row in read(tmp_path, new_file)] == ["Cup", "Plate"]
+    assert not any((tmp_path / path).exists() for path in old_files)
+
+
+def test_rows_are_written_in_batches(client, tmp_path, create_product):
+    for name in ("Cup", "Plate", "Jug"):
+        create_product(name)
+    progress = []
+
+    take(tmp_path, batch_size=2, progress=lambda table, rows: progress.append(rows))
+
+    assert progress == [2, 3]
+
+
+def test_failed_snapshots_leave_the_manifest_as_it_was(
+    client, tmp_path, create_product
+):
+    create_product("Cup")
+    take(tmp_path)
+    create_product("Plate")
+
+    def fail(table, rows):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        take(tmp_path, progress=fail)
+
+    state = load_manifest(tmp_path)["products"]
+    assert len(state["files"]) == 1
+    assert len(list((tmp_path / "products").iterdir())) == 1
+    assert take(tmp_path) == 1
+
+
+def test_user_snapshots_leave_out_password_hashes(client, tmp_path, seller):
+    take(tmp_path, "users", format="arrow")
+
+    (path,) = load_manifest(tmp_path)["users"]["files"]
+    (row,) = read(tmp_path, path, format="arrow")
+    assert path.endswith(".arrow")
+    assert "password_hash" not in row
+    assert row["username"] == "seller"
+    assert row["subscription_level"] == "basic"
+
+
+def test_every_table_is_snapshot(client, tmp_path, create_product):
+    create_product("Cup")
+
+    with engine.connect() as connection:
+        written = snapshot(connection, tmp_path / "snapshots")
+
+    assert written == {
+        table: (1 if table in ("products", "users") else 0) for table in SNAPSHOT_TABLES
+    }
+    assert set(load_manifest(tmp_path / "snapshots")) == {"products", "users"}
+    assert (tmp_path / "snapshots" / MANIFEST).exists()
@@ -0,0 +1,106 @@
+from collections import Counter
+
+import pytest
+
+from crafty import synthetic
+from crafty.db.database import engine
+from crafty.synthetic import SyntheticData, _generate_ahead, next_ids, populate
+
+SIZES = {
+    "sellers": 5,
+    "buyers": 20,
+    "products": 40,
+    "tags": 8,
+    "favorites": 60,
+    "reviews": 30,
+}
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(synthetic, "CHUNK_SIZE", 10)
+
+
+def rows(data):
+    return [data.generate(chunk) for chunk in data.chunks()]
+
+
+def test_the_same_seed_gives_the_same_rows():
+    assert rows(SyntheticData(7, **SIZES)) == rows(SyntheticData(7, **SIZES))
+    assert rows(SyntheticData(7, **SIZES)) != rows(SyntheticData(8, **SIZES))
+
+
+def test_chunks_do_not_depend_on_the_order_they_are_generated_in():
+    data = SyntheticData(7, **SIZES)
+    chunks = data.chunks()
+
+    backwards = [data.generate(chunk) for chunk in reversed(chunks)]
+
+    assert backwards[::-1] == rows(SyntheticData(7, **SIZES))
+
+
+def test_chunks_generated_by_worker_processes_are_the_same():
+    data = SyntheticData(7, **SIZES)
+
+    generated = list(_generate_ahead(data, data.chunks(), processes=2))
+
+    assert generated == rows(data)
+
+
+def test_favorite_and_review_pairs_are_unique():
+    data = SyntheticData(7, **SIZES)
+    tables = Counter()
+    pairs = {"favorites": set(), "reviews": set()}
+    for chunk in rows(data):
+        for name, table_rows in chunk:
+            tables[name] += len(table_rows)
+            for row in table_rows if name in pairs else []:
+                pair = (row.get("buyer_id", row.get("reviewer_id")), row["product_id"])
+                assert pair not in pairs[name]
+                pairs[name].add(pair)
+
+    assert tables["favorites"] == SIZES["favorites"]
+    assert tables["reviews"] == SIZES["reviews"]
+    assert tables["users"] == SIZES["sellers"] + SIZES["buyers"]
+
+
+def test_popular_sellers_own_most_products():
+    data = SyntheticData(7, **{**SIZES, "products": 1000})
+
+    owners = Counter(data.seller_of(data.product_id(index)) for index in range(1000))
+
+    assert owners[data.seller_id(0)] > owners[data.seller_id(4)]
+    assert set(owners) <= {data.seller_id(index) for index in range(5)}
+
+
+@pytest.mark.parametrize(
+    "sizes",
+    [
+        {"sellers": 0},
+        {"buyers": 0},
+        {"favorites": 401},
+    ],
+)
+def test_impossible_sizes_are_rejected(sizes):
+    with pytest.raises(ValueError):
+        SyntheticData(7, **{**SIZES, **sizes})
+
+
+def test_data_sets_are_inserted_after_the_stored_rows(client, seller, create_product):
+    create_product("Cup")
+    progress = []
+
+    inserted = populate(
+        engine,
+        SyntheticData(7, **SIZES, first_ids=next_ids(engine)),
+        progress=lambda kind, total: progress.append(kind),
+    )
+
+    assert inserted["users"] == SIZES["sellers"] + SIZES["buyers"]
+    assert inserted["products"] == SIZES["products"]
+    assert progress[0] == "users" and progress[-1] == "reviews"
+    assert next_ids(engine) == {
+        "users": 2 + SIZES["sellers"] + SIZES["buyers"],
+        "products": 2 + SIZES["products"],
+        "tags": 1 + SIZES["tags"],
+    }
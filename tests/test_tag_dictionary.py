@@ -0,0 +1,132 @@
+from datetime import datetime
+
+import pytest
+
+from crafty.cache.tags import TagDictionary
+from crafty.crud.tag import _find_tag, tag_dictionary
+from crafty.db.models.tag import Tag
+from crafty.pagination import encode_cursor
+from crafty.schemas.tag import Tag as TagSchema
+
+
+def make_tags(*names):
+    return [
+        TagSchema(id=tag_id, name=name, version=1, updated_at=datetime(2024, 1, 1))
+        for tag_id, name in enumerate(names, start=1)
+    ]
+
+
+def test_names_match_exactly_then_ignoring_case():
+    tags = TagDictionary(ttl=60)
+    tags.replace(make_tags("Blue", "blue", "BLUE", "glazed"))
+
+    assert tags.get_by_name("BLUE").id == 3
+    assert tags.get_by_name("bLuE").id == 1
+    assert tags.get_by_name("Glazed").id == 4
+    assert tags.get_by_name("red") is None
+
+
+def test_prefixes_match_ignoring_case_by_id():
+    tags = TagDictionary(ttl=60)
+    tags.replace(make_tags("glazed", "Glass", "blue", "glossy"))
+
+    assert [tag.name for tag in tags.with_prefix("GL")] == ["glazed", "Glass", "glossy"]
+    assert tags.with_prefix("red") == []
+
+
+def test_tags_are_loaded_once_until_invalidated():
+    tags = TagDictionary(ttl=60)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return make_tags("blue")
+
+    tags.ensure(load)
+    tags.ensure(load)
+    tags.invalidate()
+    tags.ensure(load)
+
+    assert len(loads) == tags.loads == 2
+
+
+def test_tags_are_reloaded_once_expired():
+    tags = TagDictionary(ttl=0)
+    tags.replace(make_tags("blue"))
+
+    tags.ensure(lambda: make_tags("blue", "glazed"))
+
+    assert tags.get_by_name("glazed") is not None
+
+
+def test_tags_are_looked_up_by_name_without_the_database(client, create_tag):
+    tag = create_tag("blue")
+    client.get("/tags/")
+
+    response = client.get("/tags/name/BLUE")
+
+    assert response.status_code == 200
+    assert response.json()["id"] == tag["id"]
+    assert response.headers["x-db-query-count"] == "0"
+
+
+def test_tags_created_by_other_processes_are_found(client, db):
+    client.get("/tags/")
+    db.add(Tag(name="blue"))
+    db.commit()
+
+    response = client.get("/tags/name/blue")
+
+    assert response.status_code == 200
+    assert not tag_dictionary.fresh()
+    assert client.get("/tags/").json()["items"][0]["name"] == "blue"
+
+
+def test_tags_found_in_the_database_only_reload_unknown_ids(client, db, create_tag):
+    create_tag("blue")
+    client.get("/tags/")
+
+    _find_tag(db, Tag.name == "blue", "blue")
+
+    assert tag_dictionary.fresh()
+
+
+def test_missing_tags_are_not_found(client):
+    assert client.get("/tags/999").status_code == 404
+    assert client.get("/tags/name/red").status_code == 404
+
+
+@pytest.mark.parametrize("value", ["1", 1.5, None, True])
+def test_tag_cursors_must_hold_an_id(client, create_tag, value):
+    create_tag("blue")
+
+    response = client.get("/tags/", params={"cursor": encode_cursor({"id": value})})
+
+    assert response.status_code == 400
+
+
+def test_tag_pages_follow_the_cursor_and_clamp_skip(client, create_tag):
+    for name in ("blue", "glazed", "glass"):
+        create_tag(name)
+
+    first = client.get("/tags/", params={"limit": 2}).json()
+    second = client.get(
+        "/tags/", params={"limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+    negative = client.get("/tags/", params={"skip": -1}).json()
+
+    assert [tag["name"] for tag in first["items"] + second["items"]] == [
+        "blue",
+        "glazed",
+        "glass",
+    ]
+    assert [tag["name"] for tag in negative["items"]] == ["blue", "glazed", "glass"]
+
+
+def test_tags_are_listed_by_prefix(client, create_tag):
+    for name in ("blue", "Glazed", "glass"):
+        create_tag(name)
+
+    response = client.get("/tags/", params={"prefix": "gl"})
+
+    assert [tag["name"] for tag in response.json()["items"]] == ["Glazed", "glass"]
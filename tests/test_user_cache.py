@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from crafty.crud.user import get_user
+from crafty.db.database import engine
+from crafty.db.models.user import User
+from crafty.exceptions import UserNotFoundError
+
+
+def query_count(response):
+    return int(response.headers["x-db-query-count"])
+
+
+def create_user(client, username):
+    response = client.post(
+        "/users/",
+        json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "password_hash": "hash",
+            "user_type": "buyer",
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def case_insensitive_names(client, monkeypatch):
+    """Compare usernames and emails ignoring case, like MySQL's default collation."""
+    users = User.__table__
+    for column in (users.c.username, users.c.email):
+        monkeypatch.setattr(column.type, "collation", "NOCASE")
+    users.drop(engine)
+    users.create(engine)
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/users/id/{id}", "/users/username/seller", "/users/email/seller@example.com"],
+)
+def test_repeated_user_lookups_are_served_from_the_cache(client, seller, url):
+    url = url.format(id=seller["id"])
+
+    first = client.get(url)
+    second = client.get(url)
+
+    assert first.json() == second.json()
+    assert query_count(first) > 0
+    assert query_count(second) == 0
+
+
+def test_unknown_users_are_remembered(client):
+    first = client.get("/users/username/nobody")
+    second = client.get("/users/username/nobody")
+
+    assert first.status_code == second.status_code == 404
+    assert query_count(first) > 0
+    assert query_count(second) == 0
+
+
+def test_unknown_users_are_forgotten_after_the_negative_ttl(client, settings):
+    settings.set("user_negative_ttl", 0.01)
+    client.get("/users/username/nobody")
+
+    time.sleep(0.02)
+
+    assert query_count(client.get("/users/username/nobody")) > 0
+
+
+def test_created_users_are_found_after_a_cached_miss(client):
+    for url in ("/users/username/buyer", "/users/email/buyer@example.com"):
+        assert client.get(url).status_code == 404
+
+    user = create_user(client, "buyer")
+
+    for url in ("/users/username/buyer", "/users/email/buyer@example.com"):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert response.json()["id"] == user["id"]
+
+
+def test_deleted_users_are_not_served_from_the_cache(client):
+    user = create_user(client, "buyer")
+    urls = [
+        f"/users/id/{user['id']}",
+        "/users/username/buyer",
+        "/users/email/buyer@example.com",
+    ]
+    for url in urls:
+        client.get(url)
+
+    assert client.delete(f"/users/{user['id']}").status_code == 204
+
+    for url in urls:
+        assert client.get(url).status_code == 404, url
+
+
+def test_numeric_usernames_are_looked_up_as_names(client):
+    user = create_user(client, "1234")
+
+    assert client.get("/users/username/1234").json()["id"] == user["id"]
+
+
+def test_non_numeric_ids_are_not_found(db):
+    with pytest.raises(UserNotFoundError):
+        get_user.__wrapped__(db, "buyer", "id")
+
+
+def test_mixed_case_lookups_share_the_cache_entry(client, case_insensitive_names):
+    user = create_user(client, "buyer")
+    assert client.get("/users/username/Buyer").json()["id"] == user["id"]
+    assert client.get("/users/email/BUYER@example.com").json()["id"] == user["id"]
+
+    assert client.delete(f"/users/{user['id']}").status_code == 204
+
+    for url in ("/users/username/Buyer", "/users/email/BUYER@example.com"):
+        assert client.get(url).status_code == 404, url
+
+
+def test_mixed_case_misses_are_forgotten_on_create(client, case_insensitive_names):
+    assert client.get("/users/username/Buyer").status_code == 404
+
+    user = create_user(client, "buyer")
+
+    assert client.get("/users/username/Buyer").json()["id"] == user["id"]
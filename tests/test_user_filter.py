@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from crafty.cache.bloom import CountingBloomFilter
+from crafty.crud.user import (_filter_authoritative, _filter_value,
+                              _follow_user_writes, user_identifiers)
+
+
+def query_count(response):
+    assert response.status_code == 200, response.text
+    return int(response.headers["x-db-query-count"])
+
+
+@pytest.fixture
+def authoritative(client, settings):
+    settings.set("user_filter_authoritative", True)
+
+
+def test_filter_holds_added_values_until_removed():
+    values = CountingBloomFilter(capacity=100)
+    values.add("a")
+    values.add("b")
+
+    values.remove("a")
+
+    assert "a" not in values
+    assert "b" in values
+    assert values.count == 1
+
+
+def test_values_that_were_never_added_are_not_removed():
+    values = CountingBloomFilter(capacity=100)
+    values.add("a")
+
+    values.remove("b")
+
+    assert "a" in values
+    assert values.count == 1
+
+
+def test_saturated_counters_are_never_decremented():
+    values = CountingBloomFilter(capacity=100)
+    for _ in range(300):
+        values.add("a")
+    for _ in range(300):
+        values.remove("a")
+
+    assert "a" in values
+
+
+def test_false_positives_stay_near_the_error_rate():
+    values = CountingBloomFilter(capacity=1000, error_rate=0.01)
+    for number in range(1000):
+        values.add(f"in:{number}")
+
+    false_positives = sum(f"out:{number}" in values for number in range(10_000))
+
+    assert all(f"in:{number}" in values for number in range(1000))
+    assert false_positives < 300
+
+
+def test_building_replaces_the_values():
+    values = CountingBloomFilter(capacity=100)
+    values.add("a")
+
+    values.build(["b", "c"])
+
+    assert "a" not in values
+    assert values.count == 2
+    assert values.built
+
+
+def test_filter_is_only_authoritative_when_built_and_allowed(client, settings):
+    assert user_identifiers.built
+    assert not _filter_authoritative()
+
+    settings.set("user_filter_authoritative", True)
+    assert _filter_authoritative()
+
+    user_identifiers.built = False
+    assert not _filter_authoritative()
+
+
+def test_free_names_are_answered_without_the_database(client, seller, authoritative):
+    response = client.get(
+        "/users/availability", params={"username": "free", "email": "free@example.com"}
+    )
+
+    assert response.json() == {"username_available": True, "email_available": True}
+    assert query_count(response) == 0
+
+
+def test_taken_names_are_checked_in_the_database(client, seller, authoritative):
+    response = client.get(
+        "/users/availability",
+        params={"username": "seller", "email": "seller@example.com"},
+    )
+
+    assert response.json() == {"username_available": False, "email_available": False}
+    assert query_count(response) == 2
+
+
+def test_names_are_checked_in_the_database_unless_authoritative(client, seller):
+    response = client.get("/users/availability", params={"username": "free"})
+
+    assert response.json() == {"username_available": True, "email_available": None}
+    assert query_count(response) == 1
+
+
+def test_deleted_users_are_removed_from_the_filter(client, seller, authoritative):
+    client.delete(f"/users/{seller['id']}")
+
+    assert _filter_value("username", "seller") not in user_identifiers
+    assert _filter_value("email", "seller@example.com") not in user_identifiers
+
+
+def test_users_created_by_other_processes_are_added(client):
+    _follow_user_writes(["user:username:Remote", "user:id:7", "product:7:images"])
+
+    assert _filter_value("username", "remote") in user_identifiers
+
+
+def test_missed_invalidations_rebuild_the_filter(client, seller):
+    user_identifiers.build([])
+
+    _follow_user_writes(None)
+
+    assert not _filter_authoritative()
+    deadline = time.monotonic() + 5
+    while not user_identifiers.built:
+        assert time.monotonic() < deadline, "the filter was not rebuilt"
+        time.sleep(0.01)
+    assert _filter_value("username", "seller") in user_identifiers
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+from crafty.crud import user as user_crud
+from crafty.importing import ImportReport, read_batches, read_lines
+
+
+def user_row(username, user_type="buyer", **fields):
+    return {
+        "username": username,
+        "email": f"{username}@example.com",
+        "password_hash": "hash",
+        "user_type": user_type,
+        **fields,
+    }
+
+
+def ndjson(*rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+
+
+def import_users(client, body, **params):
+    response = client.post("/users/import", params=params, content=body.encode())
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_ndjson_rows_are_parsed_with_their_line_numbers():
+    lines = ['{"a": 1}', "", "not json", "[1]", '{"b": 2}']
+
+    batches = list(read_batches(lines, "ndjson", 2))
+
+    assert [[line for line, _ in batch] for batch in batches] == [[1, 3], [4, 5]]
+    assert batches[0][0] == (1, {"a": 1})
+    assert batches[0][1][1].startswith("Invalid JSON")
+    assert batches[1][0] == (4, "Expected a JSON object")
+
+
+def test_csv_rows_are_named_by_the_header():
+    lines = ["username,email", "a,a@example.com", "b", ""]
+
+    (batch,) = read_batches(lines, "csv", 10)
+
+    assert batch == [
+        (2, {"username": "a", "email": "a@example.com"}),
+        (3, "Expected 2 values, got 1"),
+    ]
+
+
+def test_streamed_lines_are_split_across_chunks():
+    async def chunks():
+        for chunk in [b"first\nsec", b"ond\n\xc3", b"\xa9t\xc3\xa9"]:
+            yield chunk
+
+    async def collect():
+        return [line async for line in read_lines(chunks())]
+
+    assert asyncio.run(collect()) == ["first", "second", "été"]
+
+
+def test_reports_keep_the_first_errors():
+    report = ImportReport(max_errors=2)
+
+    report.add(rows=2, imported=1, errors=[(1, "a")])
+    report.add(rows=3, imported=1, errors=[(3, "b"), (5, "c")])
+
+    assert report.as_dict() == {
+        "rows": 5,
+        "imported": 2,
+        "failed": 3,
+        "errors": [{"line": 1, "error": "a"}, {"line": 3, "error": "b"}],
+    }
+
+
+def test_failed_rows_are_reported_by_line(client, seller):
+    body = ndjson(
+        user_row("ann"),
+        "{broken",
+        user_row("bob", email="not an email"),
+        user_row("seller"),
+        user_row("ann", email="other@example.com"),
+        user_row("cat", user_type="seller"),
+    )
+
+    report = import_users(client, body, batch_size=2)
+
+    assert (report["rows"], report["imported"], report["failed"]) == (6, 2, 4)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4, 5]
+    assert "email" in report["errors"][1]["error"]
+    assert "seller" in report["errors"][2]["error"]
+    assert "ann" in report["errors"][3]["error"]
+    for username in ("ann", "cat"):
+        assert client.get(f"/users/username/{username}").status_code == 200
+
+
+def test_users_are_imported_from_csv(client):
+    body = "username,email,password_hash,user_type\nann,ann@example.com,hash,buyer\n"
+
+    report = import_users(client, body, format="csv")
+
+    assert (report["rows"], report["imported"], report["failed"]) == (1, 1, 0)
+
+
+def test_imported_users_replace_remembered_misses(client):
+    client.get("/users/username/ann")
+
+    import_users(client, ndjson(user_row("ann")))
+
+    assert client.get("/users/username/ann").status_code == 200
+
+
+def test_batches_failing_on_concurrent_users_are_retried_one_by_one(
+    client, seller, monkeypatch
+):
+    # Existing users go unnoticed until the INSERT, as if created concurrently
+    monkeypatch.setattr(
+        user_crud,
+        "_taken_identifiers",
+        lambda db, users: {"username": set(), "email": set()},
+    )
+
+    report = import_users(client, ndjson(user_row("ann"), user_row("seller")))
+
+    assert (report["imported"], report["failed"]) == (1, 1)
+    assert report["errors"] == [{"line": 2, "error": "User already exists"}]